@@ -1,13 +1,38 @@
 import os
 import glob
-import io
+import hmac
+import itertools
 import json
-from math import radians, sin, cos, sqrt, atan2
-from flask import Flask, render_template, request, jsonify, url_for, Response, abort
+from time import perf_counter
+from flask import Flask, render_template, request, jsonify, url_for, Response, abort, g
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
 import hashlib
-from utils.ai_service import analyze_image
+from utils.ai_service import analyze_image_bytes, analyze_images_bytes
+from utils.analysis_cache import AnalysisCache
+from utils.clustering import GridClusterer, clamp_zoom
+from utils.dataset_cache import DatasetCache, http_last_modified
+from utils.datasets import CATEGORIES, DatasetParser, build_item_from_row
+from utils.exports import encode_stream, iter_csv, iter_json_array, iter_json_object, iter_ndjson, supported_encodings
+from utils.jobs import JobQueue, QueueFullError
+from utils.json_store import JsonStore
+from utils.matching import MatchEngine
+from utils.metrics import collect_stages, collected_stages, stage, timed_iter
+from utils.metrics import registry as metrics_registry
+from utils.profiling import ProfilerBusyError, RequestProfiler
+from utils.query_cache import QueryCache
+from utils.records import ItemRecord
 from utils.schema import FoundItemSchema
+from utils.search_index import fold_text, normalize_city
+from utils.snapshot import SnapshotStore
+from utils.watcher import DirectoryWatcher
+from utils.storage import FILTER_KEYS, create_repository
+from utils.suggest import Suggester
+from utils.uploads import ChunkedUploadStore, OffsetMismatchError, UnknownUploadError, UploadError
+from utils.validation import ParallelValidator
+import threading
 import uuid
+import zipfile
 from datetime import datetime
 # Helper to calculate MD5 checksum of a file-like object
 
@@ -23,40 +48,248 @@ def calculate_md5(file_stream):
     return md5.hexdigest()
 
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
-app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', 256)) * 1024 * 1024  # uploads are parsed as streams
+# Database, snapshots, chunked uploads, analysis cache and shared worker state; relative to the working directory
+app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', 'uploads')
+# Background image analysis: pool size, queue depth and executor type ('thread' or 'process')
+app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', 2))
+app.config['ANALYSIS_QUEUE_SIZE'] = int(os.environ.get('ANALYSIS_QUEUE_SIZE', 16))
+app.config['ANALYSIS_EXECUTOR'] = os.environ.get('ANALYSIS_EXECUTOR', 'thread')
+app.config['ANALYSIS_CACHE_DIR'] = os.path.join(app.config['UPLOAD_FOLDER'], 'analysis_cache')
+app.config['ANALYSIS_CACHE_SIZE'] = int(os.environ.get('ANALYSIS_CACHE_SIZE', 512))
+app.config['ANALYSIS_CACHE_TTL'] = int(os.environ.get('ANALYSIS_CACHE_TTL', 7 * 24 * 3600))
+# Batch analysis: images per model call, images per request and their total (uncompressed) size
+app.config['ANALYSIS_BATCH_SIZE'] = int(os.environ.get('ANALYSIS_BATCH_SIZE', 16))
+app.config['ANALYSIS_BATCH_MAX_IMAGES'] = int(os.environ.get('ANALYSIS_BATCH_MAX_IMAGES', 1000))
+app.config['ANALYSIS_BATCH_MAX_MB'] = int(os.environ.get('ANALYSIS_BATCH_MAX_MB', 256))
+# Item storage: 'sqlite' (shared by all worker processes, survives restarts) or 'memory'
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'sqlite')
+app.config['DATABASE_PATH'] = os.environ.get('DATABASE_PATH', os.path.join(app.config['UPLOAD_FOLDER'], 'lostfound.db'))
+app.config['DATABASE_POOL_SIZE'] = int(os.environ.get('DATABASE_POOL_SIZE', 4))
+app.config['DATABASE_MMAP_MB'] = int(os.environ.get('DATABASE_MMAP_MB', 256))
+# Compiled sample/dataset records, rebuilt when a source file changes
+app.config['SNAPSHOT_DIR'] = os.path.join(app.config['UPLOAD_FOLDER'], 'snapshots')
+# Pick up files added to/changed in/removed from datasets/: 'auto' (inotify, else polling), 'inotify', 'poll' or 'off'
+app.config['DATASET_WATCH'] = os.environ.get('DATASET_WATCH', 'auto')
+app.config['DATASET_WATCH_INTERVAL'] = float(os.environ.get('DATASET_WATCH_INTERVAL', 2.0))
+# CSV/JSONL files of VALIDATION_PARALLEL_MIN_KB or more are parsed and validated in chunks on a process pool
+app.config['VALIDATION_WORKERS'] = int(os.environ.get('VALIDATION_WORKERS', os.cpu_count() or 1))
+app.config['VALIDATION_CHUNK_KB'] = int(os.environ.get('VALIDATION_CHUNK_KB', 1024))
+app.config['VALIDATION_PARALLEL_MIN_KB'] = int(os.environ.get('VALIDATION_PARALLEL_MIN_KB', 4096))
+# Chunked wizard uploads: total file size limit, suggested chunk size and how long unfinished uploads are kept
+app.config['UPLOAD_MAX_MB'] = int(os.environ.get('UPLOAD_MAX_MB', 2048))
+app.config['UPLOAD_CHUNK_MB'] = int(os.environ.get('UPLOAD_CHUNK_MB', 8))
+app.config['UPLOAD_TTL_HOURS'] = float(os.environ.get('UPLOAD_TTL_HOURS', 24))
+# Lost/found matching: best matches kept per report and the lowest score worth showing
+app.config['MATCH_LIMIT'] = int(os.environ.get('MATCH_LIMIT', 10))
+app.config['MATCH_MIN_SCORE'] = float(os.environ.get('MATCH_MIN_SCORE', 0.5))
+# Search result pages cached per normalized query until the repository changes; 0 disables
+app.config['SEARCH_CACHE_SIZE'] = int(os.environ.get('SEARCH_CACHE_SIZE', 1024))
+app.config['SEARCH_FRAGMENT_CACHE_MB'] = int(os.environ.get('SEARCH_FRAGMENT_CACHE_MB', 16))
+# Search box completions: most suggestions returned and distinct prefixes whose answers are cached
+app.config['SUGGEST_LIMIT'] = int(os.environ.get('SUGGEST_LIMIT', 8))
+app.config['SUGGEST_CACHE_SIZE'] = int(os.environ.get('SUGGEST_CACHE_SIZE', 4096))
+# Requests sending this value in X-Admin-Token may add ?__profile=1 to get a profile report; empty disables profiling
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN', '')
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Common categories list
-CATEGORIES = [
-    "Portfel", "Telefon", "Klucze", "Dokumenty", "Plecak", "Torebka", 
-    "Słuchawki", "Laptop", "Tablet", "Zegarek", "Biżuteria", "Okulary", 
-    "Karta płatnicza", "Dowód osobisty", "Paszport", "Prawo jazdy", 
-    "Książka", "Ubranie", "Kurtka", "Czapka", "Szalik", "Rękawiczki", 
-    "Buty", "Parasol", "Bagaż", "Walizka", "Torba sportowa", 
-    "Wózek dziecięcy", "Zabawka", "Rower", "Hulajnoga", "Kask", 
-    "Ładowarka", "Powerbank", "Kabel", "Aparat fotograficzny", 
-    "Instrument muzyczny", "Sprzęt sportowy", "Kosmetyczka", "Leki", 
-    "Jedzenie", "Napój"
-]
-CATEGORIES.sort()
-CATEGORIES.append("Inne")
+# State that any worker process may be asked about lives in files under UPLOAD_FOLDER, not in memory
+ANALYSIS_JOB_TTL = 600
+analysis_jobs = JobQueue(
+    workers=app.config['ANALYSIS_WORKERS'],
+    max_pending=app.config['ANALYSIS_QUEUE_SIZE'],
+    use_processes=app.config['ANALYSIS_EXECUTOR'] == 'process',
+    result_ttl=ANALYSIS_JOB_TTL,
+    state=JsonStore(os.path.join(app.config['UPLOAD_FOLDER'], 'jobs'), ttl=ANALYSIS_JOB_TTL, max_entries=10000)
+)
+# Analysis results keyed by image MD5, so re-uploads skip the model call
+analysis_cache = AnalysisCache(
+    directory=app.config['ANALYSIS_CACHE_DIR'],
+    max_entries=app.config['ANALYSIS_CACHE_SIZE'],
+    ttl=app.config['ANALYSIS_CACHE_TTL']
+)
+# Recent batch analysis requests, oldest dropped first; analysis_batches_lock serializes updates within a process
+ANALYSIS_BATCH_HISTORY = 256
+analysis_batches = JsonStore(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'analysis_batches'),
+    max_entries=ANALYSIS_BATCH_HISTORY
+)
+analysis_batches_lock = threading.Lock()
+# Small shared documents, e.g. which rows the official edit page works on
+shared_state = JsonStore(os.path.join(app.config['UPLOAD_FOLDER'], 'state'))
+
+# Lost/found items and published datasets
+repository = create_repository(
+    app.config['STORAGE_BACKEND'],
+    path=app.config['DATABASE_PATH'],
+    pool_size=app.config['DATABASE_POOL_SIZE'],
+    mmap_size=app.config['DATABASE_MMAP_MB'] * 1024 * 1024
+)
+# Item groups, listed in default result order
+SAMPLE_GROUP = 0  # sample_data.csv, reloaded on startup
+REPORT_GROUP = 1  # citizen reports, kept across restarts
+OFFICIAL_GROUP = 2  # records from dataset files
+# Per-zoom marker clusters for the search map, rebuilt when the repository changes
+map_clusterer = GridClusterer()
+# Search result pages and their rendered cards, dropped whenever repository.version moves on
+search_results = QueryCache(max_entries=app.config['SEARCH_CACHE_SIZE'])
+search_fragments = QueryCache(
+    max_entries=app.config['SEARCH_CACHE_SIZE'] if app.config['SEARCH_FRAGMENT_CACHE_MB'] else 0,
+    max_bytes=app.config['SEARCH_FRAGMENT_CACHE_MB'] * 1024 * 1024,
+    sizeof=len
+)
+
+
+def _is_report(item):
+    return item.get('status') == 'lost'
+
+
+# Citizen reports paired with found items; matching runs on its own single background worker
+match_engine = MatchEngine(
+    repository,
+    _is_report,
+    limit=app.config['MATCH_LIMIT'],
+    min_score=app.config['MATCH_MIN_SCORE']
+)
+matching_jobs = JobQueue(workers=1, max_pending=64)
+
+
+def _schedule_rematch():
+    """Match every report again in the background, e.g. after found items changed."""
+    match_engine.request_rematch()
+    try:
+        matching_jobs.submit(match_engine.rematch_all, lambda: repository.iter_items(REPORT_GROUP), key='rematch')
+    except QueueFullError:
+        print("Matching queue is full, skipping rematch")
+
 
-# In-memory storage for lost items
-items = []
-# Track dataset files for downloads
-dataset_files = []
-# Items originating from official datasets (used in search view)
-official_items = []
+# Completions for the search box over found items (citizen reports are not suggested)
+suggester = Suggester(limit=app.config['SUGGEST_LIMIT'], cache_size=app.config['SUGGEST_CACHE_SIZE'])
+suggest_jobs = JobQueue(workers=1, max_pending=4)
 
 
-def _to_float(value):
+def _found_items():
+    return itertools.chain(repository.iter_items(SAMPLE_GROUP), repository.iter_items(OFFICIAL_GROUP))
+
+
+def _schedule_suggestions():
+    """Rebuild the search box completions in the background; lookups use the old ones meanwhile."""
+    suggester.request_refresh()
     try:
-        return float(value)
-    except (TypeError, ValueError):
+        suggest_jobs.submit(suggester.refresh, _found_items, key='suggest')
+    except QueueFullError:
+        print("Suggestion queue is full, skipping rebuild")
+
+
+def _found_items_changed():
+    _schedule_rematch()
+    _schedule_suggestions()
+
+# Instrumentation: per-route latency and hot-path stages (utils.metrics.stage), exposed at /metrics
+REQUEST_SECONDS = metrics_registry.histogram(
+    'lostfound_request_duration_seconds',
+    'Time to handle a request, until the response (or the first chunk of a streamed one) is ready.',
+    ('endpoint', 'method', 'status')
+)
+request_profiler = RequestProfiler()
+
+
+def _cache_counts():
+    """{cache name: (hits, misses)} since startup."""
+    datasets = dataset_cache.stats()
+    analysis = analysis_cache.stats()
+    clusters = map_clusterer.stats()
+    suggestions = suggester.stats()
+    results = search_results.stats()
+    fragments = search_fragments.stats()
+    return {
+        'dataset': (datasets['hits'], datasets['misses']),
+        'dataset_payload': (datasets['payload_hits'], datasets['payload_misses']),
+        'analysis': (analysis['hits'], analysis['misses']),
+        'map_clusters': (clusters['hits'], clusters['misses']),
+        'suggest': (suggestions['hits'], suggestions['misses']),
+        'search_results': (results['hits'], results['misses']),
+        'search_fragments': (fragments['hits'], fragments['misses']),
+    }
+
+
+metrics_registry.callback(
+    'lostfound_cache_hits_total', 'Cache lookups answered from the cache.',
+    lambda: {(name,): hits for name, (hits, _) in _cache_counts().items()}, ('cache',), type='counter'
+)
+metrics_registry.callback(
+    'lostfound_cache_misses_total', 'Cache lookups that had to compute or load the value.',
+    lambda: {(name,): misses for name, (_, misses) in _cache_counts().items()}, ('cache',), type='counter'
+)
+metrics_registry.callback(
+    'lostfound_cache_hit_ratio', 'Share of cache lookups since startup that were hits.',
+    lambda: {(name,): hits / (hits + misses) if hits + misses else 0.0 for name, (hits, misses) in _cache_counts().items()},
+    ('cache',)
+)
+metrics_registry.callback('lostfound_items', 'Items in the repository.', lambda: repository.count())
+metrics_registry.callback('lostfound_analysis_jobs_pending', 'Image analysis jobs queued or running.', lambda: analysis_jobs.pending)
+
+
+def _is_admin():
+    token = app.config['ADMIN_TOKEN']
+    sent = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(sent.encode('utf-8'), token.encode('utf-8'))
+
+
+@app.before_request
+def _start_request_metrics():
+    """Start the request timer and, for admins asking with ?__profile=1, the profiler."""
+    g.request_started = perf_counter()
+    engine = request.args.get('__profile')
+    if not engine or not _is_admin():
         return None
+    try:
+        g.profile = request_profiler.start('pyinstrument' if engine == 'pyinstrument' else 'cprofile')
+    except ProfilerBusyError as exc:
+        return Response(f"{exc}, try again shortly\n", status=409, mimetype='text/plain')
+    g.profile_stages = collect_stages()
+    return None
+
+
+@app.after_request
+def _finish_request_metrics(response):
+    session = g.pop('profile', None)
+    if session is not None:
+        # Produce streamed bodies (exports) inside the profile too
+        response.get_data()
+        session.stop()
+
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(
+            perf_counter() - started, request.endpoint or 'unmatched', request.method, str(response.status_code)
+        )
+
+    if session is not None:
+        body, mimetype = session.report(
+            f"{request.method} {request.full_path} -> {response.status}",
+            collected_stages(g.pop('profile_stages')),
+            sort=request.args.get('__profile_sort', 'cumulative')
+        )
+        response = Response(body, mimetype=mimetype, headers={'Cache-Control': 'no-store'})
+    return response
+
+
+@app.teardown_request
+def _stop_profiler(exc):
+    # A request that failed before after_request ran must not keep the profiler locked
+    session = g.pop('profile', None)
+    if session is not None:
+        session.stop()
+        collected_stages(g.pop('profile_stages'))
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for this worker process."""
+    return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 def _slugify(text):
@@ -65,36 +298,14 @@ def _slugify(text):
     return slug or 'dataset'
 
 
-def _sanitize_record(row: dict):
-    """Keep only allowed fields, trim strings, normalize numeric coords/radius."""
-    allowed_fields = set(FoundItemSchema.REQUIRED_FIELDS + FoundItemSchema.OPTIONAL_FIELDS)
-    numeric_fields = {'location_lat', 'location_lng', 'location_radius'}
-    cleaned = {}
-    for key, value in row.items():
-        if key not in allowed_fields:
-            continue  # drop unknown fields like "null"
-        if key in numeric_fields:
-            num_val = _to_float(value)
-            if num_val is None:
-                cleaned[key] = None
-            else:
-                cleaned[key] = num_val
-        else:
-            # Preserve empty strings for required-field validation, but trim whitespace
-            cleaned[key] = str(value).strip() if value is not None else ''
-    return cleaned
-
-
 def _build_official_items(raw_rows):
-    """Convert raw CSV/JSON rows into searchable item dicts."""
-    built = []
-    start_id = len(items) + 1
-    for idx, row in enumerate(raw_rows, start=start_id):
-        built.append(build_item_from_row(row, idx))
+    """Convert raw CSV/JSON rows into searchable items; ids are assigned on insert."""
+    built = [build_item_from_row(row, None) for row in raw_rows]
+    _annotate_specific_items(built)
     return built
 
 
-def _annotate_specific_items():
+def _annotate_specific_items(official_items):
     """
     Add security question + example answers to known records
     without touching source files.
@@ -106,176 +317,251 @@ def _annotate_specific_items():
             item['security_question'] = "W kształcie jakiego auta jest ten brelok?"
 
 
-def build_item_from_row(row, item_id):
-    city = row.get('miejsce_znalezienia_miasto') or row.get('city') or ''
-    street = row.get('miejsce_znalezienia_ulica') or row.get('street') or ''
-    location_parts = [part for part in [city, street] if part]
-    location_label = ", ".join(location_parts) if location_parts else row.get('location', '')
-
-    return {
-        'id': item_id,
-        'name': row.get('nazwa_przedmiotu') or row.get('name') or '',
-        'category': row.get('kategoria') or row.get('category') or '',
-        'date': row.get('data_znalezienia') or row.get('date') or '',
-        'location': location_label,
-        'location_city': city,
-        'location_street': street,
-        'location_lat': _to_float(row.get('location_lat') or row.get('lat')),
-        'location_lng': _to_float(row.get('location_lng') or row.get('lng')),
-        'location_radius': _to_float(row.get('location_radius')),
-        'description': row.get('opis_szczegolowy') or row.get('opis') or row.get('description') or '',
-        'contact': row.get('kontakt_email') or row.get('contact') or '',
-        'status': row.get('status') or 'znaleziony',
-        'security_question': row.get('pytanie_weryfikacyjne') or row.get('security_question') or '',
-    }
-
 # Dataset parsing helpers
-def _validate_items(raw_items):
-    valid = []
-    errors = []
-    for idx, row in enumerate(raw_items, start=1):
-        row_errors = FoundItemSchema.validate_row(row)
-        if row_errors:
-            errors.append({'row': idx, 'errors': row_errors})
-        else:
-            valid.append(row)
-    return valid, errors
-
-
-def parse_dataset_bytes(raw_bytes, filename):
-    """Parse CSV/JSON/JSONL bytes into items + errors."""
-    ext = os.path.splitext(filename.lower())[1]
-
-    # CSV
-    if ext == '.csv':
-        try:
-            items, errors = FoundItemSchema.parse_csv(io.BytesIO(raw_bytes))
-            items = [_sanitize_record(r) for r in items]
-            return items, errors
-        except Exception as exc:
-            return [], [{"row": 0, "errors": [f"CSV parse error: {exc}"]}]
-
-
-    # JSON list
-    if ext == '.json':
-        try:
-            data = json.loads(raw_bytes.decode('utf-8'))
-            if not isinstance(data, list):
-                return [], [{"row": 0, "errors": ["JSON must be an array of records"]}]
-            data = [_sanitize_record(r) for r in data]
-            return _validate_items(data)
-        except Exception as exc:
-            return [], [{"row": 0, "errors": [f"JSON parse error: {exc}"]}]
-
-    # JSONL / NDJSON
-    if ext in ('.jsonl', '.ndjson'):
-        raw_items = []
-        try:
-            for idx, line in enumerate(raw_bytes.decode('utf-8').splitlines(), start=1):
-                if not line.strip():
-                    continue
-                raw_items.append(_sanitize_record(json.loads(line)))
-            return _validate_items(raw_items)
-        except Exception as exc:
-            return [], [{"row": 0, "errors": [f"JSONL parse error: {exc}"]}]
-
-    return [], [{"row": 0, "errors": [f"Unsupported file type: {ext}"]}]
-
+dataset_parser = DatasetParser(ParallelValidator(
+    workers=app.config['VALIDATION_WORKERS'],
+    chunk_bytes=app.config['VALIDATION_CHUNK_KB'] * 1024,
+    min_bytes=app.config['VALIDATION_PARALLEL_MIN_KB'] * 1024
+))
+
+
+# Parsed dataset files and serialized download payloads, revalidated by mtime + size
+dataset_cache = DatasetCache(dataset_parser.parse)
+
+chunked_uploads = ChunkedUploadStore(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'chunks'),
+    max_bytes=app.config['UPLOAD_MAX_MB'] * 1024 * 1024,
+    ttl=app.config['UPLOAD_TTL_HOURS'] * 3600
+)
+# Rows returned with a finalized upload; further pages come from /urzad/uploads/<id>/items|errors
+UPLOAD_PREVIEW_ROWS = 10
+
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), 'sample_data.csv')
+# Published and official dataset files; load tests point this at a scratch directory
+DATASETS_DIR = os.environ.get('DATASETS_DIR', os.path.join(os.path.dirname(__file__), 'datasets'))
+DATASET_EXTENSIONS = ('.csv', '.json', '.jsonl', '.ndjson')
+# Bump when the compiled records change shape (e.g. build_item_from_row() output)
+SNAPSHOT_VERSION = 2
+startup_snapshots = SnapshotStore(app.config['SNAPSHOT_DIR'], version=SNAPSHOT_VERSION)
+
+
+def _dataset_source_paths():
+    if not os.path.isdir(DATASETS_DIR):
+        return []
+    return [
+        path for path in sorted(glob.glob(os.path.join(DATASETS_DIR, '*')))
+        if os.path.splitext(path)[1].lower() in DATASET_EXTENSIONS
+    ]
 
-def load_sample_items():
-    """Load initial dataset from sample_data.csv (used for localization demo)."""
-    sample_path = os.path.join(os.path.dirname(__file__), 'sample_data.csv')
-    if not os.path.exists(sample_path):
-        return
 
+def _compile_sample_items():
+    """Build items from sample_data.csv (used for localization demo)."""
+    if not os.path.exists(SAMPLE_PATH):
+        return []
     try:
-        with open(sample_path, 'rb') as f:
+        with open(SAMPLE_PATH, 'rb') as f:
             parsed_items, _ = FoundItemSchema.parse_csv(f)
-
-        items.clear()
-        for idx, row in enumerate(parsed_items, start=1):
-            items.append(build_item_from_row(row, idx))
+        return [build_item_from_row(row, None) for row in parsed_items]
     except Exception as exc:
         # Keep the app running even if sample data failed to load
         print(f"Sample data could not be loaded: {exc}")
+        return []
 
 
-load_sample_items()
+def _dataset_id(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
 
 
-def load_official_datasets():
-    """Load official CSV datasets into memory so the portal is pre-populated."""
-    data_dir = os.path.join(os.path.dirname(__file__), 'datasets')
-    if not os.path.isdir(data_dir):
-        return
+def _compile_dataset(file_path):
+    """Parse one official dataset file and build its items and description."""
+    entry = dataset_cache.load(file_path)
+    dataset_id = _dataset_id(file_path)
+    city_title = dataset_id.capitalize()
+    return {
+        'dataset': {
+            'id': dataset_id,
+            'title': f'Rzeczy znalezione - {city_title}',
+            'date': '2023-11-15',
+            'count': len(entry.items),
+            'status': 'Opublikowany',
+            'path': file_path
+        },
+        'rows': entry.items,
+        'errors': entry.errors,
+        'fingerprint': (entry.mtime_ns, entry.size),
+        'items': _build_official_items(entry.items),
+    }
 
-    loaded_datasets = []
-    uploaded_items.clear()
-    dataset_files.clear()
-    official_items.clear()
 
-    for file_path in sorted(glob.glob(os.path.join(data_dir, '*'))):
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext not in ('.csv', '.json', '.jsonl', '.ndjson'):
-            continue
+def _compile_startup_data(dataset_paths):
+    """Parse, validate and build everything loaded at startup."""
+    compiled = {'sample': _compile_sample_items(), 'datasets': []}
+    for file_path in dataset_paths:
         try:
-            with open(file_path, 'rb') as f:
-                raw = f.read()
-            parsed_items, _ = parse_dataset_bytes(raw, file_path)
-            uploaded_items.extend(parsed_items)
-            official_items.extend(_build_official_items(parsed_items))
-
-            dataset_id = os.path.splitext(os.path.basename(file_path))[0]
-            city_title = dataset_id.capitalize()
-            loaded_datasets.append({
-                'id': dataset_id,
-                'title': f'Rzeczy znalezione - {city_title}',
-                'date': '2023-11-15',
-                'count': len(parsed_items),
-                'status': 'Opublikowany'
-            })
-            dataset_files.append({'id': dataset_id, 'path': file_path})
+            compiled['datasets'].append(_compile_dataset(file_path))
         except Exception as exc:
             print(f"Could not load dataset from {file_path}: {exc}")
+    return compiled
+
+
+def load_startup_data():
+    """
+    Fill the repository from sample_data.csv and the official datasets,
+    going through a compiled snapshot that is rebuilt only when one of the
+    source files changed. Groups already built from the same files (a
+    shared SQLite store filled by another worker) are left as they are.
+    """
+    dataset_paths = _dataset_source_paths()
+    snapshot_key = startup_snapshots.key([SAMPLE_PATH] + dataset_paths)
+    compiled = startup_snapshots.load_or_build(snapshot_key, lambda: _compile_startup_data(dataset_paths))
+
+    sample_key = startup_snapshots.key([SAMPLE_PATH])
+    if repository.group_tag(SAMPLE_GROUP) != sample_key:
+        repository.replace_group(SAMPLE_GROUP, compiled['sample'], tag=sample_key)
+    official_key = startup_snapshots.key(dataset_paths)
+    with _dataset_sync_lock:
+        if repository.group_tag(OFFICIAL_GROUP) != official_key:
+            repository.replace_sources(
+                OFFICIAL_GROUP,
+                {ds['dataset']['id']: ds['items'] for ds in compiled['datasets']},
+                tag=official_key,
+                exclusive=True
+            )
+            if compiled['datasets']:
+                repository.replace_datasets([ds['dataset'] for ds in compiled['datasets']])
+        _dataset_state.clear()
+        _dataset_state.update((ds['dataset']['path'], ds['fingerprint']) for ds in compiled['datasets'])
+
+    for ds in compiled['datasets']:
+        # Downloads reuse the parsed rows instead of parsing the file again
+        dataset_cache.prime(ds['dataset']['path'], ds['rows'], ds['errors'], *ds['fingerprint'])
+
+
+# (mtime_ns, size) of every dataset file whose records are in the repository
+_dataset_state = {}
+_dataset_sync_lock = threading.RLock()
+
+
+def sync_datasets():
+    """
+    Apply dataset files added, changed or removed since they were last
+    loaded. Only the affected files are parsed, and the delta is swapped in
+    with one replace_sources() call, so concurrent searches see either the
+    old or the new records, never a half-applied change.
+    Returns the ids of the datasets that changed.
+    """
+    with _dataset_sync_lock:
+        current = {}
+        for path in _dataset_source_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            current[path] = (stat.st_mtime_ns, stat.st_size)
+        changed = [path for path, fingerprint in current.items() if _dataset_state.get(path) != fingerprint]
+        removed = [path for path in _dataset_state if path not in current]
+        if not changed and not removed:
+            return []
+
+        compiled = []
+        for path in changed:
+            dataset_cache.invalidate(path)
+            try:
+                compiled.append(_compile_dataset(path))
+            except Exception as exc:
+                print(f"Could not load dataset from {path}: {exc}")
+        removed_ids = [_dataset_id(path) for path in removed]
+
+        # Untagged when a file failed, so other workers sharing the store retry it themselves
+        key = startup_snapshots.key(list(current)) if len(compiled) == len(changed) else None
+        if key is None or repository.group_tag(OFFICIAL_GROUP) != key:
+            repository.replace_sources(
+                OFFICIAL_GROUP,
+                {ds['dataset']['id']: ds['items'] for ds in compiled},
+                removed=removed_ids,
+                tag=key
+            )
+            known = {ds['id']: ds for ds in repository.datasets()}
+            for ds in compiled:
+                dataset = ds['dataset']
+                if dataset['id'] in known:
+                    dataset = dict(known[dataset['id']], count=dataset['count'], path=dataset['path'])
+                repository.save_dataset(dataset)
+            for dataset_id in removed_ids:
+                repository.remove_dataset(dataset_id)
+
+        for path in removed:
+            del _dataset_state[path]
+            dataset_cache.invalidate(path)
+        for ds in compiled:
+            _dataset_state[ds['dataset']['path']] = ds['fingerprint']
+        changed_ids = [ds['dataset']['id'] for ds in compiled] + removed_ids
+        print(f"Reloaded datasets: {', '.join(changed_ids)}")
+        _found_items_changed()
+        return changed_ids
+
+
+dataset_watcher = None
+
+
+def _start_dataset_watcher():
+    global dataset_watcher
+    if app.config['DATASET_WATCH'] == 'off':
+        return
+    dataset_watcher = DirectoryWatcher(
+        DATASETS_DIR,
+        sync_datasets,
+        mode=app.config['DATASET_WATCH'],
+        interval=app.config['DATASET_WATCH_INTERVAL']
+    )
+    dataset_watcher.start()
 
-    if loaded_datasets:
-        datasets.clear()
-        datasets.extend(loaded_datasets)
-        _annotate_specific_items()
 
+_startup_lock = threading.Lock()
+_startup_loaded = False
 
-def _find_dataset_path(dataset_id):
-    for ds in dataset_files:
-        if ds.get('id') == dataset_id:
-            return ds.get('path')
-    return None
 
+@app.before_request
+def _ensure_startup_data():
+    """
+    Load data on the first request instead of at import time, so worker
+    processes start accepting connections immediately.
+    """
+    global _startup_loaded
+    if _startup_loaded or request.endpoint == 'static':
+        return
+    with _startup_lock:
+        if not _startup_loaded:
+            load_startup_data()
+            _found_items_changed()
+            # Started here rather than at import so each forked worker gets its own thread
+            _start_dataset_watcher()
+            _startup_loaded = True
 
-def _load_items_from_file(file_path):
-    with open(file_path, 'rb') as f:
-        raw = f.read()
-    items, _ = parse_dataset_bytes(raw, file_path)
-    return items
+
+def _find_dataset_path(dataset_id):
+    return repository.dataset_path(dataset_id)
 
 
-def _all_dataset_items():
-    combined = []
-    for ds in dataset_files:
+def _iter_dataset_entries():
+    """Lazily yield (dataset_id, DatasetEntry) for every readable dataset file."""
+    for dataset_id, path in repository.dataset_files():
         try:
-            combined.extend(_load_items_from_file(ds['path']))
+            yield dataset_id, dataset_cache.load(path)
         except Exception as exc:
-            print(f"Could not load dataset {ds.get('id')}: {exc}")
-    return combined
+            print(f"Could not load dataset {dataset_id}: {exc}")
 
 
-def _dataset_items_by_city():
-    grouped = {}
-    for ds in dataset_files:
+def _dataset_fingerprints():
+    """(dataset_id, (mtime_ns, size)) for every dataset file, without parsing them."""
+    fingerprints = []
+    for dataset_id, path in repository.dataset_files():
         try:
-            grouped[ds['id']] = _load_items_from_file(ds['path'])
-        except Exception as exc:
-            print(f"Could not load dataset {ds.get('id')}: {exc}")
-    return grouped
+            fingerprints.append((dataset_id, dataset_cache.fingerprint(path)))
+        except OSError:
+            continue
+    return fingerprints
 
 
 @app.route('/')
@@ -283,85 +569,227 @@ def index():
     return render_template('index.html', categories=CATEGORIES)
 
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance in meters between two lat/lng points."""
-    R = 6371000  # Earth radius in meters
-    phi1, phi2 = radians(lat1), radians(lat2)
-    dphi = radians(lat2 - lat1)
-    dlambda = radians(lon2 - lon1)
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_SORTS = ('', 'date', 'distance', 'relevance')
+# Circles are snapped to ~1 m so redrawn or shared circles hit the same cached results
+CIRCLE_DIGITS = 5
+
+
+def _rounded(value, digits):
+    return round(value, digits) if value is not None else None
 
-    a = sin(dphi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(dlambda / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+
+def _search_params(args):
+    """Read search filters, sorting and paging from request args."""
+    per_page = args.get('per_page', SEARCH_PAGE_SIZE, type=int) or SEARCH_PAGE_SIZE
+    per_page = max(1, min(per_page, SEARCH_MAX_PAGE_SIZE))
+    offset = args.get('offset', type=int)
+    if offset is None:
+        offset = (max(args.get('page', 1, type=int) or 1, 1) - 1) * per_page
+    sort = args.get('sort', '')
+    fuzzy = args.get('fuzzy') in ('1', 'true', 'on')
+    if fuzzy and not sort:
+        # Typo matches are only useful best first
+        sort = 'relevance'
+    return {
+        'query': args.get('q', '').lower(),
+        'category': args.get('category', ''),
+        'location': args.get('location', '').lower(),
+        'date': args.get('date', ''),
+        'city': args.get('city', ''),
+        'date_from': args.get('date_from', ''),
+        'date_to': args.get('date_to', ''),
+        'fuzzy': fuzzy,
+        'circle_lat': _rounded(args.get('circle_lat', type=float), CIRCLE_DIGITS),
+        'circle_lng': _rounded(args.get('circle_lng', type=float), CIRCLE_DIGITS),
+        'circle_radius': _rounded(args.get('circle_radius', type=float), 0),
+        'sort': sort if sort in SEARCH_SORTS else '',
+        'offset': max(offset, 0),
+        'limit': per_page,
+    }
 
 
-def within_circle(item, center_lat, center_lng, radius):
-    if item.get('location_lat') is None or item.get('location_lng') is None:
-        return False
-    distance = haversine_distance(center_lat, center_lng, item['location_lat'], item['location_lng'])
-    return distance <= radius
+def _filters(params):
+    """The non-spatial filters of `params`, as accepted by the repository."""
+    return {key: params[key] for key in FILTER_KEYS}
+
+
+def _search_key(params):
+    """`params` reduced to what decides the results, with text folded the way the indexes compare it."""
+    return (
+        fold_text(params['query']), params['category'], fold_text(params['location']), params['date'],
+        normalize_city(params['city']), params['date_from'], params['date_to'], params['fuzzy'],
+        params['circle_lat'], params['circle_lng'], params['circle_radius'],
+        params['sort'], params['offset'], params['limit'],
+    )
+
+
+def _run_search(params, version):
+    """
+    Resolve filters through the repository and return one page of results:
+    (page_items, total, {item_id: distance}). Pages are cached per
+    normalized query for the given repository `version`.
+    """
+    center = None
+    if params['circle_lat'] is not None and params['circle_lng'] is not None:
+        center = (params['circle_lat'], params['circle_lng'])
+    return search_results.get(_search_key(params), version, lambda: repository.search(
+        _filters(params),
+        center=center,
+        radius=params['circle_radius'],
+        sort=params['sort'],
+        offset=params['offset'],
+        limit=params['limit'],
+    ))
+
+
+def _item_cards(params, page_items, version):
+    """Rendered result cards of one page, cached alongside the page itself."""
+    def render():
+        with stage('search.render_cards'):
+            return render_template('_item_cards.html', items=page_items)
+    return Markup(search_fragments.get(_search_key(params), version, render))
 
 
 @app.route('/search')
 def search():
-    query = request.args.get('q', '').lower()
-    category = request.args.get('category', '')
-    location = request.args.get('location', '').lower()
-    date = request.args.get('date', '')
-    circle_lat = request.args.get('circle_lat', type=float)
-    circle_lng = request.args.get('circle_lng', type=float)
-    circle_radius = request.args.get('circle_radius', type=float)
-
-    # Combine citizen-reported items with official dataset items
-    filtered_items = items + official_items
-
-    if query:
-        filtered_items = [i for i in filtered_items if query in i['name'].lower() or query in i['description'].lower()]
-    
-    if category:
-        filtered_items = [i for i in filtered_items if i['category'] == category]
-    
-    if location:
-        filtered_items = [i for i in filtered_items if location in i['location'].lower()]
-    
-    if date:
-        filtered_items = [i for i in filtered_items if i['date'] == date]
-
-    # Prepare map markers before spatial narrowing so the map shows the broader distribution
-    map_points = [
-        {
-            'lat': i['location_lat'],
-            'lng': i['location_lng'],
-            'name': i['name'],
-            'category': i['category'],
-            'date': i['date']
-        }
-        for i in filtered_items
-        if i.get('location_lat') is not None and i.get('location_lng') is not None
-    ]
-
-    if circle_lat is not None and circle_lng is not None and circle_radius:
-        filtered_items = [
-            i for i in filtered_items
-            if within_circle(i, circle_lat, circle_lng, circle_radius)
-        ]
+    params = _search_params(request.args)
+    # Read once, so the page and its cards come from the same repository state
+    version = repository.version
+    page_items, total, _ = _run_search(params, version)
 
     circle_params = {
-        'lat': circle_lat,
-        'lng': circle_lng,
-        'radius': circle_radius
+        'lat': params['circle_lat'],
+        'lng': params['circle_lng'],
+        'radius': params['circle_radius']
     }
 
-    return render_template(
-        'search.html',
-        items=filtered_items,
-        categories=CATEGORIES,
-        map_points=map_points,
-        circle_params=circle_params
-    )
+    next_offset = params['offset'] + len(page_items)
+    with stage('search.render'):
+        return render_template(
+            'search.html',
+            items=page_items,
+            cards=_item_cards(params, page_items, version),
+            total=total,
+            next_offset=next_offset if next_offset < total else None,
+            sort=params['sort'],
+            fuzzy=params['fuzzy'],
+            categories=CATEGORIES,
+            circle_params=circle_params
+        )
+
+
+@app.route('/api/search')
+def api_search():
+    """
+    JSON search with the same filters as /search plus sort, offset/page and
+    per_page. With render=cards the page is also returned as HTML cards so
+    the search page can append results incrementally.
+    """
+    params = _search_params(request.args)
+    version = repository.version
+    page_items, total, distances = _run_search(params, version)
+
+    results = []
+    for item in page_items:
+        result = dict(item)
+        if item['id'] in distances:
+            result['distance'] = round(distances[item['id']], 1)
+        results.append(result)
+
+    next_offset = params['offset'] + len(page_items)
+    payload = {
+        'items': results,
+        'total': total,
+        'offset': params['offset'],
+        'limit': params['limit'],
+        'next_offset': next_offset if next_offset < total else None,
+        'sort': params['sort'],
+        'fuzzy': params['fuzzy'],
+    }
+    if request.args.get('render') == 'cards':
+        payload['html'] = str(_item_cards(params, page_items, version))
+    return jsonify(payload)
+
+
+def _parse_bbox(value):
+    """Parse Leaflet's 'west,south,east,north' bbox into (min_lat, min_lng, max_lat, max_lng)."""
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    return south, west, north, east
+
+
+def _has_filters(params):
+    # 'fuzzy' only changes how the query matches
+    return any(params[key] for key in FILTER_KEYS if key != 'fuzzy')
+
+
+@app.route('/api/suggest')
+def api_suggest():
+    """
+    Completions for the search box: the most common item names,
+    categories, cities and streets with a word starting with `q`. Answered
+    from a prebuilt index so it can be called on every keystroke.
+    """
+    query = request.args.get('q', '')[:100]
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, limit)
+    with stage('suggest.lookup'):
+        suggestions = suggester.suggest(query, limit)
+    response = jsonify({'query': query, 'suggestions': suggestions, 'ready': suggester.ready})
+    if suggester.ready:
+        response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+@app.route('/api/map/points')
+def api_map_points():
+    """
+    Map markers for the viewport: `bbox` (west,south,east,north) and `zoom`
+    plus the /search filters. Points are aggregated into grid clusters so
+    the response size depends on the viewport, not on the number of items.
+    The circle filter is ignored so the map keeps showing the broader distribution.
+    """
+    params = _search_params(request.args)
+    zoom = clamp_zoom(request.args.get('zoom', 12, type=int))
+    bbox = _parse_bbox(request.args.get('bbox')) or (-90.0, -180.0, 90.0, 180.0)
+
+    filters = _filters(params) if _has_filters(params) else None
+    with stage('map.clusters'):
+        if filters:
+            cells = map_clusterer.aggregate(repository.points(filters, bbox), zoom)
+        else:
+            cells = map_clusterer.level(zoom, repository.version, repository.points)
+
+    clusters = []
+    with stage('map.visible'):
+        for lat, lng, count, item_id in map_clusterer.visible(cells, zoom, bbox):
+            cluster = {'lat': lat, 'lng': lng, 'count': count}
+            item = repository.get(item_id) if count == 1 else None
+            if item:
+                cluster.update(name=item['name'], category=item['category'], date=item['date'])
+            clusters.append(cluster)
+
+    payload = {'zoom': zoom, 'clusters': clusters}
+    if request.args.get('bounds'):
+        points = repository.points(filters)
+        if points:
+            lats = [lat for _, lat, _ in points]
+            lngs = [lng for _, _, lng in points]
+            payload['bounds'] = [[min(lats), min(lngs)], [max(lats), max(lngs)]]
+    return jsonify(payload)
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
+    """
+    Return the cached analysis for an already seen image, otherwise queue it
+    and return a job id to poll at /analyze/<job_id>. Uploads of an image
+    that is already being analyzed share that job.
+    """
     if 'image' not in request.files:
         return jsonify({'error': 'No image part'}), 400
     
@@ -370,12 +798,179 @@ def analyze():
         return jsonify({'error': 'No selected file'}), 400
     
     if file:
-        # In a real app, we might save the file or process it in memory
-        # For this mock, we just pass the filename or stream to the mock service
-        result = analyze_image(file)
-        # Add MD5 checksum to the response
-        result['md5'] = calculate_md5(file.stream)
-        return jsonify(result)
+        # Read the upload now: the request stream is gone once the worker runs
+        data = file.stream.read()
+        digest = hashlib.md5(data).hexdigest()
+        cached = analysis_cache.get(digest)
+        if cached is not None:
+            return jsonify({'status': 'done', 'cached': True, 'result': cached})
+
+        try:
+            job_id = analysis_jobs.submit(
+                analyze_image_bytes, data, file.filename,
+                key=digest,
+                on_result=lambda result: analysis_cache.put(digest, result)
+            )
+        except QueueFullError:
+            response = jsonify({'error': 'Analysis queue is full, try again shortly'})
+            response.headers['Retry-After'] = '2'
+            return response, 429
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('analyze_status', job_id=job_id)
+        }), 202
+
+
+@app.route('/analyze/<job_id>')
+def analyze_status(job_id):
+    status = analysis_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    status['job_id'] = job_id
+    return jsonify(status)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.heic')
+# Largest single image accepted from a zip archive
+MAX_ARCHIVE_IMAGE_BYTES = 32 * 1024 * 1024
+
+
+def _batch_uploads(limit, max_bytes):
+    """
+    (filename, bytes) pairs from the multipart 'images' fields; uploaded .zip
+    archives contribute every image file they contain. Raises ValueError for
+    more than `limit` images or more than `max_bytes` of image data, checked
+    against the sizes declared in the archive before any member is read
+    (zipfile never reads past the declared size).
+    """
+    uploads = []
+    total = 0
+    for file in request.files.getlist('images'):
+        if not file or not file.filename:
+            continue
+        if file.filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(file.stream) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    if info.file_size > MAX_ARCHIVE_IMAGE_BYTES:
+                        raise ValueError(f"{info.filename} is too large")
+                    if len(uploads) >= limit:
+                        raise ValueError(f"At most {limit} images per batch")
+                    total += info.file_size
+                    if total > max_bytes:
+                        raise ValueError(f"At most {max_bytes // (1024 * 1024)} MB of images per batch")
+                    uploads.append((info.filename, archive.read(info)))
+        else:
+            data = file.stream.read()
+            total += len(data)
+            if total > max_bytes:
+                raise ValueError(f"At most {max_bytes // (1024 * 1024)} MB of images per batch")
+            uploads.append((file.filename, data))
+        if len(uploads) > limit:
+            raise ValueError(f"At most {limit} images per batch")
+    return uploads
+
+
+def _batch_status(batch_id, batch):
+    """Per-file results of a batch, folding finished job results into the batch."""
+    results = {}
+    done = True
+    folded = False
+    with analysis_batches_lock:
+        for filename, digest in batch['files']:
+            entry = {'md5': digest}
+            if digest in batch['results']:
+                entry.update(status='done', result=batch['results'][digest])
+            else:
+                status = analysis_jobs.status(batch['jobs'].get(digest, ''))
+                if status is None:
+                    entry['status'] = 'expired'
+                elif status['status'] == 'done':
+                    batch['results'].update(status['result'])
+                    folded = True
+                    entry.update(status='done', result=status['result'][digest])
+                else:
+                    entry.update(status)
+                    done = done and status['status'] == 'failed'
+            results[filename] = entry
+        if folded:
+            analysis_batches.put(batch_id, batch)
+    return {'batch_id': batch_id, 'status': 'done' if done else 'running', 'results': results}
+
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyze many images at once (multipart 'images' fields and/or .zip
+    archives). Cached digests are answered immediately; the rest are grouped
+    into ANALYSIS_BATCH_SIZE chunks, each one analyze_images() call on the
+    worker pool. Poll /analyze/batch/<batch_id> for per-file results.
+    """
+    try:
+        uploads = _batch_uploads(app.config['ANALYSIS_BATCH_MAX_IMAGES'], app.config['ANALYSIS_BATCH_MAX_MB'] * 1024 * 1024)
+    except (zipfile.BadZipFile, ValueError) as exc:
+        return jsonify({'error': str(exc)}), 400
+    if not uploads:
+        return jsonify({'error': 'No images'}), 400
+
+    files = []
+    seen_names = {}
+    results = {}
+    pending = {}
+    for filename, data in uploads:
+        digest = hashlib.md5(data).hexdigest()
+        # Keep every file addressable even if names repeat
+        seen_names[filename] = seen_names.get(filename, 0) + 1
+        if seen_names[filename] > 1:
+            filename = f"{filename}#{seen_names[filename]}"
+        files.append((filename, digest))
+        if digest in results or digest in pending:
+            continue
+        cached = analysis_cache.get(digest)
+        if cached is not None:
+            results[digest] = cached
+        else:
+            pending[digest] = (data, filename)
+
+    batch_size = app.config['ANALYSIS_BATCH_SIZE']
+    entries = list(pending.items())
+    chunks = [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
+    if len(chunks) > analysis_jobs.available:
+        response = jsonify({'error': 'Analysis queue is full, try again shortly'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+
+    def cache_results(chunk_results):
+        for digest, result in chunk_results.items():
+            analysis_cache.put(digest, result)
+
+    jobs = {}
+    for chunk in chunks:
+        try:
+            job_id = analysis_jobs.submit(analyze_images_bytes, [entry for _, entry in chunk], on_result=cache_results)
+        except QueueFullError:
+            break  # remaining files are reported as expired
+        for digest, _ in chunk:
+            jobs[digest] = job_id
+
+    batch_id = uuid.uuid4().hex
+    batch = {'files': files, 'results': results, 'jobs': jobs}
+    with analysis_batches_lock:
+        analysis_batches.put(batch_id, batch)
+
+    payload = _batch_status(batch_id, batch)
+    payload['status_url'] = url_for('analyze_batch_status', batch_id=batch_id)
+    return jsonify(payload), 202 if payload['status'] != 'done' else 200
+
+
+@app.route('/analyze/batch/<batch_id>')
+def analyze_batch_status(batch_id):
+    batch = analysis_batches.get(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Unknown batch'}), 404
+    return jsonify(_batch_status(batch_id, batch))
+
 
 @app.route('/report', methods=['POST'])
 def report():
@@ -385,40 +980,84 @@ def report():
     if not data or not data.get('name') or not data.get('contact'):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    # Create item record
-    item = {
-        'id': len(items) + 1,
-        'name': data.get('name'),
-        'category': data.get('category'),
-        'date': data.get('date'),
-        'location': data.get('location'),
-        'description': data.get('description'),
-        'contact': data.get('contact'),
-        'status': 'lost'
-    }
+    # Create item record; the repository assigns its id
+    item = ItemRecord(
+        name=data.get('name'),
+        category=data.get('category'),
+        date=data.get('date'),
+        location=data.get('location'),
+        description=data.get('description'),
+        contact=data.get('contact'),
+        status='lost'
+    )
     
-    items.append(item)
+    repository.add(item, REPORT_GROUP)
     print(f"New Item Reported: {item}") # Log to console for verification
-    
-    return jsonify({'success': True, 'message': 'Item reported successfully!', 'id': item['id']})
-
-# In-memory storage for datasets (Official Portal)
-datasets = [
+    try:
+        matching_jobs.submit(match_engine.match, item)
+    except QueueFullError:
+        _schedule_rematch()  # coalesces with a pending rematch, which covers this report too
+
+    return jsonify({
+        'success': True,
+        'message': 'Item reported successfully!',
+        'id': item['id'],
+        'matches_url': url_for('report_matches', report_id=item['id'])
+    })
+
+
+@app.route('/api/reports/<int:report_id>/matches')
+def report_matches(report_id):
+    """Found items matching a citizen report, best first; 'pending' until it was first matched."""
+    report_item = repository.get(report_id)
+    if report_item is None or not _is_report(report_item):
+        return jsonify({'error': 'Unknown report'}), 404
+    ranked = repository.matches(report_id)
+    if ranked is None:
+        return jsonify({'report_id': report_id, 'status': 'pending', 'matches': []}), 202
+
+    matches = []
+    for match in ranked:
+        item = repository.get(match['item_id'])
+        if item is not None:  # its dataset may have been replaced since
+            matches.append({'score': match['score'], 'details': match['details'], 'item': dict(item)})
+    return jsonify({'report_id': report_id, 'status': 'ready', 'matches': matches})
+
+# Datasets listed on the Official Portal until dataset files are loaded
+DEFAULT_DATASETS = [
     {'id': 'poznan', 'title': 'Rzeczy znalezione - Poznań', 'date': '2023-11-15', 'count': 10, 'status': 'Opublikowany'},
     {'id': 'warszawa', 'title': 'Rzeczy znalezione - Warszawa', 'date': '2023-11-12', 'count': 10, 'status': 'Opublikowany'},
     {'id': 'bydgoszcz', 'title': 'Rzeczy znalezione - Bydgoszcz', 'date': '2023-11-09', 'count': 10, 'status': 'Opublikowany'},
     {'id': 'wroclaw', 'title': 'Rzeczy znalezione - Wrocław', 'date': '2023-11-05', 'count': 10, 'status': 'Opublikowany'}
 ]
 
-# Global storage for the most recently uploaded CSV items
-uploaded_items = []
+def _uploaded_items():
+    """
+    Rows of the most recent upload, or the edits saved for them, as every
+    worker sees them; all dataset rows until something is uploaded.
+    """
+    state = shared_state.get('uploaded_items')
+    if state is not None and 'upload_id' in state:
+        try:
+            return list(chunked_uploads.rows(state['upload_id']))
+        except UploadError:
+            state = None  # the upload expired
+    if state is None:
+        return [row for _, entry in _iter_dataset_entries() for row in entry.items]
+    return state['items']
+
+
+def _set_uploaded_items(items=None, upload_id=None):
+    """Remember edited `items`, or point at a finalized upload's rows instead of copying them."""
+    shared_state.put('uploaded_items', {'upload_id': upload_id} if upload_id else {'items': items})
 
-# Load official datasets after globals are declared
-load_official_datasets()
+
+if not repository.datasets():
+    repository.replace_datasets(DEFAULT_DATASETS)
 
 @app.route('/urzad')
 def urzad_dashboard():
-    return render_template('official/dashboard.html', datasets=datasets)
+    return render_template('official/dashboard.html', datasets=repository.datasets())
 
 @app.route('/urzad/upload')
 def urzad_upload():
@@ -434,13 +1073,10 @@ def upload_csv():
         return jsonify({'error': 'No selected file'}), 400
     
     if file:
-        raw_bytes = file.stream.read()
-        md5_checksum = hashlib.md5(raw_bytes).hexdigest()
-        items, errors = parse_dataset_bytes(raw_bytes, file.filename)
+        items, errors, md5_checksum = dataset_parser.parse_stream(file.stream, file.filename)
 
         # Store parsed items for editing later
-        uploaded_items.clear()
-        uploaded_items.extend(items)
+        _set_uploaded_items(items)
         
         return jsonify({
             'success': True,
@@ -450,56 +1086,254 @@ def upload_csv():
             'md5': md5_checksum
         })
 
+def _upload_error(exc):
+    if isinstance(exc, UnknownUploadError):
+        return jsonify({'error': str(exc)}), 404
+    if isinstance(exc, OffsetMismatchError):
+        return jsonify({'error': str(exc), 'offset': exc.offset}), 409
+    return jsonify({'error': str(exc)}), 400
+
+
+def _upload_status(meta):
+    payload = {
+        'upload_id': meta['id'],
+        'filename': meta['filename'],
+        'size': meta['size'],
+        'offset': meta['offset'],
+        'status': meta['status'],
+        'upload_url': url_for('upload_chunk', upload_id=meta['id']),
+        'chunk_size': app.config['UPLOAD_CHUNK_MB'] * 1024 * 1024,
+    }
+    if meta['status'] == 'done':
+        payload.update(
+            count=meta['count'], error_count=meta['error_count'], md5=meta['md5'],
+            items_url=url_for('upload_preview', upload_id=meta['id'], kind='items'),
+            errors_url=url_for('upload_preview', upload_id=meta['id'], kind='errors'),
+        )
+    return payload
+
+
+@app.route('/urzad/uploads', methods=['POST'])
+def upload_init():
+    """
+    Start a resumable upload: JSON {filename, size, md5 (optional)}. Send the
+    file with PUT <upload_url>?offset=N in chunks of any size, then POST
+    <upload_url>/finalize. GET <upload_url> tells where to resume.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename') or ''
+    if os.path.splitext(filename.lower())[1] not in ('.csv', '.json', '.jsonl', '.ndjson'):
+        return jsonify({'error': 'Unsupported file type'}), 400
+    try:
+        meta = chunked_uploads.create(filename, data.get('size'), data.get('md5'))
+    except UploadError as exc:
+        return _upload_error(exc)
+    return jsonify(_upload_status(meta)), 201
+
+
+@app.route('/urzad/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def upload_chunk(upload_id):
+    try:
+        if request.method == 'PUT':
+            offset = request.args.get('offset', type=int)
+            if offset is None:
+                return jsonify({'error': 'offset is required'}), 400
+            chunked_uploads.append(upload_id, offset, request.stream)
+        elif request.method == 'DELETE':
+            chunked_uploads.discard(upload_id)
+            return jsonify({'success': True})
+        return jsonify(_upload_status(chunked_uploads.status(upload_id)))
+    except UploadError as exc:
+        return _upload_error(exc)
+
+
+@app.route('/urzad/uploads/<upload_id>/finalize', methods=['POST'])
+def upload_finalize(upload_id):
+    """
+    Parse a completely uploaded file in one streaming pass that also
+    computes its MD5, and check that against the md5 sent here or at init.
+    Returns a summary with the first rows and errors; the rows become the
+    wizard's uploaded items.
+    """
+    expected = ((request.get_json(silent=True) or {}).get('md5') or '').lower()
+    try:
+        meta = chunked_uploads.status(upload_id)
+        expected = expected or meta['md5']
+        with chunked_uploads.open(upload_id) as f:
+            items, errors, md5_checksum = dataset_parser.parse_stream(f, meta['filename'])
+    except UploadError as exc:
+        return _upload_error(exc)
+    if expected and expected != md5_checksum:
+        chunked_uploads.discard(upload_id)
+        return jsonify({'error': 'MD5 mismatch, upload the file again', 'md5': md5_checksum, 'expected': expected}), 422
+
+    meta = chunked_uploads.complete(upload_id, md5_checksum, items, errors)
+    _set_uploaded_items(upload_id=upload_id)
+
+    payload = _upload_status(meta)
+    payload.update(success=True, items=items[:UPLOAD_PREVIEW_ROWS], errors=errors[:UPLOAD_PREVIEW_ROWS])
+    return jsonify(payload)
+
+
+@app.route('/urzad/uploads/<upload_id>/<any(items, errors):kind>')
+def upload_preview(upload_id, kind):
+    """A page of a finalized upload's valid rows or errors (?offset=&limit=, at most 500)."""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    try:
+        rows, total = chunked_uploads.page(upload_id, kind, offset, limit)
+    except UploadError as exc:
+        return _upload_error(exc)
+    return jsonify({kind: rows, 'total': total, 'offset': offset, 'limit': limit})
+
+
 @app.route('/urzad/publish', methods=['POST'])
 def publish_dataset():
-    data = request.json
+    """
+    Publish a dataset: JSON {title, description, upload_id} takes the rows of
+    a finalized chunked upload straight from the server's copy, so they
+    never travel back through the browser; API clients may send the rows
+    as `items` instead.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('upload_id'):
+        try:
+            count = chunked_uploads.status(data['upload_id']).get('count', 0)
+            items_to_save = chunked_uploads.rows(data['upload_id'])
+        except UploadError as exc:
+            return _upload_error(exc)
+    else:
+        items_to_save = data.get('items', [])
+        count = len(items_to_save)
     # Mock integration with dane.gov.pl API
     # In reality: requests.post('https://api.dane.gov.pl/datasets', json=data)
     
     dataset_title = data.get('title') or 'Nowy zbiór danych'
     dataset_id = _slugify(dataset_title)
-    data_dir = os.path.join(os.path.dirname(__file__), 'datasets')
-    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(DATASETS_DIR, exist_ok=True)
 
     # Persist items as JSON for download/export
-    items_to_save = data.get('items', [])
-    dataset_path = os.path.join(data_dir, f"{dataset_id}.json")
+    dataset_path = os.path.join(DATASETS_DIR, f"{dataset_id}.json")
+    # Written next to the target and renamed over it, so the watcher, other workers and
+    # concurrent downloads only ever see the old or the new file, never a partial one
+    partial_path = os.path.join(DATASETS_DIR, f".{dataset_id}.json.{uuid.uuid4().hex}.tmp")
     try:
-        with open(dataset_path, 'w', encoding='utf-8') as f:
-            json.dump(items_to_save, f, ensure_ascii=False, indent=2)
-        # refresh dataset_files entry
-        dataset_files.insert(0, {'id': dataset_id, 'path': dataset_path})
-        # update official search items in-memory
-        official_items.extend(_build_official_items(items_to_save))
-        _annotate_specific_items()
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            f.writelines(iter_json_array(items_to_save))
+        os.replace(partial_path, dataset_path)
     except Exception as exc:
+        dataset_path = None
         print(f"Could not save dataset file: {exc}")
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    if dataset_path is not None:
+        try:
+            # make the records searchable right away, replacing an earlier version of this dataset
+            sync_datasets()
+        except Exception as exc:
+            # The file is in place and stays downloadable; the watcher or the next sync loads it
+            print(f"Could not load published dataset {dataset_id}: {exc}")
 
     new_dataset = {
         'id': dataset_id,
         'title': dataset_title,
         'date': datetime.now().strftime('%Y-%m-%d'),
-        'count': len(items_to_save),
+        'count': count,
         'status': 'Opublikowany'
     }
-    datasets.insert(0, new_dataset) # Add to top of list
+    repository.save_dataset(dict(new_dataset, path=dataset_path)) # Add to top of list (sync_datasets() may have listed it already)
     
     print(f"PUBLISHING TO DANE.GOV.PL: {new_dataset}")
     
     return jsonify({'success': True, 'message': 'Zbiór danych został opublikowany w portalu dane.gov.pl'})
 
 # Dataset downloads
+def _json_download(cache_key, etag, last_modified, build, filename):
+    """
+    Serve a cached JSON payload with ETag/Last-Modified validators. Matching
+    If-None-Match / If-Modified-Since requests get a 304 before the payload
+    is built or even looked up.
+    """
+    response = Response(
+        mimetype='application/json',
+        headers={'Content-Disposition': f'attachment; filename=\"{filename}\"'}
+    )
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    def timed_build():
+        with stage('export.dataset'):
+            return build()
+
+    response.set_data(dataset_cache.payload(cache_key, etag, timed_build))
+    return response
+
+
+def _streamed_download(chunks_factory, mimetype, filename, stage_name):
+    """
+    Stream an export built from all dataset files. Validators come from file
+    fingerprints only, so 304 responses never parse or serialize anything;
+    otherwise records are serialized one dataset at a time and compressed on
+    the fly when the client accepts gzip or br. Time spent producing the
+    chunks is recorded as stage `stage_name`.
+    """
+    fingerprints = _dataset_fingerprints()
+    etag = DatasetCache.combined_etag(fingerprints)
+    last_modified = max((http_last_modified(mtime_ns) for _, (mtime_ns, _) in fingerprints), default=None)
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding:
+        etag = f"{etag}-{encoding}"
+
+    response = Response(
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=\"{filename}\"'}
+    )
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+    if encoding:
+        response.content_encoding = encoding
+    response.response = timed_iter(stage_name, encode_stream(chunks_factory(), encoding))
+    return response
+
+
+def _all_export_items():
+    for _, entry in _iter_dataset_entries():
+        yield from entry.items
+
+
 @app.route('/urzad/download/dataset/<dataset_id>.json')
 def download_dataset(dataset_id):
     file_path = _find_dataset_path(dataset_id)
-    if file_path and os.path.isfile(file_path):
-        items = _load_items_from_file(file_path)
-    elif uploaded_items:
-        # Fallback to in-memory uploaded items if not yet saved to disk
-        items = uploaded_items
-    else:
+    try:
+        entry = dataset_cache.load(file_path) if file_path else None
+    except OSError:
+        entry = None
+
+    if entry is not None:
+        return _json_download(
+            ('dataset', dataset_id),
+            entry.etag,
+            entry.last_modified,
+            lambda: json.dumps(entry.items, ensure_ascii=False, indent=2),
+            f'{dataset_id}.json'
+        )
+    uploaded_items = _uploaded_items()
+    if not uploaded_items:
         abort(404)
-    payload = json.dumps(items, ensure_ascii=False, indent=2)
+    # Fallback to the uploaded items if not yet saved to disk
+    with stage('export.dataset'):
+        payload = json.dumps(uploaded_items, ensure_ascii=False, indent=2)
     return Response(
         payload,
         mimetype='application/json',
@@ -509,23 +1343,41 @@ def download_dataset(dataset_id):
 
 @app.route('/urzad/download/by_city.json')
 def download_by_city():
-    grouped = _dataset_items_by_city()
-    payload = json.dumps(grouped, ensure_ascii=False, indent=2)
-    return Response(
-        payload,
-        mimetype='application/json',
-        headers={'Content-Disposition': 'attachment; filename=\"datasets_by_city.json\"'}
+    return _streamed_download(
+        lambda: iter_json_object((dataset_id, entry.items) for dataset_id, entry in _iter_dataset_entries()),
+        'application/json',
+        'datasets_by_city.json',
+        'export.by_city_json'
     )
 
 
 @app.route('/urzad/download/all.json')
 def download_all():
-    items = _all_dataset_items()
-    payload = json.dumps(items, ensure_ascii=False, indent=2)
-    return Response(
-        payload,
-        mimetype='application/json',
-        headers={'Content-Disposition': 'attachment; filename=\"datasets_all.json\"'}
+    return _streamed_download(
+        lambda: iter_json_array(_all_export_items()),
+        'application/json',
+        'datasets_all.json',
+        'export.all_json'
+    )
+
+
+@app.route('/urzad/download/all.ndjson')
+def download_all_ndjson():
+    return _streamed_download(
+        lambda: iter_ndjson(_all_export_items()),
+        'application/x-ndjson',
+        'datasets_all.ndjson',
+        'export.all_ndjson'
+    )
+
+
+@app.route('/urzad/download/all.csv')
+def download_all_csv():
+    return _streamed_download(
+        lambda: iter_csv(_all_export_items()),
+        'text/csv',
+        'datasets_all.csv',
+        'export.all_csv'
     )
 
 # JSON Schema exposure
@@ -560,7 +1412,7 @@ def json_schema():
 # Route to display edit page for the uploaded CSV items
 @app.route('/urzad/edit_csv')
 def edit_csv():
-    return render_template('official/edit_csv.html', items=uploaded_items)
+    return render_template('official/edit_csv.html', items=_uploaded_items())
 
 # Route to receive edited items and update stored list
 @app.route('/urzad/save_csv_edits', methods=['POST'])
@@ -601,14 +1453,13 @@ def save_csv_edits():
 
         formatted_items.append(item)
 
-    # Replace the global uploaded_items with edited data
-    uploaded_items.clear()
-    uploaded_items.extend(formatted_items)
+    # Replace the uploaded items with edited data
+    _set_uploaded_items(formatted_items)
     return jsonify({'success': True, 'message': 'Edits saved.'})
 
 @app.route('/urzad/get_uploaded_items')
 def get_uploaded_items():
-    return jsonify({'items': uploaded_items})
+    return jsonify({'items': _uploaded_items()})
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
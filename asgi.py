@@ -0,0 +1,19 @@
+"""
+ASGI entry point for the portal, for servers such as uvicorn or hypercorn:
+
+    uvicorn asgi:application --workers 4
+    python serve.py --server uvicorn --workers 4 --threads 8
+
+Requests are received on the server's event loop and the Flask app runs on
+a pool of WEB_THREADS threads per worker process (see utils.asgi).
+"""
+import os
+
+from app import app
+from utils.asgi import WsgiToAsgi
+
+application = WsgiToAsgi(
+    app,
+    threads=int(os.environ.get('WEB_THREADS', 8)),
+    max_body=app.config['MAX_CONTENT_LENGTH']
+)
@@ -0,0 +1,91 @@
+"""
+Compare the per-item circle filter used by search() before the columnar
+store with the vectorized CoordinateStore / GridIndex paths.
+
+    python benchmarks/bench_haversine.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import geo  # noqa: E402
+from utils.geo import CoordinateStore, haversine_distance  # noqa: E402
+from utils.spatial_index import GridIndex  # noqa: E402
+
+# Rough bounding box of Poland
+LAT_RANGE = (49.0, 54.8)
+LNG_RANGE = (14.1, 24.1)
+# Query around Poznań city centre
+CENTER = (52.40637, 16.92517)
+
+
+def within_circle(item, center_lat, center_lng, radius):
+    """The per-item check search() did before the spatial index, kept here as the baseline."""
+    if item.get('location_lat') is None or item.get('location_lng') is None:
+        return False
+    distance = haversine_distance(center_lat, center_lng, item['location_lat'], item['location_lng'])
+    return distance <= radius
+
+
+def best_of(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run(size, radius, repeat, seed):
+    rng = random.Random(seed)
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(size)]
+    items = [{'location_lat': lat, 'location_lng': lng} for lat, lng in points]
+
+    store = CoordinateStore()
+    grid = GridIndex()
+    for doc_id, (lat, lng) in enumerate(points):
+        store.add(doc_id, lat, lng)
+        grid.add(doc_id, lat, lng)
+
+    lat, lng = CENTER
+    loop_time, loop_hits = best_of(lambda: [i for i in items if within_circle(i, lat, lng, radius)], repeat)
+    batch_time, batch_hits = best_of(lambda: store.within(lat, lng, radius), repeat)
+    sort_time, _ = best_of(lambda: store.nearest(lat, lng, radius), repeat)
+    grid_time, grid_hits = best_of(lambda: grid.within(lat, lng, radius), repeat)
+    assert len(loop_hits) == len(batch_hits) == len(grid_hits)
+
+    return {
+        'size': size,
+        'hits': len(loop_hits),
+        'loop_ms': loop_time * 1000,
+        'batch_ms': batch_time * 1000,
+        'batch_sorted_ms': sort_time * 1000,
+        'grid_ms': grid_time * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--radius', type=float, default=5000.0, help='circle radius in meters')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"NumPy: {'yes' if geo.np is not None else 'no (pure-Python fallback)'}; radius {args.radius:.0f} m")
+    print(f"{'points':>10} {'hits':>7} {'loop ms':>10} {'batch ms':>10} {'sorted ms':>10} {'grid ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        r = run(size, args.radius, args.repeat, args.seed)
+        print(
+            f"{r['size']:>10} {r['hits']:>7} {r['loop_ms']:>10.2f} {r['batch_ms']:>10.2f} "
+            f"{r['batch_sorted_ms']:>10.2f} {r['grid_ms']:>10.2f} {r['loop_ms'] / r['batch_ms']:>7.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Memory held by built items: plain per-item dicts (as before ItemRecord)
+versus slotted ItemRecords with interned low-cardinality strings.
+
+    python benchmarks/bench_item_memory.py --sizes 10000 100000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import records  # noqa: E402
+from utils.datasets import CATEGORIES, build_item_from_row  # noqa: E402
+
+CITIES = ['Poznań', 'Warszawa', 'Bydgoszcz', 'Wrocław', 'Kraków', 'Gdańsk', 'Łódź', 'Szczecin', 'Lublin', 'Toruń']
+STATUSES = ['znaleziony', 'oddane', 'nieznaleziony']
+
+
+def make_rows(size, seed):
+    """Synthetic dataset rows, round-tripped through JSON so every row owns its strings like parsed input does."""
+    rng = random.Random(seed)
+    streets = [f'ul. Ulica {n}' for n in range(300)]
+    offices = [f'Biuro Rzeczy Znalezionych nr {n}' for n in range(20)]
+    lines = []
+    for n in range(size):
+        city = rng.choice(CITIES)
+        lines.append(json.dumps({
+            'nazwa_przedmiotu': f'{rng.choice(CATEGORIES)} #{n}',
+            'kategoria': rng.choice(CATEGORIES),
+            'data_znalezienia': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            'miejsce_znalezienia_miasto': city,
+            'miejsce_znalezienia_ulica': rng.choice(streets),
+            'jednostka_przechowujaca': rng.choice(offices),
+            'kontakt_email': f'biuro{rng.randrange(20)}@{city.lower()}.pl',
+            'status': rng.choice(STATUSES),
+            'opis_szczegolowy': f'Przedmiot numer {n}, znaleziony w okolicy przystanku.',
+            'location_lat': rng.uniform(49.0, 54.8),
+            'location_lng': rng.uniform(14.1, 24.1),
+        }, ensure_ascii=False))
+    return [json.loads(line) for line in lines]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, built
+
+
+def run(size, seed):
+    rows = make_rows(size, seed)
+
+    intern_value = records.intern_value
+    records.intern_value = lambda value: value
+    try:
+        dict_bytes, dicts = measure(lambda: [dict(build_item_from_row(row, n)) for n, row in enumerate(rows)])
+    finally:
+        records.intern_value = intern_value
+    record_bytes, items = measure(lambda: [build_item_from_row(row, n) for n, row in enumerate(rows)])
+    assert dicts == items
+
+    return {
+        'size': size,
+        'dict_mb': dict_bytes / 2 ** 20,
+        'record_mb': record_bytes / 2 ** 20,
+        'dict_per_100k_mb': dict_bytes / 2 ** 20 * 100_000 / size,
+        'record_per_100k_mb': record_bytes / 2 ** 20 * 100_000 / size,
+        'saved': 1 - record_bytes / dict_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'items':>9} {'dict MB':>9} {'record MB':>10} {'dict/100k':>10} {'record/100k':>12} {'saved':>7}")
+    for size in args.sizes:
+        r = run(size, args.seed)
+        print(f"{r['size']:>9} {r['dict_mb']:>9.1f} {r['record_mb']:>10.1f} "
+              f"{r['dict_per_100k_mb']:>10.1f} {r['record_per_100k_mb']:>12.1f} {r['saved']:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Load test the portal under concurrent clients and compare server setups.
+Each configuration (server:workers:threads, see serve.py) is started in a
+scratch directory with its own database and a generated dataset, then hit
+by --clients threads issuing a mix of searches, suggestions, CSV exports
+and image analyses (uploaded and polled until done) for --duration seconds,
+optionally next to --slow-clients that read exports at --slow-kbps. Prints
+throughput and latency percentiles per request kind.
+
+    python benchmarks/bench_load.py --configs werkzeug:1:1 werkzeug:1:16 werkzeug:2:8 --slow-clients 4
+    python benchmarks/bench_load.py --configs gunicorn:2:8 uvicorn:2:8 --rows 50000
+    python benchmarks/bench_load.py --url http://127.0.0.1:8000   # an already running server
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_dataset import write_dataset  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDS = ('telefon', 'portfel', 'klucze', 'plecak', 'telfon', 'czarny', 'dokumenty', 'parasol', 'rower', 'kurtka')
+PREFIXES = ('te', 'por', 'klu', 'war', 'poz', 'mar', 'ple', 'słu')
+CITIES = ('Warszawa', 'Kraków', 'Poznań', 'Gdańsk', '')
+DEFAULT_MIX = 'search=4,api_search=4,suggest=6,export=1,analyze=1'
+ANALYZE_POLL = 0.2
+
+
+def request(base_url, path, data=None, headers=None, timeout=120):
+    """(status, body) of one request; HTTP errors are returned, not raised."""
+    req = urllib.request.Request(base_url + path, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read()
+
+
+def multipart(field, filename, content):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def do_search(base_url, rng):
+    query = urllib.parse.urlencode({'q': rng.choice(WORDS), 'city': rng.choice(CITIES), 'page': rng.randint(1, 3)})
+    return request(base_url, f'/search?{query}')[0]
+
+
+def do_api_search(base_url, rng):
+    query = urllib.parse.urlencode({'q': rng.choice(WORDS), 'fuzzy': rng.choice(('', '1')), 'per_page': 20})
+    return request(base_url, f'/api/search?{query}')[0]
+
+
+def do_suggest(base_url, rng):
+    return request(base_url, '/api/suggest?' + urllib.parse.urlencode({'q': rng.choice(PREFIXES)}))[0]
+
+
+def do_export(base_url, rng):
+    return request(base_url, '/urzad/download/all.csv')[0]
+
+
+def do_analyze(base_url, rng):
+    """Upload a never seen image and poll until its analysis is done; timed end to end."""
+    body, headers = multipart('image', 'zdjecie.jpg', rng.randbytes(2048))
+    status, raw = request(base_url, '/analyze', body, headers)
+    if status != 202:
+        return status
+    status_url = json.loads(raw)['status_url']
+    while True:
+        time.sleep(ANALYZE_POLL)
+        status, raw = request(base_url, status_url)
+        if status != 200 or json.loads(raw)['status'] in ('done', 'failed'):
+            return status
+
+
+SCENARIOS = {
+    'search': do_search,
+    'api_search': do_api_search,
+    'suggest': do_suggest,
+    'export': do_export,
+    'analyze': do_analyze,
+}
+
+
+def slow_reader(base_url, kbps, deadline):
+    """Download exports at `kbps` KB/s until `deadline`, like a client on a slow link."""
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/urzad/download/all.csv', timeout=120) as response:
+                while time.monotonic() < deadline and response.read(8192):
+                    time.sleep(8 / kbps)
+        except OSError:
+            time.sleep(0.1)
+
+
+def run_load(base_url, clients, duration, mix, slow_clients, slow_kbps, seed):
+    """{kind: [latency seconds]} and {kind: error count} for `duration` seconds of load."""
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(number):
+        rng = random.Random(seed * 1000 + number)
+        while time.monotonic() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = SCENARIOS[kind](base_url, rng)
+            except OSError:
+                status = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status is not None and status < 400:
+                    latencies[kind].append(elapsed)
+                else:
+                    errors[kind] += 1
+
+    with ThreadPoolExecutor(max_workers=clients + slow_clients) as pool:
+        for _ in range(slow_clients):
+            pool.submit(slow_reader, base_url, slow_kbps, deadline)
+        for number in range(clients):
+            pool.submit(client, number)
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def report(label, latencies, errors, duration):
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{label}: {total / duration:.1f} req/s")
+    print(f"  {'kind':<12} {'ok':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    summary = {}
+    for kind in sorted(set(latencies) | set(errors)):
+        values = latencies.get(kind) or [0.0]
+        row = {
+            'ok': len(latencies.get(kind, ())),
+            'errors': errors.get(kind, 0),
+            'rps': len(latencies.get(kind, ())) / duration,
+            'p50_ms': statistics.median(values) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'max_ms': max(values) * 1000,
+        }
+        summary[kind] = row
+        print(f"  {kind:<12} {row['ok']:>7} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    return {'rps': total / duration, 'kinds': summary}
+
+
+def wait_until_ready(base_url, process, timeout=120):
+    """Wait for the server to answer (which also loads the startup data)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if request(base_url, '/', timeout=30)[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not answer within {timeout}s")
+
+
+def start_server(config, port, workdir, env):
+    parts = config.split(':')
+    server = parts[0]
+    workers = parts[1] if len(parts) > 1 else '1'
+    threads = parts[2] if len(parts) > 2 else '8'
+    command = [sys.executable, os.path.join(ROOT, 'serve.py'), '--server', server,
+               '--workers', workers, '--threads', threads, '--port', str(port)]
+    # The scratch directory holds uploads/ (database, analysis cache, snapshots) for this run only
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', nargs='+', default=['werkzeug:1:1', 'werkzeug:1:16', 'werkzeug:2:8'],
+                        help='server:workers:threads setups to start and compare')
+    parser.add_argument('--url', help='test this running server instead of starting --configs')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds of load per configuration')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'request kinds and weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--slow-clients', type=int, default=0, help='extra clients reading exports slowly')
+    parser.add_argument('--slow-kbps', type=float, default=64.0)
+    parser.add_argument('--rows', type=int, default=20_000, help='records in the generated dataset')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='save the results as JSON')
+    args = parser.parse_args()
+
+    mix = {}
+    for part in args.mix.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in SCENARIOS:
+            parser.error(f"unknown request kind {kind!r}; choose from {', '.join(SCENARIOS)}")
+        mix[kind] = float(weight or 1)
+
+    def measure(label, base_url):
+        latencies, errors = run_load(base_url, args.clients, args.duration, mix, args.slow_clients, args.slow_kbps, args.seed)
+        return report(label, latencies, errors, args.duration)
+
+    print(f"{args.clients} clients + {args.slow_clients} slow, {args.duration:.0f}s per run, mix {args.mix}")
+    results = {}
+    if args.url:
+        base_url = args.url.rstrip('/')
+        wait_until_ready(base_url, None)
+        results[base_url] = measure(base_url, base_url)
+    else:
+        for config in args.configs:
+            with tempfile.TemporaryDirectory() as workdir:
+                datasets = os.path.join(workdir, 'datasets')
+                os.makedirs(datasets)
+                write_dataset(os.path.join(datasets, 'obciazenie.csv'), args.rows, seed=args.seed)
+                env = dict(os.environ, DATASETS_DIR=datasets, DATASET_WATCH='off')
+                process = start_server(config, args.port, workdir, env)
+                base_url = f'http://127.0.0.1:{args.port}'
+                try:
+                    wait_until_ready(base_url, process)
+                    results[config] = measure(config, base_url)
+                finally:
+                    process.terminate()
+                    try:
+                        process.wait(10)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        process.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
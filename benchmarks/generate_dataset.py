@@ -0,0 +1,106 @@
+"""
+Generate schema-valid FoundItemSchema records for load tests and benchmarks:
+realistic Polish cities, streets and coordinates, categories from the app.
+
+    python benchmarks/generate_dataset.py --rows 100000 --format csv --output /tmp/items.csv
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.datasets import CATEGORIES  # noqa: E402
+from utils.exports import iter_csv, iter_json_array, iter_ndjson  # noqa: E402
+
+# (city, centre lat, centre lng, weight ~ population in 100k)
+CITIES = [
+    ('Warszawa', 52.2297, 21.0122, 18), ('Kraków', 50.0647, 19.9450, 8), ('Łódź', 51.7592, 19.4560, 7),
+    ('Wrocław', 51.1079, 17.0385, 6), ('Poznań', 52.4064, 16.9252, 5), ('Gdańsk', 54.3520, 18.6466, 5),
+    ('Szczecin', 53.4285, 14.5528, 4), ('Bydgoszcz', 53.1235, 18.0084, 3), ('Lublin', 51.2465, 22.5684, 3),
+    ('Białystok', 53.1325, 23.1688, 3), ('Katowice', 50.2649, 19.0238, 3), ('Toruń', 53.0138, 18.5984, 2),
+    ('Rzeszów', 50.0412, 21.9991, 2), ('Olsztyn', 53.7784, 20.4801, 2), ('Opole', 50.6751, 17.9213, 1),
+]
+STREETS = [
+    'Marszałkowska', 'Piotrkowska', 'Długa', 'Mostowa', 'Dworcowa', 'Gdańska', 'Mickiewicza',
+    'Słowackiego', 'Kościuszki', 'Piłsudskiego', 'Jana Pawła II', 'Kopernika', 'Sienkiewicza',
+    'Grunwaldzka', 'Świętokrzyska', 'Królewska', 'Rynek', 'Plac Wolności', 'Ogrodowa', 'Polna',
+    'Leśna', 'Lipowa', 'Kwiatowa', 'Szkolna', 'Łąkowa', 'Żeromskiego', 'Reymonta', 'Wyszyńskiego',
+]
+PLACES = ['przystanku tramwajowym', 'dworcu', 'parku', 'galerii handlowej', 'autobusie', 'kawiarni', 'szkole', 'urzędzie']
+COLORS = ['czarny', 'niebieski', 'czerwony', 'biały', 'srebrny', 'brązowy', 'zielony', 'szary']
+STATUSES = ['znaleziony'] * 8 + ['oddane']
+FORMATS = ('csv', 'json', 'jsonl')
+
+
+def generate_records(count, seed=0, start=date(2023, 1, 1), days=730):
+    """Yield `count` schema-valid records; the same seed gives the same records."""
+    rng = random.Random(seed)
+    weights = [weight for *_, weight in CITIES]
+    offices = {city: [f'Biuro Rzeczy Znalezionych - {city}', f'Komisariat Policji {city}-Centrum'] for city, *_ in CITIES}
+    for n in range(count):
+        city, lat, lng, _ = rng.choices(CITIES, weights)[0]
+        category = rng.choice(CATEGORIES)
+        office = rng.choice(offices[city])
+        slug = city.lower().translate(str.maketrans('ąćęłńóśźż', 'acelnoszz'))
+        record = {
+            'nazwa_przedmiotu': f'{category} {rng.choice(COLORS)}',
+            'kategoria': category,
+            'data_znalezienia': (start + timedelta(days=rng.randrange(days))).isoformat(),
+            'miejsce_znalezienia_miasto': city,
+            'miejsce_znalezienia_ulica': f'ul. {rng.choice(STREETS)} {rng.randint(1, 120)}',
+            'jednostka_przechowujaca': office,
+            'kontakt_email': f'rzeczyznalezione@{slug}.pl' if office.startswith('Biuro') else f'dyzurny@{slug}.policja.gov.pl',
+            'status': rng.choice(STATUSES),
+            'opis_szczegolowy': f'{category}, kolor {rng.choice(COLORS)}, znaleziono przy {rng.choice(PLACES)}.',
+            'zdjecie_url': '',
+            'kontakt_telefon': f'+48 {rng.randint(500, 899)} {rng.randint(100, 999)} {rng.randint(100, 999)}',
+            'sygnatura_sprawy': f'RZ/{n + 1:07d}/{start.year}',
+            # Scatter around the centre (sigma ~ 3 km)
+            'location_lat': round(rng.gauss(lat, 0.027), 6),
+            'location_lng': round(rng.gauss(lng, 0.043), 6),
+            'location_radius': rng.choice([25.0, 50.0, 100.0, 250.0]),
+        }
+        yield record
+
+
+def iter_file_chunks(records, fmt):
+    """Serialize records as `fmt` text chunks, the same way the bulk exports do."""
+    if fmt == 'json':
+        return iter_json_array(records)
+    if fmt == 'jsonl':
+        return iter_ndjson(records)
+    if fmt == 'csv':
+        return iter_csv(records)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def dataset_bytes(count, fmt, seed=0):
+    """A whole generated dataset file as bytes."""
+    return ''.join(iter_file_chunks(generate_records(count, seed), fmt)).encode('utf-8')
+
+
+def write_dataset(path, count, fmt=None, seed=0):
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in iter_file_chunks(generate_records(count, seed), fmt):
+            f.write(chunk)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--format', choices=FORMATS, help='defaults to the output file extension')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_dataset(args.output, args.rows, args.format, args.seed)
+    print(f"Wrote {args.rows} records to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
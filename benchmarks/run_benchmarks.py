@@ -0,0 +1,223 @@
+"""
+Benchmark ingest, every search filter combination, radius queries, search
+box suggestions and the bulk exports on generated data, and save the
+timings as JSON so later runs can be compared against them.
+
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 100000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<earlier run>.json
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_haversine import within_circle  # noqa: E402
+from benchmarks.generate_dataset import FORMATS, dataset_bytes  # noqa: E402
+from utils import geo  # noqa: E402
+from utils.clustering import GridClusterer  # noqa: E402
+from utils.datasets import DatasetParser, build_item_from_row  # noqa: E402
+from utils.exports import encode_stream, iter_csv, iter_json_array, iter_ndjson  # noqa: E402
+from utils.storage import FILTER_KEYS, create_repository  # noqa: E402
+from utils.suggest import Suggester  # noqa: E402
+from utils.validation import ParallelValidator  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# One value per search filter; every combination of them is benchmarked
+SEARCH_FILTERS = {
+    'query': 'telefon',
+    'category': 'Klucze',
+    'city': 'Poznań',
+    'location': 'mostowa',
+    'date_range': {'date_from': '2023-06-01', 'date_to': '2023-08-31'},
+}
+# Typo tolerant queries: an exact word, a typo and a common second word
+FUZZY_QUERIES = ('telefon', 'telfon', 'telfon czarny')
+# Search box prefixes: a tabulated short one, a common word, a street and a miss
+SUGGEST_PREFIXES = ('te', 'portf', 'krol', 'xyz')
+CENTER = (52.4064, 16.9252)  # Poznań
+RADII = (1000, 5000, 25000)
+EXPORTS = {'json': iter_json_array, 'ndjson': iter_ndjson, 'csv': iter_csv}
+
+
+def timed(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'min_ms': min(timings), 'median_ms': statistics.median(timings)}, result
+
+
+class Recorder:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, group, name, size, fn, backend=None, repeat=None, **extra):
+        timing, result = timed(fn, repeat or self.repeat)
+        entry = {'group': group, 'name': name, 'size': size, 'backend': backend, **timing, **extra}
+        self.results.append(entry)
+        label = f"{group}/{name}" + (f" [{backend}]" if backend else '')
+        print(f"{size:>9} {label:<55} {timing['median_ms']:>10.2f} ms")
+        return result
+
+
+def filter_combinations():
+    keys = list(SEARCH_FILTERS)
+    for count in range(len(keys) + 1):
+        for combo in itertools.combinations(keys, count):
+            filters = dict.fromkeys(FILTER_KEYS, '')
+            for key in combo:
+                value = SEARCH_FILTERS[key]
+                filters.update(value if isinstance(value, dict) else {key: value})
+            yield '+'.join(combo) or 'none', filters
+
+
+def bench_ingest(rec, size, seed):
+    # The app's defaults: chunks validated on a pool of one process per CPU from 4 MB up
+    validator = ParallelValidator()
+    parser = DatasetParser(validator)
+    rows = None
+    try:
+        for fmt in FORMATS:
+            raw = dataset_bytes(size, fmt, seed)
+            items, errors = rec.run('ingest', f'parse_bytes.{fmt}', size, lambda: parser.parse_bytes(raw, f'bench.{fmt}'), mb=len(raw) / 2 ** 20)
+            assert len(items) == size and not errors, errors[:3]
+            rec.run('ingest', f'parse_stream.{fmt}', size, lambda: parser.parse_stream(io.BytesIO(raw), f'bench.{fmt}'))
+            rows = items
+    finally:
+        validator.close()
+    return rows
+
+
+def bench_search(rec, size, rows, backend, workdir):
+    repository = create_repository(backend, path=os.path.join(workdir, f'bench-{size}.db'))
+    try:
+        # Each index build gets fresh records since the repository assigns their ids
+        rec.run('index', 'build', size, lambda: repository.replace_group(0, [build_item_from_row(row, None) for row in rows]),
+                backend=backend, repeat=1)
+
+        for name, filters in filter_combinations():
+            rec.run('search', name, size, lambda: repository.search(filters, limit=20), backend=backend)
+        for sort in ('date', 'relevance'):
+            filters = dict(dict.fromkeys(FILTER_KEYS, ''), query=SEARCH_FILTERS['query'])
+            rec.run('search', f'sort={sort}', size, lambda: repository.search(filters, sort=sort, limit=20), backend=backend)
+        for query in FUZZY_QUERIES:
+            filters = dict(dict.fromkeys(FILTER_KEYS, ''), query=query, fuzzy=True)
+            rec.run('search', f'fuzzy={query}', size, lambda: repository.search(filters, sort='relevance', limit=20),
+                    backend=backend)
+
+        no_filters = dict.fromkeys(FILTER_KEYS, '')
+        for radius in RADII:
+            rec.run('radius', f'{radius}m', size, lambda: repository.search(no_filters, CENTER, radius, sort='distance', limit=20),
+                    backend=backend)
+
+        clusterer = GridClusterer()
+        rec.run('map', 'points+clusters.z12', size, lambda: clusterer.aggregate(repository.points(), 12), backend=backend)
+    finally:
+        repository.close()
+
+
+def bench_legacy_radius(rec, size, rows):
+    """The per-item haversine loop search() used before the spatial index, as a reference point."""
+    items = [build_item_from_row(row, None) for row in rows]
+    for radius in RADII:
+        rec.run('radius', f'{radius}m.loop', size, lambda: [i for i in items if within_circle(i, *CENTER, radius)])
+
+
+def bench_suggest(rec, size, rows):
+    items = [build_item_from_row(row, None) for row in rows]
+    suggester = Suggester()
+    rec.run('suggest', 'build', size, lambda: suggester.refresh(lambda: iter(items)), repeat=1)
+    for prefix in SUGGEST_PREFIXES:
+        # The first lookup of a prefix computes it, later ones come from the per-prefix cache
+        rec.run('suggest', f'{prefix}.first', size, lambda: suggester.suggest(prefix), repeat=1)
+        rec.run('suggest', f'{prefix}.cached', size, lambda: suggester.suggest(prefix))
+
+
+def bench_exports(rec, size, rows):
+    for name, serialize in EXPORTS.items():
+        for encoding in (None, 'gzip'):
+            rec.run('export', f'{name}.{encoding or "identity"}', size,
+                    lambda: sum(len(chunk) for chunk in encode_stream(serialize(rows), encoding)))
+
+
+def compare(results, baseline_path, threshold):
+    """Print median-time ratios against a saved run; return the number of regressions."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {
+            (r['group'], r['name'], r['size'], r['backend']): r for r in json.load(f)['results']
+        }
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (regression above {threshold:.2f}x):")
+    for r in results:
+        old = baseline.get((r['group'], r['name'], r['size'], r['backend']))
+        if not old or not old['median_ms']:
+            continue
+        ratio = r['median_ms'] / old['median_ms']
+        if ratio > threshold:
+            regressions += 1
+            label = f"{r['group']}/{r['name']}" + (f" [{r['backend']}]" if r['backend'] else '')
+            print(f"  SLOWER {r['size']:>9} {label:<55} {old['median_ms']:>9.2f} -> {r['median_ms']:>9.2f} ms ({ratio:.2f}x)")
+    print(f"  {regressions} regression(s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--backends', nargs='+', default=['memory', 'sqlite'], choices=['memory', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/bench-<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    rec = Recorder(args.repeat)
+    print(f"{'rows':>9} {'benchmark':<55} {'median':>13}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            rows = bench_ingest(rec, size, args.seed)
+            for backend in args.backends:
+                bench_search(rec, size, rows, backend, workdir)
+            bench_legacy_radius(rec, size, rows)
+            bench_suggest(rec, size, rows)
+            bench_exports(rec, size, rows)
+
+    created = datetime.now(timezone.utc)
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{created:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'created': created.isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'numpy': geo.np is not None,
+                'sqlite': sqlite3.sqlite_version,
+                'sizes': args.sizes,
+                'repeat': args.repeat,
+                'seed': args.seed,
+            },
+            'results': rec.results,
+        }, f, indent=2)
+    print(f"\nSaved {len(rec.results)} results to {output}")
+
+    if args.compare and compare(rec.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Production entry point for the portal: several worker processes with a
+bounded pool of request threads each, instead of the single debug server
+started by `python app.py`.
+
+    python serve.py --workers 4 --threads 8
+    WEB_WORKERS=4 WEB_THREADS=8 python serve.py --server gunicorn
+
+Servers, in the order --server auto tries them:
+  gunicorn  WSGI, pre-forked workers with a thread pool each (gthread)
+  uvicorn   ASGI (asgi.py): bodies are received on an event loop, the app runs on the thread pool
+  waitress  WSGI, one process with a thread pool; no --workers
+  werkzeug  always available: --workers processes forked after binding the
+            port, each starting a thread per connection when --threads is
+            above 1 (no cap); POSIX only for more than one worker
+
+Any worker may serve the next request of a client, so state the portal
+keeps between requests is shared: items through SQLite, analysis jobs,
+batches, chunked uploads and the official edit page's rows through files
+under UPLOAD_FOLDER. Only the default STORAGE_BACKEND=sqlite works with
+--workers above 1; with 'memory' every process has its own copy of the
+items and reports sent to one are not seen by the others.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+
+try:
+    import gunicorn.app.base
+except ImportError:  # gunicorn is optional, as are the other production servers
+    gunicorn = None
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+SERVERS = {'gunicorn': gunicorn, 'uvicorn': uvicorn, 'waitress': waitress}
+
+
+def available_servers():
+    return [name for name, module in SERVERS.items() if module is not None] + ['werkzeug']
+
+
+def serve_gunicorn(args):
+    class Server(gunicorn.app.base.BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{args.host}:{args.port}')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('timeout', args.timeout)
+
+        def load(self):
+            # Imported by each worker after the fork, so pools, connections and watchers are per process
+            from app import app
+            return app
+
+    Server().run()
+
+
+def serve_uvicorn(args):
+    os.environ['WEB_THREADS'] = str(args.threads)
+    uvicorn.run(
+        'asgi:application', host=args.host, port=args.port, workers=args.workers,
+        lifespan='on', timeout_keep_alive=5
+    )
+
+
+def serve_waitress(args):
+    from app import app
+    waitress.serve(app, host=args.host, port=args.port, threads=args.threads)
+
+
+def serve_werkzeug(args):
+    from werkzeug.serving import make_server, run_simple
+
+    if args.workers == 1:
+        from app import app
+        run_simple(args.host, args.port, app, threaded=args.threads > 1)
+        return
+
+    listener = socket.create_server((args.host, args.port), backlog=128)
+    listener.set_inheritable(True)
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            # Imported after the fork, so pools, connections and watchers are per process
+            from app import app
+            server = make_server(args.host, args.port, app, threaded=args.threads > 1, fd=listener.fileno())
+            server.serve_forever()
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+SERVE = {'gunicorn': serve_gunicorn, 'uvicorn': serve_uvicorn, 'waitress': serve_waitress, 'werkzeug': serve_werkzeug}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default=os.environ.get('WEB_SERVER', 'auto'), choices=['auto', *SERVE])
+    parser.add_argument('--host', default=os.environ.get('WEB_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('WEB_PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)),
+                        help='worker processes (default: WEB_WORKERS or the number of CPUs)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)),
+                        help='request threads per worker (default: WEB_THREADS or 8)')
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('WEB_TIMEOUT', 120)),
+                        help='seconds before gunicorn restarts a stuck worker')
+    args = parser.parse_args()
+    if args.workers < 1 or args.threads < 1:
+        parser.error('--workers and --threads must be at least 1')
+
+    server = available_servers()[0] if args.server == 'auto' else args.server
+    if server in SERVERS and SERVERS[server] is None:
+        parser.error(f"{server} is not installed (pip install {server}); available: {', '.join(available_servers())}")
+    if args.workers > 1 and (server == 'waitress' or not hasattr(os, 'fork')):
+        print(f"{server} runs a single process here; ignoring --workers {args.workers}", file=sys.stderr)
+        args.workers = 1
+    if args.workers > 1 and os.environ.get('STORAGE_BACKEND', 'sqlite') == 'memory':
+        print('STORAGE_BACKEND=memory keeps a separate copy of the items in every worker', file=sys.stderr)
+
+    print(f"Serving on http://{args.host}:{args.port} with {server} ({args.workers} worker(s) x {args.threads} thread(s))",
+          file=sys.stderr)
+    SERVE[server](args)
+
+
+if __name__ == '__main__':
+    main()
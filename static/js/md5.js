@@ -0,0 +1,87 @@
+// Incremental MD5 (RFC 1321) for checking chunked uploads; Web Crypto has no MD5.
+class Md5 {
+    constructor() {
+        this.state = new Int32Array([0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476]);
+        this.buffer = new Uint8Array(64);
+        this.buffered = 0;
+        this.length = 0;
+    }
+
+    update(bytes) {
+        let i = 0;
+        this.length += bytes.length;
+        if (this.buffered) {
+            const take = Math.min(64 - this.buffered, bytes.length);
+            this.buffer.set(bytes.subarray(0, take), this.buffered);
+            this.buffered += take;
+            i = take;
+            if (this.buffered < 64) return this;
+            this._block(this.buffer, 0);
+            this.buffered = 0;
+        }
+        for (; i + 64 <= bytes.length; i += 64) this._block(bytes, i);
+        this.buffer.set(bytes.subarray(i));
+        this.buffered = bytes.length - i;
+        return this;
+    }
+
+    hexdigest() {
+        const bits = this.length * 8;
+        const padding = new Uint8Array((this.buffered < 56 ? 56 : 120) - this.buffered + 8);
+        padding[0] = 0x80;
+        const view = new DataView(padding.buffer);
+        view.setUint32(padding.length - 8, bits >>> 0, true);
+        view.setUint32(padding.length - 4, Math.floor(bits / 0x100000000), true);
+        this.update(padding);
+        let hex = '';
+        for (const word of this.state) {
+            for (let shift = 0; shift < 32; shift += 8) {
+                hex += ((word >>> shift) & 0xff).toString(16).padStart(2, '0');
+            }
+        }
+        return hex;
+    }
+
+    _block(bytes, offset) {
+        const x = new Int32Array(16);
+        for (let j = 0; j < 16; j++) {
+            const k = offset + j * 4;
+            x[j] = bytes[k] | (bytes[k + 1] << 8) | (bytes[k + 2] << 16) | (bytes[k + 3] << 24);
+        }
+        let [a, b, c, d] = this.state;
+        for (let j = 0; j < 64; j++) {
+            let f, g;
+            if (j < 16) {
+                f = (b & c) | (~b & d);
+                g = j;
+            } else if (j < 32) {
+                f = (d & b) | (~d & c);
+                g = (5 * j + 1) % 16;
+            } else if (j < 48) {
+                f = b ^ c ^ d;
+                g = (3 * j + 5) % 16;
+            } else {
+                f = c ^ (b | ~d);
+                g = (7 * j) % 16;
+            }
+            const sum = (a + f + Md5.K[j] + x[g]) | 0;
+            const s = Md5.S[j];
+            a = d;
+            d = c;
+            c = b;
+            b = (b + ((sum << s) | (sum >>> (32 - s)))) | 0;
+        }
+        this.state[0] += a;
+        this.state[1] += b;
+        this.state[2] += c;
+        this.state[3] += d;
+    }
+}
+
+Md5.S = [
+    7, 12, 17, 22, 7, 12, 17, 22, 7, 12, 17, 22, 7, 12, 17, 22,
+    5, 9, 14, 20, 5, 9, 14, 20, 5, 9, 14, 20, 5, 9, 14, 20,
+    4, 11, 16, 23, 4, 11, 16, 23, 4, 11, 16, 23, 4, 11, 16, 23,
+    6, 10, 15, 21, 6, 10, 15, 21, 6, 10, 15, 21, 6, 10, 15, 21,
+];
+Md5.K = Int32Array.from({ length: 64 }, (_, i) => Math.floor(Math.abs(Math.sin(i + 1)) * 0x100000000));
@@ -102,9 +102,16 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: formData
             });
 
-            const result = await response.json();
+            const job = await response.json();
+            if (!response.ok) {
+                console.error('Analysis could not be queued:', job);
+                return;
+            }
 
-            if (result.success) {
+            // Previously analyzed images come back right away
+            const result = job.status === 'done' ? job.result : await waitForAnalysis(job.status_url);
+
+            if (result && result.success) {
                 populateForm(result.data);
             } else {
                 console.error('Analysis failed:', result);
@@ -116,6 +123,17 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Analysis runs in a background job; poll its status until it finishes
+    async function waitForAnalysis(statusUrl, intervalMs = 500) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+            const response = await fetch(statusUrl);
+            const status = await response.json();
+            if (status.status === 'done') return status.result;
+            if (status.status === 'failed' || !response.ok) return status;
+        }
+    }
+
     function populateForm(data) {
         // Animate fields being filled
         if (data.name) formFields.name.value = data.name;
@@ -0,0 +1,55 @@
+import pytest
+
+from utils.datasets import build_item_from_row
+from utils.matching import MatchEngine
+from utils.storage import create_repository
+
+PER_SEARCH = 50
+
+
+def item(name, category, lat=None, lng=None, description='', status='znaleziony', found_on='2024-03-02'):
+    return build_item_from_row({
+        'nazwa_przedmiotu': name,
+        'kategoria': category,
+        'data_znalezienia': found_on,
+        'miejsce_znalezienia_miasto': 'Bydgoszcz',
+        'location_lat': lat,
+        'location_lng': lng,
+        'opis_szczegolowy': description,
+        'status': status,
+    }, None)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def repository(request, tmp_path):
+    repository = create_repository(request.param, path=str(tmp_path / 'items.db'))
+    yield repository
+    repository.close()
+
+
+def top_match(repository, report):
+    """Id of the best match for `report` after storing it as a lost item."""
+    report['date'] = '2024-03-01'
+    repository.add(report, 1)
+    engine = MatchEngine(repository, lambda item: item.get('status') == 'lost', per_search=PER_SEARCH)
+    matches = engine.rank(report)
+    return matches[0]['item_id'] if matches else None
+
+
+def test_best_text_match_surfaces_past_per_search(repository):
+    # More same-category items with the report's words than one search returns, found weeks
+    # later and with most words only in the description; the one naming them was stored last
+    repository.add_many([
+        item('Portfel', 'Portfel', description='Brązowy, skórzany, na suwak', found_on='2024-04-20')
+        for _ in range(PER_SEARCH + 20)
+    ], 2)
+    best = repository.add(item('Portfel skórzany brązowy', 'Portfel'), 2)
+
+    assert top_match(repository, item('Skórzany brązowy portfel', 'Portfel', status='lost')) == best
+
+
+def test_closest_same_category_item_surfaces_past_per_search(repository):
+    repository.add_many([item('Portfel', 'Portfel', 53.20, 18.10) for _ in range(PER_SEARCH + 20)], 2)
+    best = repository.add(item('Portfel', 'Portfel', 53.1236, 18.0085), 2)
+
+    assert top_match(repository, item('Portfel', 'Portfel', 53.1235, 18.0084, status='lost')) == best
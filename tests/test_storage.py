@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from utils.datasets import build_item_from_row
+from utils.storage import FILTER_KEYS, create_repository
+
+CENTER = (52.1, 21.1)
+
+
+def make_rows(rng, count):
+    return [{
+        'nazwa_przedmiotu': rng.choice(('Telefon czarny', 'Portfel', 'Klucze do domu')),
+        'kategoria': rng.choice(('Telefon', 'Portfel', 'Klucze')),
+        'data_znalezienia': f'2024-01-{rng.randint(1, 28):02d}',
+        'miejsce_znalezienia_miasto': 'Warszawa',
+        # Every seventh item has no coordinates
+        'location_lat': None if n % 7 == 0 else 52.0 + rng.random() * 0.2,
+        'location_lng': 21.0 + rng.random() * 0.2,
+    } for n in range(count)]
+
+
+def items(rows):
+    return [build_item_from_row(row, None) for row in rows]
+
+
+def filters(**values):
+    return dict(dict.fromkeys(FILTER_KEYS, ''), fuzzy=False, **values)
+
+
+@pytest.fixture
+def repositories(tmp_path):
+    memory = create_repository('memory')
+    sqlite = create_repository('sqlite', path=str(tmp_path / 'items.db'))
+    yield memory, sqlite
+    sqlite.close()
+
+
+def assert_same_spatial_results(memory, sqlite):
+    for flt in (filters(), filters(category='Klucze'), filters(query='telefon')):
+        for sort in ('', 'distance', 'date'):
+            expected = memory.search(flt, CENTER, 3000, sort=sort, offset=5, limit=15)
+            found = sqlite.search(flt, CENTER, 3000, sort=sort, offset=5, limit=15)
+            assert [item['id'] for item in found[0]] == [item['id'] for item in expected[0]]
+            assert found[1] == expected[1]
+            assert found[2] == pytest.approx(expected[2])
+
+        expected = memory.nearby(*CENTER, 2000, limit=10, filters=flt)
+        found = sqlite.nearby(*CENTER, 2000, limit=10, filters=flt)
+        assert [item['id'] for _, item in found] == [item['id'] for _, item in expected]
+        assert [distance for distance, _ in found] == pytest.approx([distance for distance, _ in expected])
+
+        bbox = (52.05, 21.05, 52.15, 21.15)
+        assert sorted(sqlite.points(flt, bbox)) == sorted(memory.points(flt, bbox))
+    assert sorted(sqlite.points()) == sorted(memory.points())
+
+
+def test_backends_agree_on_spatial_queries(repositories):
+    memory, sqlite = repositories
+    rng = random.Random(3)
+    sources = {source: make_rows(rng, 300) for source in ('a', 'b')}
+    for repository in repositories:
+        repository.replace_sources(2, {source: items(rows) for source, rows in sources.items()})
+    assert_same_spatial_results(memory, sqlite)
+
+    # The SQLite backend's coordinate grid follows inserts and deleted sources
+    reports = make_rows(rng, 40)
+    for repository in repositories:
+        repository.add_many(items(reports), 1)
+    assert_same_spatial_results(memory, sqlite)
+    replacement = make_rows(rng, 80)
+    for repository in repositories:
+        repository.replace_sources(2, {'a': items(replacement)})
+    assert_same_spatial_results(memory, sqlite)
+
+
+def test_nearby_is_closest_first(repositories):
+    for repository in repositories:
+        repository.add_many(items(make_rows(random.Random(5), 200)), 2)
+        found = repository.nearby(*CENTER, 5000, limit=5)
+        distances = [distance for distance, _ in found]
+        assert len(found) == 5 and distances == sorted(distances) and distances[-1] <= 5000
+        assert repository.nearby(0.0, 0.0, 1000) == []
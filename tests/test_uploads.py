@@ -0,0 +1,97 @@
+import hashlib
+import importlib
+import io
+import sys
+
+import pytest
+
+from utils import metrics
+from utils.uploads import ChunkedUploadStore, OffsetMismatchError, UploadError
+
+CSV = (
+    'nazwa_przedmiotu,kategoria,data_znalezienia,miejsce_znalezienia_miasto,miejsce_znalezienia_ulica,'
+    'jednostka_przechowujaca,kontakt_email,status\n'
+    'Parasol,Inne,2024-01-01,Bydgoszcz,Gdańska 1,Biuro,biuro@bydgoszcz.pl,znaleziony\n'
+    'Kurtka,Odzież,2024-01-02,Bydgoszcz,Focha 8,Biuro,biuro@bydgoszcz.pl,znaleziony\n'
+).encode('utf-8')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChunkedUploadStore(str(tmp_path / 'chunks'), max_bytes=1024 * 1024)
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    # A fresh app module whose uploads/, database and snapshots all live in a scratch directory
+    workdir = tmp_path_factory.mktemp('app')
+    (workdir / 'datasets').mkdir()
+    original = sys.modules.pop('app', None)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('UPLOAD_FOLDER', str(workdir / 'uploads'))
+        mp.setenv('DATASETS_DIR', str(workdir / 'datasets'))
+        mp.setenv('DATASET_WATCH', 'off')
+        mp.setenv('VALIDATION_WORKERS', '1')
+        # Its metrics go to a registry of their own, apart from those of an app imported earlier
+        mp.setattr(metrics, 'registry', metrics.MetricsRegistry())
+        try:
+            app = importlib.import_module('app')
+            yield app.app.test_client()
+        finally:
+            sys.modules.pop('app', None)
+            if original is not None:
+                sys.modules['app'] = original
+
+
+def test_resume_after_offset_mismatch(store):
+    upload_id = store.create('dane.csv', len(CSV))['id']
+    assert store.append(upload_id, 0, io.BytesIO(CSV[:50])) == 50
+
+    # A retried chunk that was already stored is refused with the offset to resume from
+    with pytest.raises(OffsetMismatchError) as excinfo:
+        store.append(upload_id, 0, io.BytesIO(CSV[:50]))
+    assert excinfo.value.offset == 50
+    assert store.status(upload_id)['offset'] == 50
+
+    assert store.append(upload_id, excinfo.value.offset, io.BytesIO(CSV[50:])) == len(CSV)
+    with store.open(upload_id) as f:
+        assert f.read() == CSV
+
+
+def test_chunk_past_declared_size_is_dropped(store):
+    upload_id = store.create('dane.csv', len(CSV))['id']
+    store.append(upload_id, 0, io.BytesIO(CSV[:50]))
+    with pytest.raises(UploadError, match='declared size'):
+        store.append(upload_id, 50, io.BytesIO(CSV[50:] + b'extra'))
+    assert store.status(upload_id)['offset'] == 50
+    with pytest.raises(OffsetMismatchError):
+        store.open(upload_id)
+
+
+def test_upload_resumes_over_http(client):
+    init = client.post('/urzad/uploads', json={'filename': 'dane.csv', 'size': len(CSV)}).get_json()
+    url = init['upload_url']
+    assert client.put(f'{url}?offset=0', data=CSV[:60]).status_code == 200
+
+    response = client.put(f'{url}?offset=0', data=CSV[:60])
+    assert response.status_code == 409
+    offset = response.get_json()['offset']
+    assert offset == client.get(url).get_json()['offset'] == 60
+
+    assert client.put(f'{url}?offset={offset}', data=CSV[offset:]).status_code == 200
+    response = client.post(f'{url}/finalize', json={'md5': hashlib.md5(CSV).hexdigest()})
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['count'] == 2
+    assert [item['nazwa_przedmiotu'] for item in payload['items']] == ['Parasol', 'Kurtka']
+
+
+def test_md5_mismatch_discards_upload(client):
+    init = client.post('/urzad/uploads', json={'filename': 'dane.csv', 'size': len(CSV), 'md5': '0' * 32}).get_json()
+    url = init['upload_url']
+    assert client.put(f'{url}?offset=0', data=CSV).status_code == 200
+
+    response = client.post(f'{url}/finalize')
+    assert response.status_code == 422
+    assert response.get_json()['md5'] == hashlib.md5(CSV).hexdigest()
+    assert client.get(url).status_code == 404
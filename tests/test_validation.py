@@ -0,0 +1,118 @@
+import io
+
+import pytest
+
+from utils.validation import (
+    ParallelValidator, _ChainedReader, _first_record_end, _record_boundary, check_chunk,
+)
+
+HEADER = (
+    'nazwa_przedmiotu,kategoria,data_znalezienia,miejsce_znalezienia_miasto,miejsce_znalezienia_ulica,'
+    'jednostka_przechowujaca,kontakt_email,status,opis_szczegolowy'
+)
+FIELDNAMES = HEADER.split(',')
+
+
+def row(name, description='', city='Bydgoszcz'):
+    return f'{name},Inne,2024-01-01,{city},Gdańska 1,Biuro,biuro@bydgoszcz.pl,znaleziony,{description}'
+
+
+QUOTED_MULTILINE = '\n'.join([
+    HEADER,
+    row('Parasol', '"Czarny,\nz drewnianą rączką"'),
+    row('Kurtka', '"Opis w ""cudzysłowie""\n\ni pustą linią"'),
+    row('Plecak', city=''),  # invalid: no city
+    row('Klucze', '"Trzy klucze\nna kółku"'),
+    row('Rower'),
+]) + '\n'
+
+CRLF = QUOTED_MULTILINE.replace('\n', '\r\n')
+
+# The quote inside an unquoted field is a literal character to the csv
+# module, but it flips the quote parity the chunker relies on
+STRAY_QUOTE = '\n'.join([
+    HEADER,
+    row('Parasol 5" duży', 'Granatowy'),
+    row('Kurtka', '"Pierwsza linia\ndruga linia"'),
+    row('Klucze', '"Trzy klucze\nna kółku"'),
+    row('Plecak', city=''),
+    row('Rower'),
+]) + '\n'
+
+
+def validate(validator, text):
+    return validator.validate_stream(io.BytesIO(text.encode('utf-8')), 'csv')
+
+
+@pytest.fixture(scope='module')
+def pool_validator():
+    validator = ParallelValidator(workers=2, chunk_bytes=64, min_bytes=0)
+    yield validator
+    validator.close()
+
+
+def test_record_boundary():
+    assert _record_boundary(b'a,b\nc,d\ne', quoted=True) == 8
+    assert _record_boundary(b'a,"b\nc"\nd,"e\nf', quoted=True) == 8
+    assert _record_boundary(b'a,"b\nc', quoted=True) == 0
+    assert _record_boundary(b'{"a": 1}\n{"b"', quoted=False) == 9
+    assert _record_boundary(b'no newline', quoted=False) == 0
+
+
+def test_first_record_end():
+    assert _first_record_end(b'a,b\nc') == 4
+    assert _first_record_end(b'a,b\r\nc') == 5
+    assert _first_record_end(b'a,b\rc') == 4
+    assert _first_record_end(b'"a\nb",c\nd') == 8
+    assert _first_record_end(b'"a\nb') == 0
+    # A trailing \r may be the first half of \r\n until the input ends
+    assert _first_record_end(b'a,b\r') == 0
+    assert _first_record_end(b'a,b\r', final=True) == 4
+
+
+def test_chained_reader():
+    reader = io.BufferedReader(_ChainedReader([b'ab', b'', b'cdef'], io.BytesIO(b'gh')), 3)
+    assert reader.read(3) == b'abc'
+    assert reader.read() == b'defgh'
+
+
+def test_chunk_cut_inside_quoted_field_is_misaligned():
+    result = check_chunk('csv', row('Kurtka', '"Pierwsza linia\n').encode(), FIELDNAMES)
+    assert result.misaligned
+    assert not check_chunk('csv', (row('Kurtka', '"Pierwsza\nlinia"') + '\n').encode(), FIELDNAMES).misaligned
+
+
+@pytest.mark.parametrize('text, first_name, error_row', [
+    (QUOTED_MULTILINE, 'Parasol', 3),
+    (CRLF, 'Parasol', 3),
+    (STRAY_QUOTE, 'Parasol 5" duży', 4),
+], ids=['multiline', 'crlf', 'stray-quote'])
+def test_parallel_matches_serial(pool_validator, text, first_name, error_row):
+    serial = validate(ParallelValidator(workers=1, chunk_bytes=1 << 20), text)
+    assert serial.parse_error is None
+    assert [item['nazwa_przedmiotu'] for item in serial.items] == [first_name, 'Kurtka', 'Klucze', 'Rower']
+    assert [error['row'] for error in serial.errors] == [error_row]
+
+    for chunk_bytes in (16, 40, 64, 100, 150):
+        pool_validator.chunk_bytes = chunk_bytes
+        parallel = validate(pool_validator, text)
+        assert parallel.items == serial.items, chunk_bytes
+        assert parallel.errors == serial.errors, chunk_bytes
+        assert parallel.parse_error is None
+
+
+def test_misaligned_chunk_falls_back_to_serial(pool_validator, monkeypatch):
+    calls = []
+    finish_serial = ParallelValidator._finish_serial
+
+    def spy(self, state, *args):
+        calls.append('misaligned' in state)
+        return finish_serial(self, state, *args)
+
+    monkeypatch.setattr(ParallelValidator, '_finish_serial', spy)
+    pool_validator.chunk_bytes = 64
+    result = validate(pool_validator, STRAY_QUOTE)
+    assert calls == [True]
+    assert [item['opis_szczegolowy'] for item in result.items] == [
+        'Granatowy', 'Pierwsza linia\ndruga linia', 'Trzy klucze\nna kółku', ''
+    ]
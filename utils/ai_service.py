@@ -1,26 +1,21 @@
+import hashlib
+import io
 import time
 import random
+from types import SimpleNamespace
 
-def analyze_image(file_obj):
-    """
-    Simulates AI analysis of an image.
-    Returns a dictionary with mock data.
-    """
-    # Simulate processing time
-    time.sleep(1.5)
-    
+def _mock_result(filename):
     # Mock data choices
     categories = ["Electronics", "Clothing", "Accessories", "Documents", "Keys"]
     colors = ["Czarny", "Niebieski", "Czerwony", "Biały", "Srebrny", "Brązowy"]
     conditions = ["Nowy", "Używany", "Uszkodzony", "Dobry"]
     
     # Deterministic-ish mock based on filename length to give varied but consistent results for same file
-    seed = len(file_obj.filename)
-    random.seed(seed)
+    rng = random.Random(len(filename))
     
-    detected_category = random.choice(categories)
-    detected_color = random.choice(colors)
-    detected_condition = random.choice(conditions)
+    detected_category = rng.choice(categories)
+    detected_color = rng.choice(colors)
+    detected_condition = rng.choice(conditions)
     
     return {
         "success": True,
@@ -32,3 +27,49 @@ def analyze_image(file_obj):
             "date": "2023-10-27" # Default mock date
         }
     }
+
+
+def analyze_image(file_obj):
+    """
+    Simulates AI analysis of an image.
+    Returns a dictionary with mock data.
+    """
+    # Simulate processing time
+    time.sleep(1.5)
+    return _mock_result(file_obj.filename)
+
+
+def analyze_images(file_objs):
+    """
+    Simulates batched AI analysis: one model call for the whole list, so the
+    fixed per-call cost is paid once. Returns results in input order.
+    """
+    # Simulate one batched forward pass: fixed cost plus a small per-image cost
+    time.sleep(1.5 + 0.05 * len(file_objs))
+    return [_mock_result(file_obj.filename) for file_obj in file_objs]
+
+
+def analyze_image_bytes(data, filename):
+    """
+    Runs analyze_image() on an already-read upload and adds its MD5.
+    Takes plain bytes so it can run in a worker thread or process after the
+    request (and its file stream) is gone.
+    """
+    upload = SimpleNamespace(filename=filename, stream=io.BytesIO(data))
+    result = analyze_image(upload)
+    result['md5'] = hashlib.md5(data).hexdigest()
+    return result
+
+
+def analyze_images_bytes(entries):
+    """
+    Batched counterpart of analyze_image_bytes() for a list of
+    (data, filename) pairs. Returns {md5: result}.
+    """
+    uploads = [SimpleNamespace(filename=filename, stream=io.BytesIO(data)) for data, filename in entries]
+    results = {}
+    for (data, _), result in zip(entries, analyze_images(uploads)):
+        digest = hashlib.md5(data).hexdigest()
+        result['md5'] = digest
+        results[digest] = result
+    return results
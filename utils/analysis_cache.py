@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class AnalysisCache:
+    """
+    Image analysis results keyed by the image digest: an in-memory LRU of
+    `max_entries` in front of one JSON file per digest in `directory`.
+    Entries older than `ttl` seconds are treated as missing, and the disk
+    tier is trimmed to `max_disk_entries` files, oldest first.
+    """
+
+    def __init__(self, directory=None, max_entries=512, max_disk_entries=10000, ttl=7 * 24 * 3600):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest):
+        # Digests are hex strings; anything else never reaches the filesystem
+        if not self.directory or not digest.isalnum():
+            return None
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, digest):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at < self.ttl:
+                    self._memory.move_to_end(digest)
+                    self.hits += 1
+                    return result
+                del self._memory[digest]
+
+        result = self._read_disk(digest, now)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(digest, result, now)
+        return result
+
+    def put(self, digest, result):
+        now = time.time()
+        with self._lock:
+            self._remember(digest, result, now)
+            self._writes += 1
+            trim = self._writes % 100 == 0
+        path = self._path(digest)
+        if path is None:
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print(f"Could not write analysis cache entry {digest}: {exc}")
+        if trim:
+            self._trim_disk()
+
+    def _remember(self, digest, result, now):
+        self._memory[digest] = (now, result)
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, digest, now):
+        path = self._path(digest)
+        if path is None:
+            return None
+        try:
+            if now - os.path.getmtime(path) >= self.ttl:
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _trim_disk(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith('.json')]
+        except OSError:
+            return
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
@@ -0,0 +1,181 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+# Request bodies up to this size stay in memory while they are received, larger ones spill to disk
+SPOOL_BYTES = 1024 * 1024
+
+
+class WsgiToAsgi:
+    """
+    ASGI application serving a WSGI app (the Flask portal) from an event
+    loop. Connections, keep-alive and request bodies are handled on the
+    loop: a body is received in full (spooled to disk above SPOOL_BYTES)
+    before a thread is taken, so slow uploads and idle connections cost no
+    thread. Bodies over `max_body` bytes (by Content-Length, or once that
+    much has arrived) are refused with 413 without being stored. The WSGI
+    app then runs on a pool of `threads` threads, which is where all the
+    blocking and CPU-bound work (parsing, searching, serialization)
+    happens; response chunks are handed back to the loop as they are
+    produced.
+
+    A request and its whole response iteration stay on one thread, since
+    Flask keeps request state in context variables of that thread.
+    """
+
+    def __init__(self, wsgi_app, threads=8, max_body=None):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.max_body = max_body
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        if self.max_body is not None and _declared_length(scope) > self.max_body:
+            await _too_large(send)
+            return
+        body = SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if self.max_body is not None and body.tell() > self.max_body:
+                    await _too_large(send)
+                    return
+                if not message.get('more_body'):
+                    break
+            length = body.tell()
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+
+            def send_from_thread(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            await loop.run_in_executor(
+                self._executor, self._run, environ(scope, body, length), send_from_thread
+            )
+        finally:
+            body.close()
+
+    def _run(self, environ, send):
+        """Call the WSGI app and pass its status, headers and body chunks to `send` (on a pool thread)."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None:
+                try:
+                    if response.get('sent'):
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            }
+            return _no_write
+
+        def send_start():
+            if not response.get('sent'):
+                send(response['start'])
+                response['sent'] = True
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if chunk:
+                    send_start()
+                    send({'type': 'http.response.body', 'body': bytes(chunk), 'more_body': True})
+            send_start()
+            send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+
+def _declared_length(scope):
+    """Content-Length of the request, 0 when missing or malformed (the received bytes are counted too)."""
+    for name, value in scope.get('headers', ()):
+        if name.lower() == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+async def _too_large(send):
+    body = b'Request body too large'
+    await send({
+        'type': 'http.response.start',
+        'status': 413,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8'), (b'content-length', str(len(body)).encode()),
+                    (b'connection', b'close')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _no_write(data):
+    raise NotImplementedError('The WSGI write() callable is not supported; return an iterable instead')
+
+
+def environ(scope, body, length):
+    """WSGI environ for an ASGI HTTP `scope` whose request body is the file `body` of `length` bytes."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    result = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        # ASGI paths are already percent-decoded; WSGI wants their UTF-8 bytes as latin-1
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', ()):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            result['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue  # the body has been read already; its real length is set above
+        key = f'HTTP_{name}'
+        result[key] = f'{result[key]},{value}' if key in result else value
+    return result
@@ -0,0 +1,107 @@
+import threading
+from math import floor, log, pi, radians, tan, cos
+
+TILE_SIZE = 256
+MAX_ZOOM = 18
+
+
+def _mercator(lat, lng):
+    """Project lat/lng to web-mercator coordinates in the [0, 1] square."""
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    phi = radians(lat)
+    x = (lng + 180.0) / 360.0
+    y = (1.0 - log(tan(phi) + 1.0 / cos(phi)) / pi) / 2.0
+    return x, y
+
+
+class GridClusterer:
+    """
+    Grid-based marker clustering: at zoom z the map is cut into squares of
+    `cell_px` screen pixels and every square becomes one cluster placed at
+    the mean position of its points. Cluster grids for the full point set are
+    computed once per zoom level and reused until `version` changes.
+    """
+
+    def __init__(self, cell_px=64):
+        self.cell_px = cell_px
+        self._lock = threading.Lock()
+        self._version = None
+        self._levels = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _cells_per_side(self, zoom):
+        return max(1, TILE_SIZE * (2 ** zoom) // self.cell_px)
+
+    def aggregate(self, points, zoom):
+        """Group (doc_id, lat, lng) points into {cell: [sum_lat, sum_lng, count, doc_id]}."""
+        side = self._cells_per_side(zoom)
+        cells = {}
+        for doc_id, lat, lng in points:
+            x, y = _mercator(lat, lng)
+            cell = (min(int(x * side), side - 1), min(int(y * side), side - 1))
+            bucket = cells.get(cell)
+            if bucket is None:
+                cells[cell] = [lat, lng, 1, doc_id]
+            else:
+                bucket[0] += lat
+                bucket[1] += lng
+                bucket[2] += 1
+        return cells
+
+    def level(self, zoom, version, points_factory):
+        """Precomputed cells for all points at `zoom`, rebuilt when `version` changes."""
+        with self._lock:
+            if version != self._version:
+                self._levels = {}
+                self._version = version
+            cells = self._levels.get(zoom)
+            if cells is None:
+                self.misses += 1
+                cells = self._levels[zoom] = self.aggregate(points_factory(), zoom)
+            else:
+                self.hits += 1
+            return cells
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'levels': len(self._levels),
+            }
+
+    def visible(self, cells, zoom, bbox):
+        """
+        Yield (lat, lng, count, doc_id) clusters whose cell intersects the
+        (min_lat, min_lng, max_lat, max_lng) viewport.
+        """
+        side = self._cells_per_side(zoom)
+        min_lat, min_lng, max_lat, max_lng = bbox
+        x0, y1 = _mercator(min_lat, max(min_lng, -180.0))
+        x1, y0 = _mercator(max_lat, min(max_lng, 180.0))
+        cx0, cx1 = floor(x0 * side), floor(x1 * side)
+        cy0, cy1 = floor(y0 * side), floor(y1 * side)
+
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(cells):
+            selected = (
+                cells.get((cx, cy))
+                for cx in range(cx0, cx1 + 1)
+                for cy in range(cy0, cy1 + 1)
+            )
+        else:
+            selected = (
+                bucket for (cx, cy), bucket in cells.items()
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1
+            )
+
+        for bucket in selected:
+            if bucket is not None:
+                sum_lat, sum_lng, count, doc_id = bucket
+                yield sum_lat / count, sum_lng / count, count, doc_id
+
+
+def clamp_zoom(zoom):
+    return max(0, min(int(zoom), MAX_ZOOM))
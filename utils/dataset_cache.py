@@ -0,0 +1,168 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class DatasetEntry:
+    """Parsed content of one dataset file plus the stat data it was read at."""
+
+    __slots__ = ('items', 'errors', 'mtime_ns', 'size', 'checked_at')
+
+    def __init__(self, items, errors, mtime_ns, size, checked_at):
+        self.items = items
+        self.errors = errors
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checked_at = checked_at
+
+    @property
+    def etag(self):
+        return f"{self.mtime_ns:x}-{self.size:x}"
+
+    @property
+    def last_modified(self):
+        return http_last_modified(self.mtime_ns)
+
+
+def http_last_modified(mtime_ns):
+    """Last-Modified value (whole seconds, UTC) for a st_mtime_ns timestamp."""
+    return datetime.fromtimestamp(mtime_ns // 1_000_000_000, tz=timezone.utc)
+
+
+class DatasetCache:
+    """
+    Cache of parsed dataset files keyed by path and validated by mtime + size.
+    `parser(binary_stream, path)` must return (items, errors).
+    A cached entry is trusted for `revalidate_after` seconds without even a
+    stat() call; publish/reload code calls invalidate() to drop it earlier.
+    Serialized download payloads are cached alongside, keyed by an ETag
+    derived from the fingerprints of the files they were built from; while
+    one is being built, other requests for the same key and ETag wait for
+    it instead of serializing the same data again.
+    """
+
+    def __init__(self, parser, revalidate_after=2.0):
+        self._parser = parser
+        self.revalidate_after = revalidate_after
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._payloads = {}
+        self._building = {}
+        self.hits = 0
+        self.misses = 0
+        self.payload_hits = 0
+        self.payload_misses = 0
+
+    def load(self, path):
+        """Return the DatasetEntry for `path`, re-parsing only if the file changed."""
+        path = os.path.abspath(path)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry.checked_at < self.revalidate_after:
+                self.hits += 1
+                return entry
+
+        stat = os.stat(path)
+        if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            with self._lock:
+                entry.checked_at = now
+                self.hits += 1
+            return entry
+
+        with open(path, 'rb') as f:
+            items, errors = self._parser(f, path)
+        entry = DatasetEntry(items, errors, stat.st_mtime_ns, stat.st_size, now)
+        with self._lock:
+            self._entries[path] = entry
+            self.misses += 1
+        return entry
+
+    def prime(self, path, items, errors, mtime_ns, size):
+        """
+        Seed the entry for `path` with already parsed content (e.g. from a
+        startup snapshot). It is revalidated by stat() on first use, so a
+        file changed since then is still re-parsed.
+        """
+        entry = DatasetEntry(items, errors, mtime_ns, size, checked_at=float('-inf'))
+        with self._lock:
+            self._entries.setdefault(os.path.abspath(path), entry)
+
+    def items(self, path):
+        return self.load(path).items
+
+    def invalidate(self, path=None):
+        """Forget one file (or everything) so the next load re-reads it."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._payloads.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def fingerprint(self, path):
+        """
+        (mtime_ns, size) of `path`, taken from a recently checked cache entry
+        when possible so validators can be computed without touching disk.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and time.monotonic() - entry.checked_at < self.revalidate_after:
+                return entry.mtime_ns, entry.size
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def combined_etag(parts):
+        """ETag for a payload built from several (dataset_id, (mtime_ns, size)) pairs."""
+        digest = hashlib.md5()
+        for dataset_id, (mtime_ns, size) in parts:
+            digest.update(f"{dataset_id}:{mtime_ns:x}-{size:x};".encode('utf-8'))
+        return digest.hexdigest()
+
+    def payload(self, key, etag, build):
+        """Serialized payload for `key`, rebuilt with build() when `etag` changed."""
+        while True:
+            with self._lock:
+                cached = self._payloads.get(key)
+                if cached is not None and cached[0] == etag:
+                    self.payload_hits += 1
+                    return cached[1]
+                building = self._building.get(key)
+                if building is None or building[0] != etag:
+                    building = (etag, threading.Event())
+                    self._building[key] = building
+                    break
+            # Another request is building this payload; check again once it is done (or failed)
+            building[1].wait()
+
+        try:
+            data = build()
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            with self._lock:
+                self._payloads[key] = (etag, data)
+                self.payload_misses += 1
+        finally:
+            with self._lock:
+                if self._building.get(key) is building:
+                    del self._building[key]
+            building[1].set()
+        return data
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            payload_lookups = self.payload_hits + self.payload_misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'payload_hits': self.payload_hits,
+                'payload_misses': self.payload_misses,
+                'payload_hit_ratio': self.payload_hits / payload_lookups if payload_lookups else 0.0,
+                'entries': len(self._entries),
+            }
@@ -0,0 +1,110 @@
+import io
+import os
+from time import perf_counter
+
+from utils.ingest import HashingReader, NotAnArrayError, iter_json_elements, text_stream
+from utils.metrics import Stopwatch, observe_stage
+from utils.records import ItemRecord
+from utils.validation import check_rows, to_float
+
+# Common categories list
+CATEGORIES = [
+    "Portfel", "Telefon", "Klucze", "Dokumenty", "Plecak", "Torebka",
+    "Słuchawki", "Laptop", "Tablet", "Zegarek", "Biżuteria", "Okulary",
+    "Karta płatnicza", "Dowód osobisty", "Paszport", "Prawo jazdy",
+    "Książka", "Ubranie", "Kurtka", "Czapka", "Szalik", "Rękawiczki",
+    "Buty", "Parasol", "Bagaż", "Walizka", "Torba sportowa",
+    "Wózek dziecięcy", "Zabawka", "Rower", "Hulajnoga", "Kask",
+    "Ładowarka", "Powerbank", "Kabel", "Aparat fotograficzny",
+    "Instrument muzyczny", "Sprzęt sportowy", "Kosmetyczka", "Leki",
+    "Jedzenie", "Napój"
+]
+CATEGORIES.sort()
+CATEGORIES.append("Inne")
+
+
+def build_item_from_row(row, item_id):
+    city = row.get('miejsce_znalezienia_miasto') or row.get('city') or ''
+    street = row.get('miejsce_znalezienia_ulica') or row.get('street') or ''
+    location_parts = [part for part in [city, street] if part]
+    location_label = ", ".join(location_parts) if location_parts else row.get('location', '')
+
+    return ItemRecord(
+        id=item_id,
+        name=row.get('nazwa_przedmiotu') or row.get('name') or '',
+        category=row.get('kategoria') or row.get('category') or '',
+        date=row.get('data_znalezienia') or row.get('date') or '',
+        location=location_label,
+        location_city=city,
+        location_street=street,
+        location_lat=to_float(row.get('location_lat') or row.get('lat')),
+        location_lng=to_float(row.get('location_lng') or row.get('lng')),
+        location_radius=to_float(row.get('location_radius')),
+        description=row.get('opis_szczegolowy') or row.get('opis') or row.get('description') or '',
+        contact=row.get('kontakt_email') or row.get('contact') or '',
+        status=row.get('status') or 'znaleziony',
+        security_question=row.get('pytanie_weryfikacyjne') or row.get('security_question') or '',
+    )
+
+
+class DatasetParser:
+    """
+    Parses dataset files (CSV, JSON, JSONL) into validated rows + errors.
+    CSV and JSONL go through `validator` (a ParallelValidator), which cuts
+    them into line-aligned chunks and validates large files on a process
+    pool; JSON arrays are parsed element by element in the calling thread.
+    """
+
+    def __init__(self, validator):
+        self.validator = validator
+
+    def parse(self, stream, filename):
+        """Parse a binary CSV/JSON/JSONL stream into items + errors, record by record."""
+        ext = os.path.splitext(filename.lower())[1]
+
+        if ext in ('.csv', '.jsonl', '.ndjson'):
+            fmt = 'csv' if ext == '.csv' else 'jsonl'
+            try:
+                result = self.validator.validate_stream(stream, fmt)
+            except Exception as exc:
+                return [], [{"row": 0, "errors": [f"{fmt.upper()} parse error: {exc}"]}]
+            observe_stage('dataset.parse', result.parse_seconds)
+            observe_stage('dataset.validate', result.check_seconds)
+            if result.parse_error is None:
+                return result.items, result.errors
+            if fmt == 'csv':
+                # Rows before a broken line are kept, as parse_csv() does
+                return result.items, result.errors + [{'row': 0, 'errors': [f"Błąd parsowania CSV: {result.parse_error}"]}]
+            return [], [{"row": 0, "errors": [f"JSONL parse error: {result.parse_error}"]}]
+
+        if ext != '.json':
+            return [], [{"row": 0, "errors": [f"Unsupported file type: {ext}"]}]
+
+        # JSON list; elements are parsed one by one and validated in this thread
+        text = text_stream(stream)
+        parsing = Stopwatch()
+        start = perf_counter()
+        try:
+            return check_rows(parsing.iter(iter_json_elements(text)))
+        except NotAnArrayError:
+            return [], [{"row": 0, "errors": ["JSON must be an array of records"]}]
+        except Exception as exc:
+            return [], [{"row": 0, "errors": [f"JSON parse error: {exc}"]}]
+        finally:
+            text.detach()
+            observe_stage('dataset.parse', parsing.elapsed)
+            observe_stage('dataset.validate', perf_counter() - start - parsing.elapsed)
+
+    def parse_stream(self, stream, filename):
+        """
+        Parse a binary CSV/JSON/JSONL stream in a single pass without reading it
+        into memory first. Returns (items, errors, md5 of the raw bytes).
+        """
+        reader = HashingReader(stream)
+        items, errors = self.parse(reader, filename)
+        reader.drain()
+        return items, errors, reader.hexdigest()
+
+    def parse_bytes(self, raw_bytes, filename):
+        """Parse CSV/JSON/JSONL bytes into items + errors."""
+        return self.parse(io.BytesIO(raw_bytes), filename)
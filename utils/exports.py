@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+from utils.schema import FoundItemSchema
+
+EXPORT_FIELDS = FoundItemSchema.REQUIRED_FIELDS + FoundItemSchema.OPTIONAL_FIELDS
+# Records serialized per yielded chunk
+BATCH_SIZE = 200
+
+
+def _dump(value, level):
+    """json.dumps(indent=2) of `value` as it appears nested `level` deep."""
+    text = json.dumps(value, ensure_ascii=False, indent=2)
+    return text.replace('\n', '\n' + '  ' * level) if level else text
+
+
+def iter_json_array(items, level=0):
+    """
+    Yield a JSON array of `items` chunk by chunk. The output is identical to
+    json.dumps(list(items), ensure_ascii=False, indent=2) nested `level` deep.
+    """
+    pad = '  ' * (level + 1)
+    batch = []
+    first = True
+    for item in items:
+        batch.append(pad + _dump(item, level + 1))
+        if len(batch) >= BATCH_SIZE:
+            yield ('[\n' if first else ',\n') + ',\n'.join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ('[\n' if first else ',\n') + ',\n'.join(batch)
+        first = False
+    yield '[]' if first else '\n' + '  ' * level + ']'
+
+
+def iter_json_object(groups):
+    """Yield a {key: [items]} JSON object from (key, items) pairs."""
+    first = True
+    for key, items in groups:
+        yield ('{\n' if first else ',\n') + '  ' + json.dumps(key, ensure_ascii=False) + ': '
+        first = False
+        yield from iter_json_array(items, level=1)
+    yield '{}' if first else '\n}'
+
+
+def iter_ndjson(items):
+    batch = []
+    for item in items:
+        batch.append(json.dumps(item, ensure_ascii=False))
+        if len(batch) >= BATCH_SIZE:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+def iter_csv(items, fieldnames=EXPORT_FIELDS):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    for count, item in enumerate(items, start=1):
+        writer.writerow({key: '' if value is None else value for key, value in item.items()})
+        if count % BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def encode_stream(chunks, encoding=None):
+    """UTF-8 encode text chunks and compress them on the fly with gzip or br."""
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        process, flush = compressor.compress, compressor.flush
+    elif encoding == 'br' and brotli is not None:
+        compressor = brotli.Compressor(quality=5)
+        process, flush = compressor.process, compressor.finish
+    else:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+
+    for chunk in chunks:
+        data = process(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield flush()
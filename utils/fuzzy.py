@@ -0,0 +1,293 @@
+import bisect
+import math
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain
+
+from utils.text import TOKEN_RE, tokenize
+
+# Weight of a dictionary term standing in for a query word, by how it was found
+EXACT_WEIGHT = 1.0
+COMPLETION_WEIGHT = 0.8  # 'portfel' -> 'portfelik'
+STEM_WEIGHT = 0.6  # 'portfelik' -> 'portfel'
+TYPO_WEIGHTS = {1: 0.7, 2: 0.4}
+# Query words shorter than this only count when the query has nothing longer
+MIN_WORD = 3
+# Shortest word (or prefix) expanded to completions and stems
+MIN_PREFIX = 4
+# Name words count this many times in a document's term frequencies
+NAME_BOOST = 2
+
+
+def max_typos(word):
+    """Edits tolerated in a query word: none up to 3 letters, one up to 7, then two."""
+    if len(word) <= 3:
+        return 0
+    return 1 if len(word) <= 7 else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions) between `a` and `b`, or limit + 1 once it must exceed
+    `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = None
+    current = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if before is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+def _bigrams(term):
+    padded = f'^{term}$'
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+def query_words(query):
+    """Folded, de-duplicated words of `query` that take part in fuzzy matching."""
+    words = list(dict.fromkeys(tokenize(query)))
+    long_words = [word for word in words if len(word) >= MIN_WORD]
+    return long_words or words
+
+
+class TermDictionary:
+    """
+    Vocabulary of indexed words with their document counts, answering "which
+    known words could the user have meant" without comparing the query to
+    every word: candidates for typos come from a bigram index (bucketed by
+    word length, since k edits change the length by at most k and break at
+    most 3k bigrams) and only those are checked with edit_distance(), while
+    completions come from a sorted word list via bisect. Expansions are
+    cached until the vocabulary changes.
+    """
+
+    def __init__(self, cache_size=4096):
+        self._counts = Counter()
+        self._sorted = []
+        self._grams = defaultdict(list)
+        self._cache = {}
+        self.cache_size = cache_size
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, term):
+        return term in self._counts
+
+    def count(self, term):
+        return self._counts.get(term, 0)
+
+    def add(self, term, count=1):
+        if term not in self._counts:
+            bisect.insort(self._sorted, term)
+            for gram in _bigrams(term):
+                self._grams[gram, len(term)].append(term)
+            self._cache.clear()
+        self._counts[term] += count
+
+    def discard(self, term, count=1):
+        if term not in self._counts:
+            return
+        self._counts[term] -= count
+        if self._counts[term] > 0:
+            return
+        del self._counts[term]
+        del self._sorted[bisect.bisect_left(self._sorted, term)]
+        for gram in _bigrams(term):
+            bucket = self._grams[gram, len(term)]
+            bucket.remove(term)
+            if not bucket:
+                del self._grams[gram, len(term)]
+        self._cache.clear()
+
+    def completions(self, prefix, limit=20):
+        """Up to `limit` known words starting with `prefix` (other than itself), most frequent first."""
+        start = bisect.bisect_left(self._sorted, prefix)
+        stop = bisect.bisect_left(self._sorted, prefix + '\uffff', start)
+        words = [word for word in self._sorted[start:stop] if word != prefix]
+        return sorted(words, key=lambda word: (-self._counts[word], word))[:limit]
+
+    def near(self, word, limit):
+        """{known word: distance} for words within `limit` edits of `word` (itself excluded)."""
+        if limit <= 0:
+            return {}
+        grams = _bigrams(word)
+        result = {}
+        for length in range(max(len(word) - limit, 1), len(word) + limit + 1):
+            buckets = [self._grams.get((gram, length), ()) for gram in grams]
+            shared = Counter(chain.from_iterable(buckets))
+            # Each edit (a transposition included) breaks at most 3 bigrams of the longer word
+            floor = max(len(word), length) + 1 - 3 * limit
+            for term, hits in shared.items():
+                if hits >= floor and term != word:
+                    distance = edit_distance(word, term, limit)
+                    if distance <= limit:
+                        result[term] = distance
+        return result
+
+    def expand(self, word):
+        """
+        Known words standing in for query `word` as [(term, weight)]: the
+        word itself, its completions, known words it starts with and words
+        within max_typos() edits. Always includes `word`, known or not.
+        """
+        cached = self._cache.get(word)
+        if cached is not None:
+            return cached
+        weights = {word: EXACT_WEIGHT}
+        if len(word) >= MIN_PREFIX:
+            for term in self.completions(word):
+                weights.setdefault(term, COMPLETION_WEIGHT)
+            for end in range(MIN_PREFIX, len(word)):
+                if word[:end] in self._counts:
+                    weights.setdefault(word[:end], STEM_WEIGHT)
+        for term, distance in self.near(word, max_typos(word)).items():
+            weight = TYPO_WEIGHTS[distance]
+            if weights.get(term, 0) < weight:
+                weights[term] = weight
+        expansion = sorted(weights.items(), key=lambda pair: (-pair[1], pair[0]))
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[word] = expansion
+        return expansion
+
+
+def document_terms(name, description=''):
+    """
+    Term frequencies of a document from its folded (see fold_text()) name
+    and description, with name words counted NAME_BOOST times.
+    """
+    terms = Counter(TOKEN_RE.findall(description))
+    for term in TOKEN_RE.findall(name):
+        terms[term] += NAME_BOOST
+    return terms
+
+
+@lru_cache(maxsize=1024)
+def _category_words(category):
+    return frozenset(tokenize(category))
+
+
+class FuzzyIndex:
+    """
+    Word-level inverted index over item names and descriptions for typo
+    tolerant search. Every query word is expanded through the TermDictionary
+    (which also knows category words, so they can be corrected) and the
+    documents containing one of its variants are scored with BM25, weighted
+    by how close the variant is; a document must match every query word.
+    Scores for the last few queries are kept until the index changes.
+    Names and descriptions are passed in already folded, as the other text
+    indexes have them.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, cache_size=64):
+        self.k1 = k1
+        self.b = b
+        self.terms = TermDictionary()
+        self._postings = defaultdict(dict)
+        self._lengths = {}
+        self._total_length = 0
+        self._scores = {}
+        self.cache_size = cache_size
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, doc_id, name, description='', category=''):
+        terms = document_terms(name, description)
+        for term, tf in terms.items():
+            self._postings[term][doc_id] = tf
+            self.terms.add(term)
+        for term in _category_words(category or ''):
+            self.terms.add(term)
+        length = sum(terms.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+        self._scores.clear()
+
+    def remove(self, doc_id, name, description='', category=''):
+        """Drop `doc_id`; the texts must be the ones it was added with."""
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in document_terms(name, description):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+            self.terms.discard(term)
+        for term in _category_words(category or ''):
+            self.terms.discard(term)
+        self._scores.clear()
+
+    def _variants(self, word):
+        """[(postings, weight)] of the indexed variants of one query word."""
+        variants = []
+        for term, weight in self.terms.expand(word):
+            postings = self._postings.get(term)
+            if postings:
+                variants.append((postings, weight))
+        return variants
+
+    def _word_scores(self, variants, within=None):
+        """
+        {doc_id: best weighted BM25 score} over the variants of one query
+        word, only for docs in `within` when given: a common word then costs
+        a lookup per remaining candidate instead of a pass over its postings.
+        """
+        n_docs = len(self._lengths)
+        k1, b = self.k1, self.b
+        base = k1 * (1 - b)
+        per_length = k1 * b * n_docs / self._total_length
+        lengths = self._lengths
+        best = {}
+        for postings, weight in variants:
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            factor = weight * idf * (k1 + 1)
+            if within is None:
+                pairs = postings.items()
+            else:
+                pairs = ((doc_id, postings[doc_id]) for doc_id in within if doc_id in postings)
+            for doc_id, tf in pairs:
+                score = factor * tf / (tf + base + per_length * lengths[doc_id])
+                if score > best.get(doc_id, 0):
+                    best[doc_id] = score
+        return best
+
+    def scores(self, query):
+        """{doc_id: relevance} of documents matching every word of `query`, allowing for typos."""
+        words = query_words(query)
+        key = ' '.join(words)
+        cached = self._scores.get(key)
+        if cached is not None:
+            return cached
+        result = {}
+        if words and self._total_length:
+            # Rarest word first; later words are only scored on the docs still matching
+            per_word = sorted(
+                (self._variants(word) for word in words),
+                key=lambda variants: sum(len(postings) for postings, _ in variants),
+            )
+            result = self._word_scores(per_word[0])
+            for variants in per_word[1:]:
+                if not result:
+                    break
+                other = self._word_scores(variants, result)
+                result = {doc_id: score + other[doc_id] for doc_id, score in result.items() if doc_id in other}
+        if len(self._scores) >= self.cache_size:
+            self._scores.clear()
+        self._scores[key] = result
+        return result
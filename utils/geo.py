@@ -0,0 +1,184 @@
+import heapq
+from array import array
+from math import radians, degrees, sin, cos, sqrt, atan2
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; pure-Python fallbacks are used instead
+    np = None
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance in meters between two lat/lng points."""
+    phi1, phi2 = radians(lat1), radians(lat2)
+    dphi = radians(lat2 - lat1)
+    dlambda = radians(lon2 - lon1)
+
+    a = sin(dphi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(dlambda / 2) ** 2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return EARTH_RADIUS_M * c
+
+
+def bounding_box(lat, lng, radius):
+    """
+    Return (min_lat, min_lng, max_lat, max_lng) enclosing a circle of
+    `radius` meters. Longitude span is widened towards the poles and is not
+    wrapped, so it may extend past +/-180 near the antimeridian.
+    """
+    dlat = degrees(radius / EARTH_RADIUS_M)
+    cos_lat = cos(radians(min(abs(lat) + dlat, 90.0)))
+    dlng = 180.0 if cos_lat < 1e-9 else min(dlat / cos_lat, 180.0)
+    return (
+        max(lat - dlat, -90.0),
+        lng - dlng,
+        min(lat + dlat, 90.0),
+        lng + dlng,
+    )
+
+
+def haversine_many(lat, lng, lats, lngs):
+    """
+    Distances in meters from (lat, lng) to every point of the `lats`/`lngs`
+    sequences, computed in one vectorized pass when NumPy is available.
+    """
+    if np is None:
+        return [haversine_distance(lat, lng, plat, plng) for plat, plng in zip(lats, lngs)]
+
+    phi1 = np.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class CoordinateStore:
+    """
+    Columnar coordinate storage: contiguous float64 lat/lng columns plus a
+    parallel doc id column. Rows are appended as items arrive and removed by
+    moving the last row into the gap, so the columns never fragment.
+    """
+
+    def __init__(self, capacity=1024):
+        self._rows = {}
+        self._size = 0
+        if np is not None:
+            self._lat = np.empty(capacity, dtype=np.float64)
+            self._lng = np.empty(capacity, dtype=np.float64)
+            self._ids = np.empty(capacity, dtype=np.int64)
+        else:
+            self._lat = array('d')
+            self._lng = array('d')
+            self._ids = array('q')
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, doc_id):
+        return doc_id in self._rows
+
+    def _grow(self):
+        capacity = max(2 * len(self._lat), 1024)
+        for name in ('_lat', '_lng', '_ids'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def add(self, doc_id, lat, lng):
+        row = self._rows.get(doc_id)
+        if row is not None:
+            self._lat[row], self._lng[row] = lat, lng
+            return
+        row = self._size
+        if np is not None:
+            if row == len(self._lat):
+                self._grow()
+            self._lat[row], self._lng[row], self._ids[row] = lat, lng, doc_id
+        else:
+            self._lat.append(lat)
+            self._lng.append(lng)
+            self._ids.append(doc_id)
+        self._rows[doc_id] = row
+        self._size += 1
+
+    def remove(self, doc_id):
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            moved = int(self._ids[last])
+            self._lat[row], self._lng[row], self._ids[row] = self._lat[last], self._lng[last], moved
+            self._rows[moved] = row
+        if np is None:
+            for column in (self._lat, self._lng, self._ids):
+                column.pop()
+        self._size = last
+
+    def get(self, doc_id):
+        row = self._rows.get(doc_id)
+        if row is None:
+            return None
+        return float(self._lat[row]), float(self._lng[row])
+
+    def _columns(self, doc_ids):
+        """(lats, lngs, ids) for the given doc ids, or for every row."""
+        if doc_ids is None:
+            return self._lat[:self._size], self._lng[:self._size], self._ids[:self._size]
+        rows = [self._rows[d] for d in doc_ids if d in self._rows]
+        if np is not None:
+            rows = np.fromiter(rows, dtype=np.intp, count=len(rows))
+            return self._lat[rows], self._lng[rows], self._ids[rows]
+        return (
+            [self._lat[r] for r in rows],
+            [self._lng[r] for r in rows],
+            [self._ids[r] for r in rows],
+        )
+
+    def points(self, doc_ids=None):
+        """Yield (doc_id, lat, lng) for the given doc ids, or for every row."""
+        lats, lngs, ids = self._columns(doc_ids)
+        if np is not None:
+            lats, lngs, ids = lats.tolist(), lngs.tolist(), ids.tolist()
+        return zip(ids, lats, lngs)
+
+    def within(self, lat, lng, radius, doc_ids=None, bbox=None):
+        """
+        Return {doc_id: distance_m} for rows within `radius` meters, looking
+        only at `doc_ids` when given. An optional (min_lat, min_lng, max_lat,
+        max_lng) box is applied as a cheap prefilter before haversine.
+        """
+        lats, lngs, ids = self._columns(doc_ids)
+        if np is None:
+            result = {}
+            for plat, plng, doc_id in zip(lats, lngs, ids):
+                if bbox and not (bbox[0] <= plat <= bbox[2] and bbox[1] <= plng <= bbox[3]):
+                    continue
+                distance = haversine_distance(lat, lng, plat, plng)
+                if distance <= radius:
+                    result[doc_id] = distance
+            return result
+
+        if bbox:
+            mask = (lats >= bbox[0]) & (lats <= bbox[2]) & (lngs >= bbox[1]) & (lngs <= bbox[3])
+            lats, lngs, ids = lats[mask], lngs[mask], ids[mask]
+        distances = haversine_many(lat, lng, lats, lngs)
+        hit = distances <= radius
+        return dict(zip(ids[hit].tolist(), distances[hit].tolist()))
+
+    def nearest(self, lat, lng, radius, limit=None, doc_ids=None, bbox=None):
+        """Return [(distance_m, doc_id)] within `radius`, closest first."""
+        found = self.within(lat, lng, radius, doc_ids, bbox)
+        if np is None or not found:
+            pairs = ((distance, doc_id) for doc_id, distance in found.items())
+            return sorted(pairs) if limit is None else heapq.nsmallest(limit, pairs)
+
+        ids = np.fromiter(found.keys(), dtype=np.int64, count=len(found))
+        distances = np.fromiter(found.values(), dtype=np.float64, count=len(found))
+        order = np.lexsort((ids, distances))
+        if limit is not None:
+            order = order[:limit]
+        return list(zip(distances[order].tolist(), ids[order].tolist()))
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RawReader(io.RawIOBase):
+    """
+    Minimal raw-stream adapter over any object with read(n). Closing it
+    leaves the wrapped stream open, so buffered/text layers can be stacked
+    on top of request streams without taking ownership of them.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def _consume(self, data):
+        self.bytes_read += len(data)
+
+    def readinto(self, buffer):
+        data = self._raw.read(len(buffer))
+        if not data:
+            return 0
+        size = len(data)
+        buffer[:size] = data
+        self._consume(data)
+        return size
+
+    def drain(self):
+        """Consume whatever the parser left unread."""
+        for chunk in iter(lambda: self._raw.read(CHUNK_SIZE), b''):
+            self._consume(chunk)
+
+
+class HashingReader(RawReader):
+    """
+    RawReader feeding every byte it hands out into an MD5 digest, so parsing
+    and checksumming share a single pass. Call drain() before hexdigest()
+    to make the digest cover bytes the parser did not need.
+    """
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        self._md5 = hashlib.md5()
+
+    def _consume(self, data):
+        super()._consume(data)
+        self._md5.update(data)
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+
+def text_stream(binary_stream, encoding='utf-8'):
+    """
+    Incrementally decoding text view over a binary stream. Call detach() on
+    the result when done so the caller's stream is not closed with it.
+    """
+    if not isinstance(binary_stream, io.BufferedIOBase):
+        if not isinstance(binary_stream, RawReader):
+            binary_stream = RawReader(binary_stream)
+        binary_stream = io.BufferedReader(binary_stream, CHUNK_SIZE)
+    return io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+
+
+class NotAnArrayError(ValueError):
+    """Raised when a JSON document parses but is not a top-level array."""
+
+
+def iter_jsonl(text):
+    """Yield (line_number, record) from a JSON Lines text stream, skipping blank lines."""
+    for line_number, line in enumerate(text, start=1):
+        if line.strip():
+            yield line_number, json.loads(line)
+
+
+def iter_json_elements(text, chunk_size=CHUNK_SIZE):
+    """
+    Yield the elements of a top-level JSON array one at a time while reading
+    `text` in chunks, so the whole document is never held in memory.
+    Raises ValueError for malformed JSON and NotAnArrayError when the
+    document is not an array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = text.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos] if pos < len(buffer) else ''
+            fill()
+
+    first = next_char()
+    if first != '[':
+        if not first or first not in '{"-0123456789tfn':
+            raise ValueError(f"Expecting JSON value, got {first!r}")
+        raise NotAnArrayError("JSON must be an array of records")
+    pos += 1
+
+    if next_char() == ']':
+        pos += 1
+    else:
+        while True:
+            next_char()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                if end == len(buffer) and not eof:
+                    # A number could continue in the next chunk
+                    fill()
+                    continue
+                break
+            pos = end
+            yield value
+
+            separator = next_char()
+            pos += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {separator!r}")
+
+    if next_char():
+        raise ValueError("Extra data after JSON array")
@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit() when the pending-job limit is reached."""
+
+
+class JobQueue:
+    """
+    Runs jobs on a background worker pool and keeps their outcome for polling.
+    At most `max_pending` jobs may be queued or running at once; further
+    submissions raise QueueFullError so callers can apply backpressure.
+    Finished jobs are forgotten `result_ttl` seconds after completion.
+    Jobs submitted with a `key` are coalesced: while a job with the same key
+    is pending, submit() returns its id instead of scheduling another one.
+
+    With a shared `state` store (see JsonStore) every job's status is also
+    written there when it is queued and when it finishes, so status() in
+    another server process can answer for jobs run elsewhere; results must
+    then be JSON serializable.
+    """
+
+    def __init__(self, workers=2, max_pending=16, use_processes=False, result_ttl=600, state=None):
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_cls(max_workers=workers)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._keys = {}
+        self._pending = 0
+        self._state = state
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @property
+    def available(self):
+        """How many more jobs can be submitted before the queue is full."""
+        return max(self.max_pending - self._pending, 0)
+
+    def submit(self, fn, *args, key=None, on_result=None):
+        """
+        Schedule fn(*args) and return its job id. `on_result(result)` runs in
+        this process after a successful run, e.g. to cache the result.
+        """
+        with self._lock:
+            self._expire()
+            if key is not None and key in self._keys:
+                return self._keys[key]
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"{self._pending} jobs pending")
+            self._pending += 1
+            job_id = uuid.uuid4().hex
+            job = {'future': None, 'created': time.time(), 'finished': None, 'key': key}
+            self._jobs[job_id] = job
+            if key is not None:
+                self._keys[key] = job_id
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                del self._jobs[job_id]
+                self._keys.pop(key, None)
+            raise
+        job['future'] = future
+        self._save_state(job_id, {'status': 'queued'})
+        future.add_done_callback(lambda done: self._finish(job_id, job, done, on_result))
+        return job_id
+
+    def _finish(self, job_id, job, future, on_result):
+        if on_result is not None and not future.cancelled() and future.exception() is None:
+            try:
+                on_result(future.result())
+            except Exception as exc:
+                print(f"Job result callback failed: {exc}")
+        self._save_state(job_id, self._outcome(future))
+        with self._lock:
+            self._pending -= 1
+            job['finished'] = time.time()
+            if job['key'] is not None:
+                self._keys.pop(job['key'], None)
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job['finished'] and job['finished'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _save_state(self, job_id, status):
+        if self._state is None:
+            return
+        try:
+            self._state.put(job_id, status)
+        except (OSError, TypeError, ValueError) as exc:
+            print(f"Could not save state of job {job_id}: {exc}")
+
+    @staticmethod
+    def _outcome(future):
+        if future.cancelled():
+            return {'status': 'failed', 'error': 'cancelled'}
+        error = future.exception()
+        if error is not None:
+            return {'status': 'failed', 'error': str(error)}
+        return {'status': 'done', 'result': future.result()}
+
+    def status(self, job_id):
+        """
+        Return {'status': queued|running|done|failed, ...} for a job, with
+        'result' or 'error' once it finished, or None for unknown ids. Jobs
+        of other processes come from the shared state, where a job shows as
+        queued until it finishes.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return self._state.get(job_id) if self._state is not None else None
+        future = job['future']
+        if future is None or not future.done():
+            return {'status': 'running' if future is not None and future.running() else 'queued'}
+        return self._outcome(future)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,89 @@
+import json
+import os
+import re
+import threading
+import time
+
+_KEY = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class JsonStore:
+    """
+    JSON documents keyed by id, one file each in `directory`, for state that
+    every server process must see (job outcomes, analysis batches, the
+    wizard's last upload) rather than only the worker that created it.
+    Writes go through a temporary file and os.replace(), so readers never
+    see a partial document. Documents not written for `ttl` seconds read as
+    missing, and every `trim_every` writes the directory is cut down to
+    `max_entries` files, oldest first.
+    """
+
+    def __init__(self, directory, ttl=None, max_entries=None, trim_every=100):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.trim_every = trim_every
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # Keys are ids generated by the app; anything else never reaches the filesystem
+        if not _KEY.match(key or ''):
+            return None
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        if path is None:
+            return default
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) >= self.ttl:
+                os.remove(path)
+                return default
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def put(self, key, value):
+        path = self._path(key)
+        if path is None:
+            raise ValueError(f"Invalid key {key!r}")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._writes += 1
+            trim = self.max_entries is not None and self._writes % self.trim_every == 0
+        if trim:
+            self._trim()
+
+    def delete(self, key):
+        path = self._path(key)
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _trim(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith('.json')]
+        except OSError:
+            return
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
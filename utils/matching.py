@@ -0,0 +1,230 @@
+import heapq
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+from utils.geo import haversine_distance
+from utils.metrics import stage
+from utils.text import fold_text, tokenize
+
+# Score weights; a candidate scores the sum of the signals it shares with the report
+WEIGHTS = {'category': 0.3, 'text': 0.4, 'date': 0.2, 'location': 0.1}
+# Found items whose scoring features are kept between reports
+FEATURE_CACHE_SIZE = 100_000
+# Words too common in item names and descriptions to say anything about a match
+STOPWORDS = frozenset((
+    'and', 'the', 'bez', 'dla', 'jest', 'lub', 'nad', 'oraz', 'pod', 'przy', 'jak', 'ktory', 'ktora',
+    'kolor', 'koloru', 'marki', 'okolo', 'zgubiony', 'zgubiona', 'zgubione', 'znaleziony', 'znaleziona',
+))
+
+
+def stems(text):
+    """
+    Folded word stems of `text`: words under 3 letters are dropped, words
+    over 4 lose their last letter and are cut to 6, so Polish inflections
+    ('portfel', 'portfela', 'kluczy', 'klucze') share a stem.
+    """
+    result = set()
+    for token in tokenize(text):
+        if len(token) < 3 or token in STOPWORDS or token.isdigit():
+            continue
+        result.add(token[:min(len(token) - 1, 6)] if len(token) > 4 else token)
+    return result
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _coords(item):
+    lat, lng = item.get('location_lat'), item.get('location_lng')
+    return (lat, lng) if lat is not None and lng is not None else None
+
+
+_Features = namedtuple('_Features', 'category name words date point place')
+
+
+def _features(item):
+    """What scoring compares, extracted once per item."""
+    name = stems(item.get('name'))
+    return _Features(
+        fold_text(item.get('category')),
+        name,
+        name | stems(item.get('description')),
+        _parse_date(item.get('date')),
+        _coords(item),
+        stems(f"{item.get('location') or ''} {item.get('location_city') or ''}"),
+    )
+
+
+class MatchEngine:
+    """
+    Pairs citizen reports of lost items with found items. Candidates come
+    from the repository's own indexes: one search per word of the report's
+    name in any category (reports are often filed under a neighbouring
+    one) plus one by the report's category alone, all restricted to the
+    report's date window (and to `max_distance` meters when the report has
+    coordinates), so matching a report costs a few index lookups however
+    many items are stored. Each search keeps only its best `per_search`
+    items: word searches rank by text relevance, the category search by
+    distance when the report has coordinates. Each candidate is scored on
+    category, shared name/description stems, date and location; a report
+    with words to compare only matches items sharing some of them. The
+    best `limit` above `min_score` are saved with
+    repository.replace_matches().
+
+    After a dataset is published every report is matched again in batches
+    of `batch_size` on a background job (see rematch_all()), so the cost is
+    proportional to the number of reports, not reports x items.
+    """
+
+    def __init__(self, repository, is_report, limit=10, min_score=0.5, days_before=3, days_after=90,
+                 max_distance=20000, per_search=50, max_words=4, batch_size=100):
+        self.repository = repository
+        self.is_report = is_report
+        self.limit = limit
+        self.min_score = min_score
+        self.days_before = days_before
+        self.days_after = days_after
+        self.max_distance = max_distance
+        self.per_search = per_search
+        self.max_words = max_words
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._features = {}
+        self.last_run = None
+
+    def _date_filters(self, lost_on):
+        if lost_on is None:
+            return {}
+        return {
+            'date_from': (lost_on - timedelta(days=self.days_before)).isoformat(),
+            'date_to': (lost_on + timedelta(days=self.days_after)).isoformat(),
+        }
+
+    def candidates(self, report):
+        """{item_id: item} of found items worth scoring against `report`."""
+        base = self._date_filters(_parse_date(report.get('date')))
+        center = _coords(report)
+        radius = self.max_distance if center else None
+        # Words of the name only (descriptions are mostly boilerplate), longest and most selective first;
+        # any category, which is left for scoring to weigh
+        words = sorted(stems(report.get('name')), key=len, reverse=True)[:self.max_words]
+        searches = [(dict(base, query=word), 'relevance') for word in words]
+        # Same category under another name; without coordinates nothing ranks them before scoring
+        sort = 'distance' if center else ''
+        if report.get('category'):
+            searches.append((dict(base, category=report['category']), sort))
+        elif not words:
+            searches.append((base, sort))
+
+        found = {}
+        for filters, sort in searches:
+            page, _, _ = self.repository.search(filters, center, radius, sort=sort, limit=self.per_search)
+            for item in page:
+                if item['id'] != report['id'] and not self.is_report(item):
+                    found[item['id']] = item
+        return found
+
+    def _item_features(self, item):
+        # Item ids are never reused, so features stay valid for as long as they are cached
+        features = self._features.get(item['id'])
+        if features is None:
+            if len(self._features) >= FEATURE_CACHE_SIZE:
+                self._features.clear()
+            features = self._features[item['id']] = _features(item)
+        return features
+
+    def score(self, report, item):
+        """(score in 0..1, {signal: contribution}) of `item` as a match for `report`."""
+        return self._score(_features(report), _features(item))
+
+    def _score(self, report, item):
+        details = {}
+        if report.category and report.category == item.category:
+            details['category'] = WEIGHTS['category']
+
+        if report.words:
+            # Words of the report's name count double
+            shared = len(report.name & item.words) * 2 + len((report.words - report.name) & item.words)
+            if shared:
+                possible = len(report.name) * 2 + len(report.words - report.name)
+                details['text'] = WEIGHTS['text'] * shared / possible
+
+        if report.date and item.date:
+            days = (item.date - report.date).days
+            if -self.days_before <= days <= self.days_after:
+                details['date'] = WEIGHTS['date'] * (1 - max(days, 0) / (self.days_after + 1))
+
+        if report.point and item.point:
+            distance = haversine_distance(*report.point, *item.point)
+            if distance <= self.max_distance:
+                details['location'] = WEIGHTS['location'] * (1 - distance / self.max_distance)
+        elif report.place & item.place:
+            details['location'] = WEIGHTS['location'] * 0.5
+        return sum(details.values()), details
+
+    def rank(self, report):
+        """Best matches for `report`: [{'item_id', 'score', 'details'}], highest score first."""
+        report_features = _features(report)
+        scored = []
+        for item_id, item in self.candidates(report).items():
+            score, details = self._score(report_features, self._item_features(item))
+            # Category, date and place alone fit too many items to be a match
+            if report_features.words and 'text' not in details:
+                continue
+            if score >= self.min_score:
+                scored.append((round(score, 4), -item_id, {k: round(v, 4) for k, v in details.items()}))
+        return [
+            {'item_id': -neg_id, 'score': score, 'details': details}
+            for score, neg_id, details in heapq.nlargest(self.limit, scored)
+        ]
+
+    def match(self, report):
+        """Rank and store the matches of one (new) report; returns them."""
+        with stage('matching.report'):
+            matches = self.rank(report)
+        self.repository.replace_matches({report['id']: matches})
+        return matches
+
+    def match_many(self, reports):
+        """Rank and store matches for `reports` in batches; returns how many were processed."""
+        processed = 0
+        batch = {}
+        for report in reports:
+            with stage('matching.report'):
+                batch[report['id']] = self.rank(report)
+            if len(batch) >= self.batch_size:
+                processed += len(batch)
+                self.repository.replace_matches(batch)
+                batch = {}
+        if batch:
+            processed += len(batch)
+            self.repository.replace_matches(batch)
+        return processed
+
+    def request_rematch(self):
+        """Note that found items changed; a running rematch_all() then starts over."""
+        with self._lock:
+            self._generation += 1
+
+    def rematch_all(self, reports_factory):
+        """
+        Match every report from reports_factory() again, repeating while
+        request_rematch() was called during a pass. Meant to run on a
+        background job keyed so that only one runs at a time.
+        """
+        while True:
+            with self._lock:
+                generation = self._generation
+            started = time.time()
+            processed = self.match_many(reports_factory())
+            self.last_run = {'finished': time.time(), 'seconds': round(time.time() - started, 3), 'reports': processed}
+            with self._lock:
+                if generation == self._generation:
+                    return processed
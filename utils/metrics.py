@@ -0,0 +1,247 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+# Latency buckets in seconds, from sub-millisecond index lookups to slow exports
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense: one series per
+    combination of label values, each with bucket counts, a sum and a count.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, *labelvalues)
+
+    def summary(self, *labelvalues):
+        """(count, sum) of one series."""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return (sum(series[0]), series[1]) if series else (0, 0.0)
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(labelvalues, list(counts), total) for labelvalues, (counts, total) in self._series.items()]
+        for labelvalues, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labelvalues, (('le', _format_number(bound)),), cumulative
+            yield f'{self.name}_sum', labelvalues, (), total
+            yield f'{self.name}_count', labelvalues, (), cumulative
+
+
+class Counter:
+    """Monotonic counter with optional labels; Prometheus names end in _total."""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield self.name, labelvalues, (), value
+
+
+class CallbackMetric:
+    """
+    Gauge or counter read at scrape time: `fn()` returns a number, or a dict
+    of {label values tuple: number}. Useful for values other objects already
+    keep (cache hit counts, queue depth, item count).
+    """
+
+    def __init__(self, name, help, fn, labelnames=(), type='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.type = type
+
+    def samples(self):
+        value = self.fn()
+        values = value if isinstance(value, dict) else {(): value}
+        for labelvalues, number in sorted(values.items()):
+            if number is not None:
+                yield self.name, labelvalues, (), number
+
+
+class MetricsRegistry:
+    """Named metrics of this process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def callback(self, name, help, fn, labelnames=(), type='gauge'):
+        return self.register(CallbackMetric(name, help, fn, labelnames, type))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Text exposition format (version 0.0.4) of every registered metric."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as exc:
+                # One failing callback (e.g. the database is busy) must not hide the rest
+                print(f"Could not collect metric {metric.name}: {exc}")
+                continue
+            lines.append(f'# HELP {metric.name} {_escape(metric.help)}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labelvalues, extra, value in samples:
+                lines.append(f'{name}{_format_labels(metric.labelnames, labelvalues, extra)} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry; with several worker processes every worker reports its own numbers
+registry = MetricsRegistry()
+STAGE_SECONDS = registry.histogram(
+    'lostfound_stage_seconds',
+    'Time spent in instrumented hot-path stages (filtering, spatial filter, rendering, parsing...).',
+    ('stage',)
+)
+# Stages recorded while handling the current request, if someone asked for them
+_collected_stages = ContextVar('collected_stages', default=None)
+
+
+def observe_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, name)
+    collected = _collected_stages.get()
+    if collected is not None:
+        collected.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as hot-path stage `name`."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, perf_counter() - start)
+
+
+def timed_iter(name, iterable):
+    """
+    Yield from `iterable`, recording only the time spent producing items
+    (not the time the consumer spends with them) as one `name` stage once
+    it is exhausted or closed. Meant for streamed responses.
+    """
+    stopwatch = Stopwatch()
+    try:
+        yield from stopwatch.iter(iterable)
+    finally:
+        observe_stage(name, stopwatch.elapsed)
+
+
+class Stopwatch:
+    """
+    Accumulates the time spent producing items of wrapped iterators, for
+    work interleaved with something else (e.g. a streaming parser feeding
+    rows to validation).
+    """
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def iter(self, iterable):
+        """Yield from `iterable`, accumulating the time spent producing each item."""
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.elapsed += perf_counter() - start
+                return
+            self.elapsed += perf_counter() - start
+            yield item
+
+
+def collect_stages():
+    """Start recording the stages of the current context; pass the token to collected_stages()."""
+    return _collected_stages.set([])
+
+
+def collected_stages(token):
+    """Stop recording and return the [(stage, seconds)] list recorded since collect_stages()."""
+    stages = _collected_stages.get() or []
+    _collected_stages.reset(token)
+    return stages
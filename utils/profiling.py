@@ -0,0 +1,85 @@
+import cProfile
+import io
+import pstats
+import threading
+from time import perf_counter
+
+try:
+    import pyinstrument
+except ImportError:  # pyinstrument is optional; cProfile reports are used without it
+    pyinstrument = None
+
+PSTATS_SORTS = ('cumulative', 'tottime', 'calls', 'ncalls')
+
+
+class ProfilerBusyError(Exception):
+    """Raised by RequestProfiler.start() while another request is being profiled."""
+
+
+class ProfileSession:
+    def __init__(self, profiler, engine, release):
+        self.engine = engine
+        self._profiler = profiler
+        self._release = release
+        self._started = perf_counter()
+        self.wall_time = None
+
+    def stop(self):
+        if self.wall_time is not None:
+            return
+        try:
+            if self.engine == 'pyinstrument':
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+        finally:
+            self.wall_time = perf_counter() - self._started
+            self._release()
+
+    def report(self, title, stages=(), sort='cumulative', limit=60):
+        """(body, mimetype) of the profile: pyinstrument's HTML page, or a pstats text table."""
+        self.stop()
+        if self.engine == 'pyinstrument':
+            return self._profiler.output_html(), 'text/html'
+
+        out = io.StringIO()
+        out.write(f"{title}\nwall time: {self.wall_time * 1000:.2f} ms\n")
+        if stages:
+            out.write("\nstages:\n")
+            for name, seconds in stages:
+                out.write(f"  {name:<32} {seconds * 1000:>10.2f} ms\n")
+        out.write("\n")
+        stats = pstats.Stats(self._profiler, stream=out)
+        stats.sort_stats(sort if sort in PSTATS_SORTS else 'cumulative').print_stats(limit)
+        return out.getvalue(), 'text/plain'
+
+
+class RequestProfiler:
+    """
+    On-demand profiling of single requests. Only one request is profiled at
+    a time, since Python profilers hook the whole interpreter and profiling
+    concurrent requests would mix their calls together.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def engines():
+        return ('cprofile', 'pyinstrument') if pyinstrument is not None else ('cprofile',)
+
+    def start(self, engine='cprofile'):
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another request is being profiled")
+        try:
+            if engine == 'pyinstrument' and pyinstrument is not None:
+                profiler = pyinstrument.Profiler()
+                profiler.start()
+            else:
+                engine = 'cprofile'
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except Exception:
+            self._lock.release()
+            raise
+        return ProfileSession(profiler, engine, self._lock.release)
@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    LRU of values computed for normalized request parameters (search pages,
+    rendered result fragments). Every value is only valid for the
+    repository `version` it was computed at: the first lookup with a newer
+    version drops the whole cache, so a write (new report, published or
+    reloaded dataset) is never hidden behind a stale entry; versions only
+    grow, and lookups with an older one bypass the cache. Size is bounded
+    by `max_entries` and, when `sizeof` is given, by `max_bytes`; least
+    recently used entries go first. A `max_entries` of 0 disables caching.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        """False for a version older than the cached one (a request that read it before a write)."""
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+        return True
+
+    def get(self, key, version, compute):
+        """Value cached for `key` at `version`, or compute() stored for later lookups."""
+        if not self.max_entries:
+            return compute()
+        with self._lock:
+            current = self._check_version(version)
+            entry = self._entries.get(key) if current else None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Computed outside the lock; `version` was read before, so the value is at least that fresh
+        value = compute()
+        if not current:
+            return value
+        size = self._sizeof(value) if self._sizeof else 0
+        if self.max_bytes and size > self.max_bytes:
+            return value
+        with self._lock:
+            if version != self._version:
+                return value
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,86 @@
+import sys
+from collections.abc import MutableMapping
+
+# Columns every stored item carries; items built from dataset rows use all of them
+ITEM_FIELDS = (
+    'name', 'category', 'date', 'location', 'location_city', 'location_street',
+    'location_lat', 'location_lng', 'location_radius', 'description', 'contact',
+    'status', 'security_question',
+)
+# Fields with few distinct values across a dataset (cities, categories,
+# statuses, office contacts...): equal strings share one interned object
+INTERNED_FIELDS = frozenset((
+    'category', 'date', 'location', 'location_city', 'location_street',
+    'contact', 'status', 'security_question',
+))
+
+
+def intern_value(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class ItemRecord(MutableMapping):
+    """
+    Compact item: one slot per field instead of a per-item dict, with
+    low-cardinality strings interned. Behaves like a dict (item['name'],
+    item.get(), dict(item), `in`, ==) so templates, JSON responses and the
+    storage layer keep treating items as dicts. Fields that were never set
+    are missing, like absent dict keys; unknown keys go to a small overflow
+    dict that only exists when used.
+    """
+
+    __slots__ = ('id',) + ITEM_FIELDS + ('_extra',)
+    _FIELDS = frozenset(('id',) + ITEM_FIELDS)
+
+    def __init__(self, fields=(), **kwargs):
+        self._extra = None
+        self.update(fields, **kwargs)
+
+    def __getitem__(self, key):
+        if key in self._FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._FIELDS:
+            setattr(self, key, intern_value(value) if key in INTERNED_FIELDS else value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for name in self.__slots__[:-1]:
+            if hasattr(self, name):
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        self._extra = None
+        self.update(state)
@@ -1,7 +1,20 @@
 import json
 import csv
-import io
 from datetime import datetime
+from functools import lru_cache
+
+from utils.ingest import text_stream
+
+
+@lru_cache(maxsize=4096)
+def _is_valid_date(value):
+    """Whether `value` is a YYYY-MM-DD date; datasets repeat few dates, so results are cached."""
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return False
+    return True
+
 
 class FoundItemSchema:
     REQUIRED_FIELDS = [
@@ -34,14 +47,36 @@ class FoundItemSchema:
         
         # Validate date format YYYY-MM-DD
         date_str = row.get('data_znalezienia')
-        if date_str:
-            try:
-                datetime.strptime(date_str, '%Y-%m-%d')
-            except ValueError:
-                errors.append(f"Nieprawidłowy format daty: {date_str}. Wymagany: YYYY-MM-DD")
+        if date_str and not _is_valid_date(date_str):
+            errors.append(f"Nieprawidłowy format daty: {date_str}. Wymagany: YYYY-MM-DD")
 
         return errors
 
+    @staticmethod
+    def normalize_fieldnames(fieldnames):
+        """Normalize CSV headers (lowercase, strip, spaces to underscores)."""
+        return [h.strip().lower().replace(' ', '_') for h in fieldnames]
+
+    @staticmethod
+    def iter_csv(file_stream):
+        """
+        Lazily parses a binary CSV stream, decoding it incrementally.
+        Yields (row_number, row, errors) for every data row.
+        """
+        text = text_stream(file_stream)
+        try:
+            reader = csv.DictReader(text)
+
+            # Normalize headers (lowercase, strip)
+            if reader.fieldnames:
+                reader.fieldnames = FoundItemSchema.normalize_fieldnames(reader.fieldnames)
+
+            for i, row in enumerate(reader, start=1):
+                yield i, row, FoundItemSchema.validate_row(row)
+        finally:
+            # Leave the caller's stream open
+            text.detach()
+
     @staticmethod
     def parse_csv(file_stream):
         """
@@ -51,16 +86,7 @@ class FoundItemSchema:
         errors = []
         
         try:
-            # Decode stream to string
-            stream = io.StringIO(file_stream.read().decode('utf-8'))
-            reader = csv.DictReader(stream)
-            
-            # Normalize headers (lowercase, strip)
-            if reader.fieldnames:
-                reader.fieldnames = [h.strip().lower().replace(' ', '_') for h in reader.fieldnames]
-
-            for i, row in enumerate(reader, start=1):
-                row_errors = FoundItemSchema.validate_row(row)
+            for i, row, row_errors in FoundItemSchema.iter_csv(file_stream):
                 if row_errors:
                     errors.append({'row': i, 'errors': row_errors})
                 else:
@@ -0,0 +1,435 @@
+import bisect
+import heapq
+import threading
+from collections import defaultdict
+
+from utils.fuzzy import FuzzyIndex
+from utils.spatial_index import GridIndex
+from utils.text import TOKEN_RE as _TOKEN_RE, fold_text, tokenize  # noqa: F401 (re-exported)
+
+
+def trigrams(folded):
+    return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+
+def relevance_score(text, needle):
+    """
+    Score folded `text` ('name\nrest') against a folded query: hits in the
+    name outweigh hits in the rest, word-prefix hits get a bonus.
+    """
+    if not needle:
+        return 0
+    name, _, rest = text.partition('\n')
+    score = 0
+    if needle in name:
+        score += 3 if name.startswith(needle) else 2
+    if needle in rest:
+        score += 1
+    if any(token.startswith(needle) for token in _TOKEN_RE.findall(name + ' ' + rest)):
+        score += 1
+    return score
+
+
+class TextIndex:
+    """
+    Inverted index answering substring queries over folded text.
+    Queries of 3+ characters intersect trigram posting lists, shorter ones
+    go through the token vocabulary; candidates are always verified with a
+    real substring check so results match `query in text`.
+    """
+
+    def __init__(self):
+        self._texts = {}
+        self._grams = defaultdict(set)
+        self._tokens = defaultdict(set)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, doc_id, text):
+        folded = fold_text(text)
+        self._texts[doc_id] = folded
+        for gram in trigrams(folded):
+            self._grams[gram].add(doc_id)
+        for token in _TOKEN_RE.findall(folded):
+            self._tokens[token].add(doc_id)
+
+    def remove(self, doc_id):
+        folded = self._texts.pop(doc_id, None)
+        if folded is None:
+            return
+        for gram in trigrams(folded):
+            self._discard(self._grams, gram, doc_id)
+        for token in _TOKEN_RE.findall(folded):
+            self._discard(self._tokens, token, doc_id)
+
+    @staticmethod
+    def _discard(postings, key, doc_id):
+        docs = postings.get(key)
+        if docs is not None:
+            docs.discard(doc_id)
+            if not docs:
+                del postings[key]
+
+    def estimate(self, query):
+        """Upper bound on the number of matches, used by the query planner."""
+        needle = fold_text(query)
+        if len(needle) < 3:
+            return len(self._texts)
+        return min((len(self._grams.get(gram, ())) for gram in trigrams(needle)), default=0)
+
+    def folded(self, doc_id):
+        return self._texts.get(doc_id, '')
+
+    def matches(self, doc_id, query):
+        return self.contains(doc_id, fold_text(query))
+
+    def contains(self, doc_id, needle):
+        """matches() for an already folded query, when checking many docs against one query."""
+        return needle in self._texts.get(doc_id, '')
+
+    def score(self, doc_id, query):
+        """
+        Cheap relevance score for a matching doc: hits in the first line
+        (the item name) outweigh hits in the rest, word-prefix hits get a bonus.
+        """
+        return relevance_score(self._texts.get(doc_id, ''), fold_text(query))
+
+    def search(self, query):
+        """Return the set of doc ids whose text contains `query` (folded)."""
+        needle = fold_text(query)
+        if not needle:
+            return set(self._texts)
+
+        if len(needle) >= 3:
+            postings = []
+            for gram in trigrams(needle):
+                docs = self._grams.get(gram)
+                if not docs:
+                    return set()
+                postings.append(docs)
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for docs in postings[1:]:
+                candidates &= docs
+                if not candidates:
+                    return candidates
+        elif _TOKEN_RE.fullmatch(needle):
+            candidates = set()
+            for token, docs in self._tokens.items():
+                if needle in token:
+                    candidates |= docs
+        else:
+            candidates = self._texts.keys()
+
+        return {doc_id for doc_id in candidates if needle in self._texts[doc_id]}
+
+
+class FieldIndex:
+    """Hash index mapping a (normalized) field value to doc ids."""
+
+    def __init__(self, normalize=None):
+        self._normalize = normalize or (lambda value: value)
+        self._postings = defaultdict(set)
+        self._values = {}
+
+    def add(self, doc_id, value):
+        key = self._normalize(value) if value else None
+        if not key:
+            return
+        self._values[doc_id] = key
+        if key not in self._postings:
+            self._on_new_key(key)
+        self._postings[key].add(doc_id)
+
+    def remove(self, doc_id):
+        key = self._values.pop(doc_id, None)
+        if key is None:
+            return
+        docs = self._postings[key]
+        docs.discard(doc_id)
+        if not docs:
+            del self._postings[key]
+            self._on_removed_key(key)
+
+    def _on_new_key(self, key):
+        pass
+
+    def _on_removed_key(self, key):
+        pass
+
+    def keys(self):
+        return self._postings.keys()
+
+    def value(self, doc_id):
+        return self._values.get(doc_id)
+
+    def get(self, value):
+        return self._postings.get(self._normalize(value), set())
+
+    def estimate(self, value):
+        return len(self.get(value))
+
+    def matches(self, doc_id, value):
+        return self._values.get(doc_id) == self._normalize(value)
+
+
+class SortedIndex(FieldIndex):
+    """FieldIndex that also keeps its keys sorted to answer range queries."""
+
+    def __init__(self, normalize=None):
+        super().__init__(normalize)
+        self._sorted_keys = []
+
+    def _on_new_key(self, key):
+        bisect.insort(self._sorted_keys, key)
+
+    def _on_removed_key(self, key):
+        pos = bisect.bisect_left(self._sorted_keys, key)
+        if pos < len(self._sorted_keys) and self._sorted_keys[pos] == key:
+            del self._sorted_keys[pos]
+
+    def _key_slice(self, low=None, high=None):
+        start = bisect.bisect_left(self._sorted_keys, low) if low else 0
+        stop = bisect.bisect_right(self._sorted_keys, high) if high else len(self._sorted_keys)
+        return self._sorted_keys[start:stop]
+
+    def range(self, low=None, high=None):
+        """Doc ids whose key lies in the inclusive [low, high] range."""
+        result = set()
+        for key in self._key_slice(low, high):
+            result |= self._postings[key]
+        return result
+
+    def estimate_range(self, low=None, high=None):
+        return sum(len(self._postings[key]) for key in self._key_slice(low, high))
+
+    def in_range(self, doc_id, low=None, high=None):
+        key = self._values.get(doc_id)
+        if key is None:
+            return False
+        return (not low or key >= low) and (not high or key <= high)
+
+
+class _Filter:
+    """One predicate of a search, as seen by the planner."""
+
+    def __init__(self, estimate, resolve, matches):
+        self.estimate = estimate
+        self.resolve = resolve
+        self.matches = matches
+
+
+def normalize_city(value):
+    return fold_text(value).strip()
+
+
+class ItemIndex:
+    """
+    Keeps item dicts addressable by an internal doc id together with the
+    indexes built over them. Items are grouped (e.g. citizen reports vs.
+    official records) so one group can be replaced without touching others;
+    results come back ordered by group, then insertion order.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._keys = {}
+        self._groups = defaultdict(set)
+        # Doc ids start at 1 so they can double as public item ids
+        self._next_doc_id = 1
+        # Bumped on every change so derived caches know when to rebuild
+        self.version = 0
+        self.text = TextIndex()
+        self.location = TextIndex()
+        self.category = FieldIndex()
+        self.city = FieldIndex(normalize_city)
+        self.date = SortedIndex()
+        self.spatial = GridIndex()
+        self.fuzzy = FuzzyIndex()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, item, group=0):
+        with self._lock:
+            doc_id = self._next_doc_id
+            self._next_doc_id += 1
+            self.version += 1
+            self._docs[doc_id] = item
+            self._keys[doc_id] = (group, doc_id)
+            self._groups[group].add(doc_id)
+            self.text.add(doc_id, f"{item.get('name') or ''}\n{item.get('description') or ''}")
+            self.location.add(doc_id, item.get('location') or '')
+            self.category.add(doc_id, item.get('category'))
+            self.city.add(doc_id, item.get('location_city'))
+            self.date.add(doc_id, item.get('date'))
+            self.spatial.add(doc_id, item.get('location_lat'), item.get('location_lng'))
+            name, _, description = self.text.folded(doc_id).partition('\n')
+            self.fuzzy.add(doc_id, name, description, item.get('category'))
+            return doc_id
+
+    def add_many(self, new_items, group=0):
+        with self._lock:
+            return [self.add(item, group) for item in new_items]
+
+    def remove(self, doc_id):
+        with self._lock:
+            item = self._docs.pop(doc_id, None)
+            if item is None:
+                return
+            self.version += 1
+            group, _ = self._keys.pop(doc_id)
+            self._groups[group].discard(doc_id)
+            name, _, description = self.text.folded(doc_id).partition('\n')
+            self.fuzzy.remove(doc_id, name, description, item.get('category'))
+            for index in (self.text, self.location, self.category, self.city, self.date, self.spatial):
+                index.remove(doc_id)
+
+    def clear_group(self, group):
+        with self._lock:
+            for doc_id in list(self._groups.get(group, ())):
+                self.remove(doc_id)
+
+    def group_ids(self, group=None):
+        """Doc ids of one group (or of all items) in result order."""
+        with self._lock:
+            doc_ids = self._docs if group is None else self._groups.get(group, ())
+            return [doc_id for _, doc_id in sorted(self._keys[d] for d in doc_ids)]
+
+    def items_for(self, doc_ids):
+        """Materialize doc ids into item dicts in stable result order."""
+        with self._lock:
+            ordered = sorted((self._keys[d] for d in doc_ids if d in self._docs))
+            return [self._docs[doc_id] for _, doc_id in ordered]
+
+    def _filters(self, query, category, location, date, city, date_from, date_to, fuzzy):
+        def field_filter(index, value):
+            return _Filter(
+                lambda: index.estimate(value),
+                lambda: set(index.get(value)),
+                lambda doc_id: index.matches(doc_id, value),
+            )
+
+        def text_filter(index, value):
+            needle = fold_text(value)
+            return _Filter(
+                lambda: index.estimate(value),
+                lambda: index.search(value),
+                lambda doc_id: index.contains(doc_id, needle),
+            )
+
+        def fuzzy_filter(value):
+            # Scoring already yields the exact matches, so the estimate is exact too
+            scores = self.fuzzy.scores(value)
+            return _Filter(lambda: len(scores), lambda: set(scores), scores.__contains__)
+
+        filters = []
+        if query:
+            filters.append(fuzzy_filter(query) if fuzzy else text_filter(self.text, query))
+        if category:
+            filters.append(field_filter(self.category, category))
+        if location:
+            filters.append(text_filter(self.location, location))
+        if date:
+            filters.append(field_filter(self.date, date))
+        if city:
+            filters.append(field_filter(self.city, city))
+        if date_from or date_to:
+            filters.append(_Filter(
+                lambda: self.date.estimate_range(date_from, date_to),
+                lambda: self.date.range(date_from, date_to),
+                lambda doc_id: self.date.in_range(doc_id, date_from, date_to),
+            ))
+        return filters
+
+    def get(self, doc_id):
+        return self._docs.get(doc_id)
+
+    def items_for_ordered(self, doc_ids):
+        """Materialize doc ids into item dicts keeping the given order."""
+        with self._lock:
+            return [self._docs[doc_id] for doc_id in doc_ids if doc_id in self._docs]
+
+    def search_ids(self, query='', category='', location='', date='', city='', date_from='', date_to='', fuzzy=False):
+        """
+        Resolve all active filters to a set of doc ids. The most selective
+        filter (by index estimate) produces the initial candidates; the rest
+        are intersected, or checked per candidate once the set is small.
+        With `fuzzy` the query matches whole words allowing for typos and
+        word endings (see FuzzyIndex) instead of being a substring.
+        """
+        with self._lock:
+            filters = self._filters(query, category, location, date, city, date_from, date_to, fuzzy)
+            if not filters:
+                return set(self._docs)
+
+            planned = sorted(((f.estimate(), n, f) for n, f in enumerate(filters)), key=lambda p: p[:2])
+            first_estimate, _, first = planned[0]
+            if not first_estimate:
+                return set()
+            candidates = first.resolve()
+            for estimate, _, flt in planned[1:]:
+                if not candidates:
+                    break
+                if len(candidates) <= estimate:
+                    candidates = {doc_id for doc_id in candidates if flt.matches(doc_id)}
+                else:
+                    candidates &= flt.resolve()
+            return candidates
+
+    def search(self, query='', **filters):
+        with self._lock:
+            return self.items_for(self.search_ids(query, **filters))
+
+    def ranked(self, doc_ids, sort='', query='', center=None, limit=None, fuzzy=False):
+        """
+        Order doc ids for display. `sort` is '' (citizen reports first, then
+        insertion order), 'date' (newest first), 'distance' (closest to
+        `center` first) or 'relevance' (best text match for `query` first,
+        by BM25 with `fuzzy`).
+        Ties always fall back to the default order so paging is stable.
+        Only the first `limit` ids are fully sorted when a limit is given.
+        Returns (ordered doc ids, {doc_id: distance_m} when `center` is set).
+        """
+        with self._lock:
+            doc_ids = [d for d in doc_ids if d in self._docs]
+            distances = self.spatial.distances(*center, doc_ids) if center else {}
+            keys = self._keys
+
+            if sort == 'date':
+                def sort_key(d):
+                    group, seq = keys[d]
+                    return self.date.value(d) or '', -group, -seq
+                if limit is None:
+                    return sorted(doc_ids, key=sort_key, reverse=True), distances
+                return heapq.nlargest(limit, doc_ids, key=sort_key), distances
+
+            if sort == 'distance' and center:
+                inf = float('inf')
+                sort_key = lambda d: (distances.get(d, inf), keys[d])
+            elif sort == 'relevance' and query and fuzzy:
+                scores = self.fuzzy.scores(query)
+                sort_key = lambda d: (-scores.get(d, 0), keys[d])
+            elif sort == 'relevance' and query:
+                sort_key = lambda d: (-self.text.score(d, query), keys[d])
+            else:
+                sort_key = keys.__getitem__
+
+            if limit is None:
+                return sorted(doc_ids, key=sort_key), distances
+            return heapq.nsmallest(limit, doc_ids, key=sort_key), distances
+
+    def within_circle(self, lat, lng, radius, doc_ids=None):
+        """Doc ids (optionally restricted to `doc_ids`) inside the circle."""
+        with self._lock:
+            return set(self.spatial.within(lat, lng, radius, doc_ids))
+
+    def nearby(self, lat, lng, radius, limit=None, doc_ids=None):
+        """Return [(distance_m, item)] within `radius` meters, closest first."""
+        with self._lock:
+            return [
+                (distance, self._docs[doc_id])
+                for distance, doc_id in self.spatial.nearby(lat, lng, radius, limit, doc_ids)
+            ]
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import pickle
+import threading
+
+
+class SnapshotStore:
+    """
+    Compiled startup data pickled to one file per source fingerprint, so a
+    process whose source files have not changed loads the built records in
+    one unpickle instead of parsing and validating every file again.
+    The key covers each source's path, mtime and size plus `version`, which
+    must be bumped whenever the compiled format changes. Writing a new
+    snapshot removes the older ones.
+    """
+
+    def __init__(self, directory, version=1):
+        self.directory = directory
+        self.version = version
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, paths):
+        """Fingerprint of the given source files; missing files are skipped."""
+        digest = hashlib.md5(f"v{self.version};".encode('utf-8'))
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{os.path.abspath(path)}:{stat.st_mtime_ns:x}-{stat.st_size:x};".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def load(self, key):
+        """Return the data stored under `key`, or None if there is no usable snapshot."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            print(f"Ignoring unreadable snapshot {key}: {exc}")
+            return None
+
+    def save(self, key, data):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print(f"Could not write snapshot {key}: {exc}")
+            return
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle') and entry.path != path:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def load_or_build(self, key, build):
+        """Stored data for `key`, or build() it and store the result."""
+        data = self.load(key)
+        if data is None:
+            data = build()
+            self.save(key, data)
+        return data
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from math import floor
+
+from utils.geo import CoordinateStore, bounding_box
+
+
+class GridIndex:
+    """
+    Uniform lat/lng grid bucketing doc ids by cell. Radius queries only visit
+    cells overlapping the circle's bounding box; the surviving candidates go
+    through a bounding-box check and haversine in one batch against the
+    columnar CoordinateStore.
+    """
+
+    def __init__(self, cell_size=0.01):
+        # 0.01 deg is roughly 1.1 km north-south, about a city district
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)
+        self._store = CoordinateStore()
+
+    def __len__(self):
+        return len(self._store)
+
+    def _cell(self, lat, lng):
+        return floor(lat / self.cell_size), floor(lng / self.cell_size)
+
+    def add(self, doc_id, lat, lng):
+        if lat is None or lng is None:
+            return
+        self.remove(doc_id)
+        self._store.add(doc_id, lat, lng)
+        self._cells[self._cell(lat, lng)].add(doc_id)
+
+    def remove(self, doc_id):
+        coords = self._store.get(doc_id)
+        if coords is None:
+            return
+        self._store.remove(doc_id)
+        cell = self._cell(*coords)
+        docs = self._cells[cell]
+        docs.discard(doc_id)
+        if not docs:
+            del self._cells[cell]
+
+    def coords(self, doc_id):
+        return self._store.get(doc_id)
+
+    def points(self, doc_ids=None):
+        """(doc_id, lat, lng) for every indexed point, or only for `doc_ids`."""
+        return self._store.points(doc_ids)
+
+    def _cell_candidates(self, min_lat, min_lng, max_lat, max_lng):
+        """
+        Doc ids in cells overlapping the box, or None when the box spans more
+        cells than are occupied and a full columnar scan is cheaper.
+        """
+        (y0, x0), (y1, x1) = self._cell(min_lat, min_lng), self._cell(max_lat, max_lng)
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self._cells):
+            return None
+        found = set()
+        for y in range(y0, y1 + 1):
+            for x in range(x0, x1 + 1):
+                found |= self._cells.get((y, x), set())
+        return found
+
+    def in_bbox(self, min_lat, min_lng, max_lat, max_lng):
+        """Doc ids whose coordinates fall inside the given box."""
+        candidates = self._cell_candidates(min_lat, min_lng, max_lat, max_lng)
+        return set(self._store.within(0.0, 0.0, float('inf'), candidates, (min_lat, min_lng, max_lat, max_lng)))
+
+    def _search_boxes(self, lat, lng, radius):
+        min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius)
+        boxes = [(min_lat, max(min_lng, -180.0), max_lat, min(max_lng, 180.0))]
+        # Boxes crossing the antimeridian continue on the other side
+        if min_lng < -180.0:
+            boxes.append((min_lat, min_lng + 360.0, max_lat, 180.0))
+        if max_lng > 180.0:
+            boxes.append((min_lat, -180.0, max_lat, max_lng - 360.0))
+        return boxes
+
+    def distances(self, lat, lng, doc_ids=None):
+        """Return {doc_id: distance_m} from (lat, lng) for every indexed point."""
+        return self._store.within(lat, lng, float('inf'), doc_ids)
+
+    def within(self, lat, lng, radius, doc_ids=None):
+        """Return {doc_id: distance_m} for points within `radius` meters."""
+        result = {}
+        for box in self._search_boxes(lat, lng, radius):
+            candidates = self._cell_candidates(*box)
+            if doc_ids is not None:
+                candidates = doc_ids if candidates is None else candidates & doc_ids
+            result.update(self._store.within(lat, lng, radius, candidates, box))
+        return result
+
+    def nearby(self, lat, lng, radius, limit=None, doc_ids=None):
+        """Return [(distance_m, doc_id)] within `radius`, closest first."""
+        boxes = self._search_boxes(lat, lng, radius)
+        if len(boxes) == 1:
+            candidates = self._cell_candidates(*boxes[0])
+            if doc_ids is not None:
+                candidates = doc_ids if candidates is None else candidates & doc_ids
+            return self._store.nearest(lat, lng, radius, limit, candidates, boxes[0])
+        found = sorted((distance, doc_id) for doc_id, distance in self.within(lat, lng, radius, doc_ids).items())
+        return found if limit is None else found[:limit]
@@ -0,0 +1,612 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.fuzzy import NAME_BOOST, TermDictionary, query_words
+from utils.geo import haversine_distance
+from utils.metrics import stage
+from utils.records import ITEM_FIELDS
+from utils.text import tokenize
+from utils.search_index import fold_text, normalize_city, relevance_score
+from utils.spatial_index import GridIndex
+from utils.storage import ItemRepository
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    grp INTEGER NOT NULL,
+    source TEXT,
+    name TEXT, category TEXT, date TEXT, location TEXT,
+    location_city TEXT, location_street TEXT,
+    location_lat REAL, location_lng REAL, location_radius REAL,
+    description TEXT, contact TEXT, status TEXT, security_question TEXT,
+    -- folded copies (lowercase, no diacritics) used for matching
+    name_key TEXT NOT NULL DEFAULT '',
+    description_key TEXT NOT NULL DEFAULT '',
+    location_key TEXT NOT NULL DEFAULT '',
+    city_key TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS items_grp ON items (grp, id);
+CREATE INDEX IF NOT EXISTS items_source ON items (grp, source);
+CREATE INDEX IF NOT EXISTS items_category ON items (category);
+CREATE INDEX IF NOT EXISTS items_date ON items (date);
+CREATE INDEX IF NOT EXISTS items_city ON items (city_key);
+CREATE INDEX IF NOT EXISTS items_coords ON items (location_lat, location_lng);
+
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    title TEXT, date TEXT, count INTEGER, status TEXT, path TEXT
+);
+
+-- Ranked found-item matches of citizen reports; a report matched with no results keeps one NULL row
+CREATE TABLE IF NOT EXISTS matches (
+    report_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    item_id INTEGER,
+    score REAL,
+    details TEXT,
+    PRIMARY KEY (report_id, rank)
+);
+
+CREATE TABLE IF NOT EXISTS item_groups (grp INTEGER PRIMARY KEY, tag TEXT);
+
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+# Trigram FTS over the folded text columns, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    name_key, description_key, location_key,
+    content='items', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, name_key, description_key, location_key)
+    VALUES (new.id, new.name_key, new.description_key, new.location_key);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, name_key, description_key, location_key)
+    VALUES ('delete', old.id, old.name_key, old.description_key, old.location_key);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, name_key, description_key, location_key)
+    VALUES ('delete', old.id, old.name_key, old.description_key, old.location_key);
+    INSERT INTO items_fts (rowid, name_key, description_key, location_key)
+    VALUES (new.id, new.name_key, new.description_key, new.location_key);
+END;
+"""
+
+# Word-level FTS for typo tolerant search; its vocabulary feeds the TermDictionary
+WORDS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_words USING fts5(
+    name_key, description_key,
+    content='items', content_rowid='id', tokenize='unicode61'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_words_vocab USING fts5vocab(items_words, 'row');
+CREATE TRIGGER IF NOT EXISTS items_words_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_words (rowid, name_key, description_key) VALUES (new.id, new.name_key, new.description_key);
+END;
+CREATE TRIGGER IF NOT EXISTS items_words_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_words (items_words, rowid, name_key, description_key)
+    VALUES ('delete', old.id, old.name_key, old.description_key);
+END;
+CREATE TRIGGER IF NOT EXISTS items_words_update AFTER UPDATE ON items BEGIN
+    INSERT INTO items_words (items_words, rowid, name_key, description_key)
+    VALUES ('delete', old.id, old.name_key, old.description_key);
+    INSERT INTO items_words (rowid, name_key, description_key) VALUES (new.id, new.name_key, new.description_key);
+END;
+"""
+# Seconds a loaded search vocabulary is used before checking for changes;
+# exact words always match, only typo/ending variants of new words wait
+VOCABULARY_REFRESH = 60
+
+ITEM_COLUMNS = ', '.join(('id',) + ITEM_FIELDS)
+INSERT_ITEM = (
+    f"INSERT INTO items (grp, source, {', '.join(ITEM_FIELDS)}, name_key, description_key, location_key, city_key) "
+    f"VALUES ({', '.join('?' * (len(ITEM_FIELDS) + 6))})"
+)
+# Rows fetched per query while iterating the whole table
+ITER_BATCH = 1000
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    if lat2 is None or lng2 is None:
+        return None
+    return haversine_distance(lat1, lng1, lat2, lng2)
+
+
+def _relevance(name_key, description_key, needle):
+    return relevance_score(f"{name_key}\n{description_key}", needle)
+
+
+def _fts_phrase(needle):
+    return '"' + needle.replace('"', '""') + '"'
+
+
+def _lng_ranges(min_lng, max_lng):
+    """Split a longitude span that crosses the antimeridian into plain ranges."""
+    if max_lng - min_lng >= 360.0:
+        return []
+    ranges = [(max(min_lng, -180.0), min(max_lng, 180.0))]
+    if min_lng < -180.0:
+        ranges.append((min_lng + 360.0, 180.0))
+    if max_lng > 180.0:
+        ranges.append((-180.0, max_lng - 360.0))
+    return ranges
+
+
+class ConnectionPool:
+    """
+    Small LIFO pool of SQLite connections shared by request threads. Every
+    connection runs in WAL mode so readers never block the single writer,
+    and with `mmap_size` set the database pages are memory-mapped, so worker
+    processes share them through the OS page cache instead of copying.
+    A forked worker process drops the parent's connections and opens its own.
+    """
+
+    def __init__(self, path, size=4, setup=None, timeout=30.0, mmap_size=0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self._setup = setup
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.timeout * 1000)}')
+        if self.mmap_size:
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        if self._setup:
+            self._setup(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            idle = self._idle
+            conn = None
+            if idle.empty() and self._created < self.size:
+                self._created += 1
+                conn = self._connect()
+        if conn is None:
+            conn = idle.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().close()
+            self._created = 0
+
+
+class SQLiteRepository(ItemRepository):
+    """
+    Item repository in a SQLite database file, so several worker processes
+    share one persistent store. Text filters use a trigram FTS5 index over
+    folded columns (when the SQLite build has FTS5), field and coordinate
+    filters use plain B-tree indexes, and sorting/paging happen in SQL.
+    Fuzzy queries are expanded with a TermDictionary loaded from a word
+    level FTS5 index and ranked by its bm25(). Circle, bounding box and
+    nearest-first queries go through an in-process GridIndex of the item
+    coordinates, the same one the memory backend uses; the SQL only
+    applies the other filters to the ids it finds.
+    """
+
+    def __init__(self, path, pool_size=4, mmap_size=0):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.pool = ConnectionPool(path, size=pool_size, setup=self._register_functions, mmap_size=mmap_size)
+        with self.pool.connection() as conn:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(items)')}
+            if columns and 'source' not in columns:
+                conn.execute('ALTER TABLE items ADD COLUMN source TEXT')
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # No FTS5 (or no trigram tokenizer): fall back to substring scans
+                self.fts = False
+            self.words = self._create_words_index(conn)
+        self._vocabulary = None
+        self._vocabulary_version = None
+        self._vocabulary_loaded = 0.0
+        self._vocabulary_lock = threading.Lock()
+        self._grid = GridIndex()
+        self._grid_version = None
+        self._grid_last_id = 0
+        self._grid_lock = threading.Lock()
+
+    @staticmethod
+    def _create_words_index(conn):
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_words'").fetchone()
+        try:
+            conn.executescript(WORDS_SCHEMA)
+        except sqlite3.OperationalError:
+            # Without FTS5 fuzzy queries fall back to plain substring matching
+            return False
+        if not exists:
+            # Index rows stored before the table existed
+            conn.execute("INSERT INTO items_words (items_words) VALUES ('rebuild')")
+        return True
+
+    def _term_dictionary(self):
+        """TermDictionary of indexed words and category words, reloaded after changes (see VOCABULARY_REFRESH)."""
+        with self._vocabulary_lock:
+            if self._vocabulary is not None and time.monotonic() - self._vocabulary_loaded < VOCABULARY_REFRESH:
+                return self._vocabulary
+            version = self.version
+            if self._vocabulary is None or version != self._vocabulary_version:
+                dictionary = TermDictionary()
+                with self.pool.connection() as conn, stage('search.vocabulary'):
+                    for term, docs in conn.execute('SELECT term, doc FROM items_words_vocab'):
+                        dictionary.add(term, docs)
+                    for (category,) in conn.execute("SELECT DISTINCT category FROM items WHERE category <> ''"):
+                        for term in set(tokenize(category)):
+                            dictionary.add(term)
+                self._vocabulary = dictionary
+                self._vocabulary_version = version
+            self._vocabulary_loaded = time.monotonic()
+            return self._vocabulary
+
+    @contextmanager
+    def _spatial(self):
+        """
+        The GridIndex over item coordinates, brought up to date with the
+        database and held locked while in use. Rows are only ever inserted
+        or deleted, so newer ids are added to it; when indexed rows were
+        deleted it is rebuilt.
+        """
+        with self._grid_lock:
+            version = self.version
+            if version != self._grid_version:
+                with self.pool.connection() as conn, stage('search.spatial_sync'):
+                    # One read transaction, so the count and the rows come from the same snapshot
+                    conn.execute('BEGIN')
+                    try:
+                        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+                        located = 'location_lat IS NOT NULL AND location_lng IS NOT NULL'
+                        count = conn.execute(f'SELECT COUNT(*) FROM items WHERE {located}').fetchone()[0]
+                        rows = conn.execute(
+                            f'SELECT id, location_lat, location_lng FROM items WHERE id > ? AND {located}',
+                            (self._grid_last_id,)
+                        ).fetchall()
+                        if len(self._grid) + len(rows) != count:
+                            self._grid = GridIndex()
+                            rows = conn.execute(f'SELECT id, location_lat, location_lng FROM items WHERE {located}').fetchall()
+                        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM items').fetchone()[0]
+                    finally:
+                        conn.execute('COMMIT')
+                    for doc_id, lat, lng in rows:
+                        self._grid.add(doc_id, lat, lng)
+                    self._grid_last_id = max(self._grid_last_id, last_id)
+                    self._grid_version = version
+            yield self._grid
+
+    def _fuzzy_expression(self, query):
+        """FTS5 query matching every word of `query` or one of its known variants."""
+        dictionary = self._term_dictionary()
+        return ' AND '.join(
+            '(' + ' OR '.join(_fts_phrase(term) for term, _ in dictionary.expand(word)) + ')'
+            for word in query_words(query)
+        )
+
+    @staticmethod
+    def _register_functions(conn):
+        conn.create_function('haversine', 4, _haversine, deterministic=True)
+        conn.create_function('relevance', 3, _relevance, deterministic=True)
+
+    @contextmanager
+    def _transaction(self, bump_version=True):
+        with self.pool.connection() as conn:
+            # Take the write lock up front so concurrent writers queue instead of deadlocking
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                if bump_version:
+                    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    @property
+    def version(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @staticmethod
+    def _row_values(item, group, source):
+        values = [group, source]
+        values.extend(item.get(field) for field in ITEM_FIELDS)
+        values.extend((
+            fold_text(item.get('name')),
+            fold_text(item.get('description')),
+            fold_text(item.get('location')),
+            normalize_city(item.get('location_city')),
+        ))
+        return values
+
+    def _insert(self, conn, new_items, group, source):
+        ids = []
+        for item in new_items:
+            item['id'] = conn.execute(INSERT_ITEM, self._row_values(item, group, source)).lastrowid
+            ids.append(item['id'])
+        return ids
+
+    def add_many(self, new_items, group, source=None):
+        with self._transaction() as conn:
+            return self._insert(conn, new_items, group, source)
+
+    def replace_sources(self, group, sources, removed=(), tag=None, exclusive=False):
+        with self._transaction() as conn:
+            if exclusive:
+                conn.execute('DELETE FROM items WHERE grp = ?', (group,))
+            else:
+                for source in set(removed) | set(sources):
+                    conn.execute('DELETE FROM items WHERE grp = ? AND source IS ?', (group, source))
+            conn.execute('INSERT OR REPLACE INTO item_groups (grp, tag) VALUES (?, ?)', (group, tag))
+            for source, new_items in sources.items():
+                self._insert(conn, new_items, group, source)
+
+    def group_tag(self, group):
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT tag FROM item_groups WHERE grp = ?', (group,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, item_id):
+        with self.pool.connection() as conn:
+            row = conn.execute(f'SELECT {ITEM_COLUMNS} FROM items WHERE id = ?', (item_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self):
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+    def iter_items(self, group=None):
+        # Keyset pagination keeps each query short and never pins a pooled connection
+        last = (-1, 0)
+        while True:
+            sql = f'SELECT grp, {ITEM_COLUMNS} FROM items WHERE (grp, id) > (?, ?)'
+            args = list(last)
+            if group is not None:
+                sql += ' AND grp = ?'
+                args.append(group)
+            sql += ' ORDER BY grp, id LIMIT ?'
+            args.append(ITER_BATCH)
+            with self.pool.connection() as conn:
+                rows = conn.execute(sql, args).fetchall()
+            for row in rows:
+                item = dict(row)
+                item.pop('grp')
+                yield item
+            if len(rows) < ITER_BATCH:
+                return
+            last = (rows[-1]['grp'], rows[-1]['id'])
+
+    def _text_clause(self, columns, needle, clauses, args):
+        if self.fts and len(needle) >= 3:
+            clauses.append('id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)')
+            args.append(f"{{{' '.join(columns)}}} : {_fts_phrase(needle)}")
+        else:
+            clauses.append('(' + ' OR '.join(f'instr({column}, ?) > 0' for column in columns) + ')')
+            args.extend([needle] * len(columns))
+
+    def _where(self, filters):
+        clauses, args = [], []
+        needle = fold_text(filters.get('query'))
+        if needle and filters.get('fuzzy') and self.words:
+            expression = self._fuzzy_expression(needle)
+            if expression:
+                clauses.append('id IN (SELECT rowid FROM items_words WHERE items_words MATCH ?)')
+                args.append(expression)
+            else:
+                clauses.append('0')  # no words to match (e.g. only punctuation), like the memory index
+        elif needle:
+            self._text_clause(('name_key', 'description_key'), needle, clauses, args)
+        if filters.get('category'):
+            clauses.append('category = ?')
+            args.append(filters['category'])
+        location = fold_text(filters.get('location'))
+        if location:
+            self._text_clause(('location_key',), location, clauses, args)
+        if filters.get('date'):
+            clauses.append('date = ?')
+            args.append(filters['date'])
+        if filters.get('city'):
+            clauses.append('city_key = ?')
+            args.append(normalize_city(filters['city']))
+        if filters.get('date_from') or filters.get('date_to'):
+            clauses.append("date <> ''")
+            if filters.get('date_from'):
+                clauses.append('date >= ?')
+                args.append(filters['date_from'])
+            if filters.get('date_to'):
+                clauses.append('date <= ?')
+                args.append(filters['date_to'])
+        return clauses, args
+
+    @staticmethod
+    def _circle_join(distances):
+        """Join restricting items to the ids of {item_id: distance_m}, whose distance becomes `distance`."""
+        return (
+            ' JOIN (SELECT CAST(key AS INTEGER) AS circle_id, value AS distance FROM json_each(?))'
+            ' ON circle_id = items.id',
+            [json.dumps(distances)],
+        )
+
+    def search(self, filters, center=None, radius=None, sort='', offset=0, limit=20):
+        clauses, args = self._where(filters)
+        select_args = []
+        distance_sql = ''
+        join, join_args = '', []
+        if center and radius:
+            with self._spatial() as grid, stage('search.spatial'):
+                circle = grid.within(*center, radius)
+            if not circle:
+                return [], 0, {}
+            join, join_args = self._circle_join(circle)
+            distance_sql = ', distance'
+        elif center:
+            distance_sql = ', haversine(?, ?, location_lat, location_lng) AS distance'
+            select_args.extend(center)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        count_join, count_args = join, list(join_args)
+
+        order_args = []
+        needle = fold_text(filters.get('query'))
+        if sort == 'date':
+            order = "COALESCE(date, '') DESC, grp, id"
+        elif sort == 'distance' and center:
+            order = 'distance IS NULL, distance, grp, id'
+        elif sort == 'relevance' and needle and filters.get('fuzzy') and self.words and query_words(needle):
+            # Rows already match through the WHERE clause; the join adds their bm25 rank
+            join += (
+                ' JOIN (SELECT rowid AS word_id, bm25(items_words, ?, 1.0) AS word_rank'
+                ' FROM items_words WHERE items_words MATCH ?) ON word_id = items.id'
+            )
+            join_args += [float(NAME_BOOST), self._fuzzy_expression(needle)]
+            order = 'word_rank, grp, id'
+        elif sort == 'relevance' and needle:
+            order = 'relevance(name_key, description_key, ?) DESC, grp, id'
+            order_args.append(needle)
+        else:
+            order = 'grp, id'
+
+        with self.pool.connection() as conn:
+            # The count covers filtering (and the spatial filter); the page query adds ranking
+            with stage('search.filter'):
+                total = conn.execute(f'SELECT COUNT(*) FROM items{count_join}{where}', count_args + args).fetchone()[0]
+            with stage('search.rank'):
+                rows = conn.execute(
+                    f'SELECT {ITEM_COLUMNS}{distance_sql} FROM items{join}{where} ORDER BY {order} LIMIT ? OFFSET ?',
+                    select_args + join_args + args + order_args + [limit, offset]
+                ).fetchall()
+
+        page_items, distances = [], {}
+        for row in rows:
+            item = dict(row)
+            distance = item.pop('distance', None)
+            if distance is not None:
+                distances[item['id']] = distance
+            page_items.append(item)
+        return page_items, total, distances
+
+    def points(self, filters=None, bbox=None):
+        clauses, args = self._where(filters or {})
+        doc_ids = None
+        if clauses:
+            with self.pool.connection() as conn, stage('points.filter'):
+                doc_ids = {row[0] for row in conn.execute(f"SELECT id FROM items WHERE {' AND '.join(clauses)}", args)}
+        with self._spatial() as grid, stage('points.spatial'):
+            if bbox:
+                min_lat, min_lng, max_lat, max_lng = bbox
+                in_bbox = set()
+                for low, high in _lng_ranges(min_lng, max_lng) or [(-180.0, 180.0)]:
+                    in_bbox |= grid.in_bbox(min_lat, low, max_lat, high)
+                doc_ids = in_bbox if doc_ids is None else in_bbox & doc_ids
+            return list(grid.points(doc_ids))
+
+    def nearby(self, lat, lng, radius, limit=None, filters=None):
+        clauses, args = self._where(filters or {})
+        with self._spatial() as grid, stage('search.spatial'):
+            # With other filters the closest points may not qualify, so all of them go to the query
+            found = grid.nearby(lat, lng, radius, None if clauses else limit)
+        if not found:
+            return []
+        join, join_args = self._circle_join({doc_id: distance for distance, doc_id in found})
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self.pool.connection() as conn, stage('search.rank'):
+            rows = conn.execute(
+                f'SELECT {ITEM_COLUMNS}, distance FROM items{join}{where} ORDER BY distance, id LIMIT ?',
+                join_args + args + [limit if limit is not None else -1]
+            ).fetchall()
+        result = []
+        for row in rows:
+            item = dict(row)
+            result.append((item.pop('distance'), item))
+        return result
+
+    def replace_matches(self, matches):
+        rows = []
+        for report_id, ranked in matches.items():
+            rows.extend(
+                (report_id, rank, match['item_id'], match['score'], json.dumps(match['details']))
+                for rank, match in enumerate(ranked)
+            )
+            if not ranked:
+                rows.append((report_id, 0, None, None, None))
+        with self._transaction(bump_version=False) as conn:
+            conn.executemany('DELETE FROM matches WHERE report_id = ?', [(report_id,) for report_id in matches])
+            conn.executemany('INSERT INTO matches VALUES (?, ?, ?, ?, ?)', rows)
+
+    def matches(self, report_id):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                'SELECT item_id, score, details FROM matches WHERE report_id = ? ORDER BY rank', (report_id,)
+            ).fetchall()
+        if not rows:
+            return None
+        return [
+            {'item_id': row['item_id'], 'score': row['score'], 'details': json.loads(row['details'])}
+            for row in rows if row['item_id'] is not None
+        ]
+
+    def datasets(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute('SELECT id, title, date, count, status FROM datasets ORDER BY position').fetchall()
+        return [dict(row) for row in rows]
+
+    def dataset_files(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute('SELECT id, path FROM datasets WHERE path IS NOT NULL ORDER BY position').fetchall()
+        return [(row['id'], row['path']) for row in rows]
+
+    @staticmethod
+    def _dataset_values(dataset, position):
+        return (
+            dataset['id'], position, dataset.get('title'), dataset.get('date'),
+            dataset.get('count'), dataset.get('status'), dataset.get('path'),
+        )
+
+    def save_dataset(self, dataset):
+        with self._transaction(bump_version=False) as conn:
+            row = conn.execute('SELECT position FROM datasets WHERE id = ?', (dataset['id'],)).fetchone()
+            if row is None:
+                row = conn.execute('SELECT COALESCE(MIN(position), 0) - 1 FROM datasets').fetchone()
+            conn.execute('INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?)', self._dataset_values(dataset, row[0]))
+
+    def remove_dataset(self, dataset_id):
+        with self._transaction(bump_version=False) as conn:
+            conn.execute('DELETE FROM datasets WHERE id = ?', (dataset_id,))
+
+    def replace_datasets(self, new_datasets):
+        with self._transaction(bump_version=False) as conn:
+            conn.execute('DELETE FROM datasets')
+            conn.executemany(
+                'INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [self._dataset_values(ds, position) for position, ds in enumerate(new_datasets)]
+            )
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,275 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from utils.metrics import stage
+from utils.search_index import ItemIndex
+
+# Filter keys accepted by ItemRepository.search() and points()
+FILTER_KEYS = ('query', 'category', 'location', 'date', 'city', 'date_from', 'date_to', 'fuzzy')
+
+
+class ItemRepository(ABC):
+    """
+    Storage for lost/found items and published dataset metadata. The app
+    only talks to this interface, so the in-memory index and the SQLite
+    store are interchangeable.
+
+    Items are mappings as built by build_item_from_row(); the repository assigns
+    `id` on insert and never reuses it. Every item belongs to a group (sample
+    data, citizen reports, official records) and results come back ordered by
+    group, then insertion order. Within a group, items may carry a source
+    (e.g. the dataset they were loaded from) so one source can be swapped
+    without rebuilding the rest. `version` changes on every item write so
+    derived caches know when to rebuild. A backend missing one of the
+    abstract methods fails when it is instantiated.
+    """
+
+    @property
+    @abstractmethod
+    def version(self):
+        raise NotImplementedError
+
+    def add(self, item, group, source=None):
+        """Store `item`, set its `id` and return it."""
+        return self.add_many([item], group, source)[0]
+
+    @abstractmethod
+    def add_many(self, new_items, group, source=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def replace_sources(self, group, sources, removed=(), tag=None, exclusive=False):
+        """
+        Atomically apply a delta to `group`: the items of every source in
+        `sources` ({source: new_items}) are replaced, sources in `removed`
+        are dropped, and with `exclusive` every other item of the group goes
+        too. Concurrent readers see the group either before or after the
+        whole change. `tag` records what the group was built from (see
+        group_tag()).
+        """
+        raise NotImplementedError
+
+    def replace_group(self, group, new_items, tag=None):
+        """Atomically swap all items of `group` for `new_items`."""
+        return self.replace_sources(group, {None: new_items}, tag=tag, exclusive=True)
+
+    @abstractmethod
+    def group_tag(self, group):
+        """Tag given to the last replace_group() of `group`, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, item_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_items(self, group=None):
+        """Yield items of one group (or all items) in result order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def search(self, filters, center=None, radius=None, sort='', offset=0, limit=20):
+        """
+        One page of items matching `filters` (see FILTER_KEYS) and, when
+        `center` and `radius` are given, lying inside that circle. A true
+        'fuzzy' filter makes 'query' match words allowing for typos and
+        endings, ranked by BM25. `sort` is '' (default order), 'date',
+        'distance' or 'relevance'.
+        Returns (page_items, total, {item_id: distance_m} when `center` is set).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def points(self, filters=None, bbox=None):
+        """(item_id, lat, lng) of items matching `filters` inside `bbox` (min_lat, min_lng, max_lat, max_lng)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def nearby(self, lat, lng, radius, limit=None, filters=None):
+        """
+        [(distance_m, item)] of items within `radius` meters of (lat, lng)
+        that match `filters`, closest first, at most `limit` of them.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def replace_matches(self, matches):
+        """
+        Store ranked found-item matches per report ({report_id: [{'item_id',
+        'score', 'details'}]}), replacing earlier matches of those reports.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def matches(self, report_id):
+        """Stored matches of a report, best first, or None if it was never matched."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def datasets(self):
+        """Published dataset descriptions, newest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def dataset_files(self):
+        """(dataset_id, path) for every dataset backed by a file."""
+        raise NotImplementedError
+
+    def dataset_path(self, dataset_id):
+        for ds_id, path in self.dataset_files():
+            if ds_id == dataset_id:
+                return path
+        return None
+
+    @abstractmethod
+    def save_dataset(self, dataset):
+        """
+        Store one dataset description (optionally with a 'path'): new ids go
+        to the top of the list, known ids are updated in place.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_dataset(self, dataset_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def replace_datasets(self, new_datasets):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryRepository(ItemRepository):
+    """
+    Repository over an in-process ItemIndex. Fastest option for a single
+    worker; state is lost on restart and not shared between processes.
+    """
+
+    def __init__(self):
+        self.index = ItemIndex()
+        self._datasets = []
+        self._tags = {}
+        self._sources = defaultdict(set)
+        self._matches = {}
+
+    @property
+    def version(self):
+        return self.index.version
+
+    def add_many(self, new_items, group, source=None):
+        with self.index._lock:
+            ids = []
+            for item in new_items:
+                item['id'] = self.index.add(item, group)
+                ids.append(item['id'])
+            self._sources[group, source].update(ids)
+            return ids
+
+    def replace_sources(self, group, sources, removed=(), tag=None, exclusive=False):
+        # ItemIndex readers take the same lock, so they never see a partial swap
+        with self.index._lock:
+            if exclusive:
+                self.index.clear_group(group)
+                for key in [key for key in self._sources if key[0] == group]:
+                    del self._sources[key]
+            else:
+                for source in set(removed) | set(sources):
+                    for doc_id in self._sources.pop((group, source), ()):
+                        self.index.remove(doc_id)
+            self._tags[group] = tag
+            for source, new_items in sources.items():
+                self.add_many(new_items, group, source)
+
+    def group_tag(self, group):
+        return self._tags.get(group)
+
+    def get(self, item_id):
+        return self.index.get(item_id)
+
+    def count(self):
+        return len(self.index)
+
+    def iter_items(self, group=None):
+        return iter(self.index.items_for_ordered(self.index.group_ids(group)))
+
+    def search(self, filters, center=None, radius=None, sort='', offset=0, limit=20):
+        index = self.index
+        with index._lock:
+            with stage('search.filter'):
+                result_ids = index.search_ids(**filters)
+            if center and radius:
+                with stage('search.spatial'):
+                    result_ids = index.within_circle(*center, radius, result_ids)
+            with stage('search.rank'):
+                ordered, distances = index.ranked(
+                    result_ids,
+                    sort=sort,
+                    query=filters.get('query', ''),
+                    center=center,
+                    limit=offset + limit,
+                    fuzzy=filters.get('fuzzy', False),
+                )
+            page_ids = ordered[offset:offset + limit]
+            page_distances = {doc_id: distances[doc_id] for doc_id in page_ids if doc_id in distances}
+            return index.items_for_ordered(page_ids), len(result_ids), page_distances
+
+    def points(self, filters=None, bbox=None):
+        index = self.index
+        with index._lock:
+            with stage('points.filter'):
+                doc_ids = index.search_ids(**filters) if filters else None
+            with stage('points.spatial'):
+                if bbox:
+                    in_bbox = index.spatial.in_bbox(*bbox)
+                    doc_ids = in_bbox if doc_ids is None else in_bbox & doc_ids
+                return list(index.spatial.points(doc_ids))
+
+    def nearby(self, lat, lng, radius, limit=None, filters=None):
+        index = self.index
+        with index._lock:
+            with stage('search.filter'):
+                doc_ids = index.search_ids(**filters) if filters else None
+            with stage('search.spatial'):
+                return index.nearby(lat, lng, radius, limit, doc_ids)
+
+    def replace_matches(self, matches):
+        self._matches.update((report_id, list(ranked)) for report_id, ranked in matches.items())
+
+    def matches(self, report_id):
+        ranked = self._matches.get(report_id)
+        return list(ranked) if ranked is not None else None
+
+    def datasets(self):
+        return [{k: v for k, v in ds.items() if k != 'path'} for ds in self._datasets]
+
+    def dataset_files(self):
+        return [(ds['id'], ds['path']) for ds in self._datasets if ds.get('path')]
+
+    def save_dataset(self, dataset):
+        for position, ds in enumerate(self._datasets):
+            if ds['id'] == dataset['id']:
+                self._datasets[position] = dict(dataset)
+                return
+        self._datasets.insert(0, dict(dataset))
+
+    def remove_dataset(self, dataset_id):
+        self._datasets = [ds for ds in self._datasets if ds['id'] != dataset_id]
+
+    def replace_datasets(self, new_datasets):
+        self._datasets = [dict(ds) for ds in new_datasets]
+
+
+def create_repository(backend='memory', path=None, pool_size=4, mmap_size=0):
+    """Build the repository selected by the STORAGE_BACKEND setting."""
+    if backend == 'memory':
+        return MemoryRepository()
+    if backend == 'sqlite':
+        from utils.sqlite_store import SQLiteRepository
+        return SQLiteRepository(path, pool_size=pool_size, mmap_size=mmap_size)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,165 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from utils.metrics import stage
+from utils.text import TOKEN_RE, fold_text
+
+# Item fields offered as suggestions, in the order ties are broken
+SUGGEST_FIELDS = ('name', 'category', 'location_city', 'location_street')
+KINDS = {'name': 'name', 'category': 'category', 'location_city': 'city', 'location_street': 'street'}
+# Prefixes this short are answered from tables built with the index
+SHORT_PREFIX = 2
+# House (and flat) numbers at the end of a street address
+_HOUSE_NUMBER = re.compile(r'\s+\d+[a-zA-Z]?(?:\s*[/-]\s*\d+[a-zA-Z]?)*\s*$')
+
+
+def _street(value):
+    return _HOUSE_NUMBER.sub('', value)
+
+
+# Most phrases repeat across items, so folding is cached
+@lru_cache(maxsize=65536)
+def _phrase_key(text):
+    return ' '.join(TOKEN_RE.findall(fold_text(text)))
+
+
+class Suggester:
+    """
+    Search-box completions over item names, categories, cities and streets.
+    Every distinct phrase is stored once with the number of items using it;
+    a sorted array holds the folded phrase and each of its word suffixes
+    ('telefon xiaomi redmi', 'xiaomi redmi', 'redmi'), so a prefix lookup is
+    a bisect for the range of keys starting with it and typing any word of
+    a phrase finds it. The k most frequent phrases per prefix come from
+    heapq; answers for the shortest prefixes are tabulated while building
+    and longer ones land in an LRU of `cache_size` prefixes, both dropped
+    whenever the index is rebuilt.
+
+    The index is built from scratch by refresh(), meant for a background
+    job after the underlying items changed; lookups keep using the previous
+    index until the new one is swapped in.
+    """
+
+    def __init__(self, limit=8, cache_size=4096):
+        self.limit = limit
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._phrases = []
+        self._keys = []
+        self._targets = []
+        self._short = {}
+        self._cache = OrderedDict()
+        self.ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def _build(self, items):
+        by_key = {}
+        for item in items:
+            for field in SUGGEST_FIELDS:
+                value = (item.get(field) or '').strip()
+                if field == 'location_street':
+                    value = _street(value)
+                key = _phrase_key(value)
+                if not key:
+                    continue
+                entry = by_key.get((key, field))
+                if entry is None:
+                    by_key[key, field] = [value, field, 1]
+                else:
+                    entry[2] += 1
+
+        # (count, tie-break rank, text) orders phrases best first with heapq.nlargest
+        field_rank = {field: -position for position, field in enumerate(SUGGEST_FIELDS)}
+        phrases = []
+        pairs = []
+        for (key, field), (text, _, count) in by_key.items():
+            target = len(phrases)
+            phrases.append((count, field_rank[field], text, KINDS[field]))
+            words = key.split(' ')
+            for start in range(len(words)):
+                pairs.append((' '.join(words[start:]), target))
+        pairs.sort()
+        keys = [key for key, _ in pairs]
+        targets = [target for _, target in pairs]
+
+        short = {}
+        for key, target in pairs:
+            for length in range(1, SHORT_PREFIX + 1):
+                if len(key) >= length:
+                    short.setdefault(key[:length], set()).add(target)
+        short = {prefix: self._top(phrases, found, self.limit) for prefix, found in short.items()}
+        return phrases, keys, targets, short
+
+    @staticmethod
+    def _top(phrases, targets, limit):
+        best = heapq.nlargest(limit, set(targets), key=lambda target: phrases[target][:3])
+        return [{'text': phrases[t][2], 'kind': phrases[t][3], 'count': phrases[t][0]} for t in best]
+
+    def request_refresh(self):
+        """Note that items changed; a running refresh() then builds again."""
+        with self._lock:
+            self._generation += 1
+
+    def refresh(self, items_factory):
+        """
+        Rebuild the index from items_factory(), repeating while
+        request_refresh() was called during a build. Returns the number of
+        distinct phrases.
+        """
+        while True:
+            with self._lock:
+                generation = self._generation
+            with stage('suggest.build'):
+                phrases, keys, targets, short = self._build(items_factory())
+            with self._lock:
+                self._phrases, self._keys, self._targets, self._short = phrases, keys, targets, short
+                self._cache.clear()
+                self.ready = True
+                if generation == self._generation:
+                    return len(phrases)
+
+    def suggest(self, prefix, limit=None):
+        """Up to `limit` [{'text', 'kind', 'count'}] for phrases with a word starting with `prefix`."""
+        limit = max(1, min(limit or self.limit, self.limit))
+        key = _phrase_key(prefix)
+        if not key:
+            return []
+        with self._lock:
+            if len(key) <= SHORT_PREFIX:
+                self.hits += 1
+                return self._short.get(key, [])[:limit]
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return cached[:limit]
+            self.misses += 1
+            phrases, keys, targets = self._phrases, self._keys, self._targets
+
+        start = bisect.bisect_left(keys, key)
+        stop = bisect.bisect_left(keys, key + '\uffff', start)
+        result = self._top(phrases, targets[start:stop], self.limit)
+        with self._lock:
+            # Skip results computed against an index replaced in the meantime
+            if phrases is self._phrases:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result[:limit]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'phrases': len(self._phrases),
+                'cached_prefixes': len(self._cache),
+            }
@@ -0,0 +1,19 @@
+import re
+import unicodedata
+
+# Letters that NFKD does not decompose into base letter + combining mark
+_EXTRA_FOLDS = str.maketrans({'ł': 'l', 'Ł': 'l'})
+TOKEN_RE = re.compile(r'\w+')
+
+
+def fold_text(text):
+    """Lowercase and strip diacritics, e.g. 'Łódź Główna' -> 'lodz glowna'."""
+    if not text:
+        return ''
+    text = str(text).translate(_EXTRA_FOLDS).lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold_text(text))
@@ -0,0 +1,209 @@
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are then serialized within one process only
+    fcntl = None
+
+from utils.ingest import CHUNK_SIZE
+
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """A chunked upload request that cannot be applied."""
+
+
+class UnknownUploadError(UploadError):
+    """Raised for upload ids that do not exist (or have expired)."""
+
+
+class OffsetMismatchError(UploadError):
+    """Raised when a chunk does not start where the stored bytes end; `offset` is where they do."""
+
+    def __init__(self, offset, message=None):
+        super().__init__(message or f"Chunk must start at offset {offset}")
+        self.offset = offset
+
+
+class ChunkedUploadStore:
+    """
+    Resumable uploads assembled on disk, so a large file reaches the server
+    in pieces and an interrupted transfer continues from the last stored
+    byte instead of starting over. Each upload keeps its metadata in
+    <id>.json and the bytes received so far in <id>.part; the size of the
+    part file is the upload offset, so any server process can accept the
+    next chunk. Once a file is parsed the part file is dropped and only the
+    valid rows and errors are kept (as JSON Lines) for paged previews.
+    Uploads untouched for `ttl` seconds are removed.
+    """
+
+    def __init__(self, directory, max_bytes, ttl=24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, upload_id, suffix):
+        if not _UPLOAD_ID.match(upload_id or ''):
+            raise UnknownUploadError("Unknown upload")
+        return os.path.join(self.directory, f"{upload_id}{suffix}")
+
+    def _write_meta(self, meta):
+        path = self._path(meta['id'], '.json')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _read_meta(self, upload_id):
+        try:
+            with open(self._path(upload_id, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UnknownUploadError("Unknown upload") from None
+
+    def create(self, filename, size, md5=None):
+        """Start an upload of `size` bytes; returns its metadata."""
+        if not isinstance(size, int) or size < 0:
+            raise UploadError("size must be a non-negative integer")
+        if size > self.max_bytes:
+            raise UploadError(f"File is larger than {self.max_bytes // (1024 * 1024)} MB")
+        self.expire()
+        meta = {
+            'id': uuid.uuid4().hex,
+            'filename': os.path.basename(filename or ''),
+            'size': size,
+            'md5': (md5 or '').lower() or None,
+            'status': 'uploading',
+            'created': time.time(),
+        }
+        open(self._path(meta['id'], '.part'), 'wb').close()
+        self._write_meta(meta)
+        return dict(meta, offset=0)
+
+    def status(self, upload_id):
+        """Metadata plus `offset`, the number of bytes stored so far."""
+        meta = self._read_meta(upload_id)
+        if meta['status'] == 'uploading':
+            try:
+                meta['offset'] = os.path.getsize(self._path(upload_id, '.part'))
+            except FileNotFoundError:
+                raise UnknownUploadError("Unknown upload") from None
+        else:
+            meta['offset'] = meta['size']
+        return meta
+
+    def append(self, upload_id, offset, stream):
+        """
+        Store the bytes of `stream` at `offset`, which must be the current end
+        of the upload (OffsetMismatchError tells the client where that is).
+        Returns the new offset. Bytes received before a dropped connection
+        are kept, so the client resumes from wherever they ended.
+        """
+        meta = self._read_meta(upload_id)
+        if meta['status'] != 'uploading':
+            raise UploadError("Upload is already complete")
+        try:
+            f = open(self._path(upload_id, '.part'), 'r+b')
+        except FileNotFoundError:
+            raise UnknownUploadError("Unknown upload") from None
+        with f, (self._lock if fcntl is None else nullcontext()):
+            if fcntl is not None:
+                # Serializes appends to this upload across threads and server processes
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise OffsetMismatchError(current)
+            f.seek(current)
+            for block in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                if f.tell() + len(block) > meta['size']:
+                    f.truncate(current)
+                    raise UploadError(f"Chunk runs past the declared size of {meta['size']} bytes")
+                f.write(block)
+            return f.tell()
+
+    def open(self, upload_id):
+        """Binary file with the bytes of a complete upload."""
+        meta = self.status(upload_id)
+        if meta['status'] != 'uploading':
+            raise UploadError("Upload is already complete")
+        if meta['offset'] != meta['size']:
+            raise OffsetMismatchError(meta['offset'], f"Upload is incomplete: {meta['offset']} of {meta['size']} bytes received")
+        return open(self._path(upload_id, '.part'), 'rb')
+
+    def complete(self, upload_id, md5, items, errors):
+        """Keep the parsed rows and errors of an upload and drop its raw bytes; returns the metadata."""
+        meta = self._read_meta(upload_id)
+        for suffix, rows in (('.items.jsonl', items), ('.errors.jsonl', errors)):
+            with open(self._path(upload_id, suffix), 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False))
+                    f.write('\n')
+        meta.update(status='done', md5=md5, count=len(items), error_count=len(errors))
+        self._write_meta(meta)
+        self._remove(upload_id, '.part')
+        return dict(meta, offset=meta['size'])
+
+    def page(self, upload_id, kind, offset=0, limit=50):
+        """Rows `offset`..`offset + limit` of a finished upload's 'items' or 'errors', and their total."""
+        meta = self._read_meta(upload_id)
+        if meta['status'] != 'done':
+            raise UploadError("Upload is not finalized yet")
+        total = meta['count'] if kind == 'items' else meta['error_count']
+        with open(self._path(upload_id, f'.{kind}.jsonl'), encoding='utf-8') as f:
+            rows = [json.loads(line) for line in itertools.islice(f, offset, offset + limit)]
+        return rows, total
+
+    def rows(self, upload_id, kind='items'):
+        """
+        Iterator over every row of a finished upload's 'items' or 'errors',
+        read from disk as it is consumed. Unknown or unfinished uploads raise
+        right away, before iteration starts.
+        """
+        meta = self._read_meta(upload_id)
+        if meta['status'] != 'done':
+            raise UploadError("Upload is not finalized yet")
+        f = open(self._path(upload_id, f'.{kind}.jsonl'), encoding='utf-8')
+
+        def iterate():
+            with f:
+                for line in f:
+                    yield json.loads(line)
+
+        return iterate()
+
+    def discard(self, upload_id):
+        self._read_meta(upload_id)
+        for suffix in ('.part', '.items.jsonl', '.errors.jsonl', '.json'):
+            self._remove(upload_id, suffix)
+
+    def expire(self):
+        """Remove uploads whose files were last touched more than `ttl` seconds ago."""
+        cutoff = time.time() - self.ttl
+        stale = set()
+        fresh = set()
+        for entry in os.scandir(self.directory):
+            upload_id = entry.name.split('.', 1)[0]
+            try:
+                (stale if entry.stat().st_mtime < cutoff else fresh).add(upload_id)
+            except OSError:
+                continue
+        for upload_id in stale - fresh:
+            if _UPLOAD_ID.match(upload_id):
+                for suffix in ('.part', '.items.jsonl', '.errors.jsonl', '.json'):
+                    self._remove(upload_id, suffix)
+
+    def _remove(self, upload_id, suffix):
+        try:
+            os.remove(self._path(upload_id, suffix))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,433 @@
+import csv
+import io
+import os
+import re
+import sys
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+
+from utils.ingest import CHUNK_SIZE, iter_jsonl, text_stream
+from utils.metrics import Stopwatch
+from utils.schema import FoundItemSchema
+
+ALLOWED_FIELDS = frozenset(FoundItemSchema.REQUIRED_FIELDS + FoundItemSchema.OPTIONAL_FIELDS)
+NUMERIC_FIELDS = frozenset(('location_lat', 'location_lng', 'location_radius'))
+# Raw dataset columns repeated across many rows; their values are interned
+LOW_CARDINALITY_FIELDS = frozenset((
+    'kategoria', 'data_znalezienia', 'miejsce_znalezienia_miasto', 'miejsce_znalezienia_ulica',
+    'jednostka_przechowujaca', 'kontakt_email', 'kontakt_telefon', 'status',
+))
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def sanitize_record(row: dict):
+    """Keep only allowed fields, trim strings, normalize numeric coords/radius."""
+    cleaned = {}
+    for key, value in row.items():
+        if key not in ALLOWED_FIELDS:
+            continue  # drop unknown fields like "null"
+        if key in NUMERIC_FIELDS:
+            cleaned[key] = to_float(value)
+        else:
+            # Preserve empty strings for required-field validation, but trim whitespace
+            cleaned[key] = str(value).strip() if value is not None else ''
+            if key in LOW_CARDINALITY_FIELDS:
+                cleaned[key] = sys.intern(cleaned[key])
+    return cleaned
+
+
+def check_rows(rows, first_row=1, sanitize_first=True):
+    """
+    Validate `rows`, numbered from `first_row`, and return (valid sanitized
+    rows, errors). With sanitize_first the raw rows are sanitized before
+    validation (JSON input); otherwise only valid rows are (CSV input).
+    """
+    validate = FoundItemSchema.validate_row
+    valid = []
+    errors = []
+    for idx, row in enumerate(rows, start=first_row):
+        if sanitize_first:
+            row = sanitize_record(row)
+        row_errors = validate(row)
+        if row_errors:
+            errors.append({'row': idx, 'errors': row_errors})
+        else:
+            valid.append(row if sanitize_first else sanitize_record(row))
+    return valid, errors
+
+
+class _CsvRecords:
+    """
+    csv.DictReader over text lines with known fieldnames that remembers the
+    last raw record, so a chunk cut inside a quoted field can be detected.
+    """
+
+    def __init__(self, lines, fieldnames):
+        self._reader = csv.reader(lines)
+        self.fieldnames = fieldnames
+        self.last = None
+
+    def __iter__(self):
+        fieldnames = self.fieldnames
+        width = len(fieldnames)
+        for record in self._reader:
+            if not record:
+                continue  # DictReader skips blank lines too
+            self.last = record
+            row = dict(zip(fieldnames, record))
+            if width < len(record):
+                row[None] = record[width:]
+            elif width > len(record):
+                for key in fieldnames[len(record):]:
+                    row[key] = None
+            yield row
+
+
+def _guarded(records, failure):
+    """Yield from `records`; a parse error ends them and is stored in `failure`."""
+    try:
+        yield from records
+    except Exception as exc:
+        failure.append(str(exc))
+
+
+ChunkResult = namedtuple('ChunkResult', 'rows valid errors parse_error misaligned parse_seconds check_seconds')
+
+
+def check_chunk(fmt, data, fieldnames=None):
+    """
+    Parse and validate one chunk of a CSV (without its header line) or JSONL
+    file that ends on a line boundary. Errors are numbered from 1 within the
+    chunk. A CSV chunk whose last record runs up to the very end of the
+    data is reported as misaligned: it was cut inside a quoted field, and
+    the caller has to parse across the boundary itself.
+    """
+    start = perf_counter()
+    parsing = Stopwatch()
+    failure = []
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        failure.append(str(exc))
+        text = data[:exc.start].decode('utf-8')
+        text = text[:text.rfind('\n') + 1]
+
+    if fmt == 'csv':
+        records = _CsvRecords(io.StringIO(text, newline=''), fieldnames)
+        valid, errors = check_rows(parsing.iter(_guarded(records, failure)), sanitize_first=False)
+        misaligned = (
+            not failure and records.last is not None and text.endswith('\n')
+            and records.last[-1].endswith('\n')
+        )
+    else:
+        records = (record for _, record in iter_jsonl(io.StringIO(text, newline='')))
+        valid, errors = check_rows(parsing.iter(_guarded(records, failure)))
+        misaligned = False
+    return ChunkResult(
+        len(valid) + len(errors), valid, errors, failure[0] if failure else None,
+        misaligned, parsing.elapsed, perf_counter() - start - parsing.elapsed
+    )
+
+
+def _intern_rows(rows):
+    # Strings interned in a worker arrive as fresh copies
+    for row in rows:
+        for key in LOW_CARDINALITY_FIELDS:
+            value = row.get(key)
+            if value is not None:
+                row[key] = sys.intern(value)
+
+
+def _record_boundary(data, quoted):
+    """
+    Index just past the last record-ending newline in `data`, or 0. With
+    `quoted` (CSV) only newlines preceded by an even number of quote
+    characters count, since the others are inside quoted fields.
+    """
+    end = data.rfind(b'\n')
+    if not quoted or end < 0:
+        return end + 1
+    quotes = data.count(b'"', 0, end)
+    while end >= 0:
+        if quotes % 2 == 0:
+            return end + 1
+        previous = data.rfind(b'\n', 0, end)
+        quotes -= data.count(b'"', previous + 1, end)
+        end = previous
+    return 0
+
+
+_LINE_END = re.compile(rb'\r\n?|\n')
+
+
+def _first_record_end(data, final=False):
+    """
+    Index just past the line ending (\\n, \\r\\n or a lone \\r, like the csv
+    module) of the first CSV record in `data`, or 0 if it is not complete.
+    A trailing \\r only counts at the end of the input (`final`).
+    """
+    start = 0
+    quotes = 0
+    for match in _LINE_END.finditer(data):
+        quotes += data.count(b'"', start, match.start())
+        start = match.end()
+        if quotes % 2 == 0:
+            if start == len(data) and data.endswith(b'\r') and not final:
+                return 0
+            return start
+    return 0
+
+
+class _ChainedReader(io.RawIOBase):
+    """Raw stream reading `buffered` bytes first, then the rest of `stream`."""
+
+    def __init__(self, buffered, stream):
+        self._buffered = deque(buffered)
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._buffered and not self._buffered[0]:
+            self._buffered.popleft()
+        if self._buffered:
+            data = self._buffered.popleft()
+            if len(data) > len(buffer):
+                self._buffered.appendleft(data[len(buffer):])
+                data = data[:len(buffer)]
+        else:
+            data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+ValidationResult = namedtuple('ValidationResult', 'items errors parse_error parse_seconds check_seconds')
+
+
+class ParallelValidator:
+    """
+    Parses and validates CSV and JSONL streams in line-aligned chunks of
+    about `chunk_bytes`, spread over a process pool: the calling thread
+    only cuts the raw bytes at record boundaries, while workers decode,
+    parse, sanitize and validate them. Shipping raw bytes rather than
+    parsed rows matters, since pickling a row costs about as much as
+    checking it. Inputs smaller than `min_bytes` (and any input when
+    workers <= 1) are handled chunk by chunk in the calling thread, where
+    starting processes would cost more than it saves. Results keep input
+    order and error row numbers refer to the whole file. If the pool
+    breaks, chunks are checked in-process instead.
+    """
+
+    def __init__(self, workers=None, chunk_bytes=1024 * 1024, min_bytes=4 * 1024 * 1024):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_bytes = chunk_bytes
+        self.min_bytes = min_bytes
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        with self._lock:
+            # A pool inherited from a parent process (forked server workers) is unusable
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _disable_pool(self, exc):
+        print(f"Validation pool failed, validating in-process: {exc}")
+        with self._lock:
+            self._executor = None
+
+    def _chunks(self, stream, quoted):
+        """Yield byte chunks of `stream` that end on record boundaries (the last one may not)."""
+        pending = b''
+        while True:
+            block = stream.read(self.chunk_bytes)
+            if not block:
+                if pending:
+                    yield pending
+                return
+            data = pending + block
+            cut = _record_boundary(data, quoted)
+            if cut:
+                yield data[:cut]
+            pending = data[cut:]
+
+    @staticmethod
+    def _csv_fieldnames(stream):
+        """Read the header record; returns (normalized fieldnames or None, bytes read past it)."""
+        data = b''
+        while True:
+            block = stream.read(CHUNK_SIZE)
+            data += block
+            cut = _first_record_end(data, final=not block)
+            if cut or not block:
+                break
+        header = data[:cut] if cut else data
+        records = list(csv.reader(io.StringIO(header.decode('utf-8'), newline='')))
+        if not records:
+            return None, b''
+        return FoundItemSchema.normalize_fieldnames(records[0]), data[len(header):]
+
+    def validate_stream(self, stream, fmt):
+        """
+        Parse and validate a binary 'csv' or 'jsonl' stream. Returns a
+        ValidationResult; parse_error is set when the input broke off, and
+        rows before it are kept. The parse/check seconds are CPU time summed
+        over all chunks, wherever they ran.
+        """
+        fieldnames = None
+        head = b''
+        if fmt == 'csv':
+            try:
+                fieldnames, head = self._csv_fieldnames(stream)
+            except (UnicodeDecodeError, csv.Error) as exc:
+                return ValidationResult([], [], str(exc), 0.0, 0.0)
+            if fieldnames is None:
+                return ValidationResult([], [], None, 0.0, 0.0)
+        reader = io.BufferedReader(_ChainedReader([head], stream), CHUNK_SIZE)
+        chunks = self._chunks(reader, quoted=fmt == 'csv')
+
+        buffered = []
+        size = 0
+        use_pool = self.workers > 1
+        if use_pool:
+            for chunk in chunks:
+                buffered.append(chunk)
+                size += len(chunk)
+                if size >= self.min_bytes:
+                    break
+            use_pool = size >= self.min_bytes
+
+        state = {
+            'items': [], 'errors': [], 'rows': 0, 'parse_error': None, 'parse': 0.0, 'check': 0.0,
+            'pool_failed': False,
+        }
+        pending = deque()
+        all_chunks = _chain(buffered, chunks)
+        for chunk in all_chunks:
+            # Once the pool has failed the remaining chunks are checked in-process
+            use_pool = use_pool and not state['pool_failed']
+            future = self._submit(fmt, chunk, fieldnames) if use_pool else None
+            if use_pool and future is None:
+                state['pool_failed'] = True
+            pending.append((future, chunk))
+            # Bound the bytes held in flight; in-process chunks are checked right away
+            while pending and (len(pending) >= 2 * self.workers or pending[-1][0] is None):
+                if not self._collect(pending.popleft(), fmt, fieldnames, state):
+                    return self._finish_serial(state, pending, all_chunks, fmt, fieldnames)
+        while pending:
+            if not self._collect(pending.popleft(), fmt, fieldnames, state):
+                return self._finish_serial(state, pending, all_chunks, fmt, fieldnames)
+        return self._result(state)
+
+    def _submit(self, fmt, chunk, fieldnames):
+        try:
+            return self._pool().submit(check_chunk, fmt, chunk, fieldnames)
+        except (BrokenProcessPool, RuntimeError, OSError) as exc:
+            self._disable_pool(exc)
+            return None
+
+    def _collect(self, entry, fmt, fieldnames, state):
+        """
+        Merge one chunk's result into `state`. Returns False when the rest of
+        the input has to be parsed serially (a misaligned CSV chunk, which is
+        then left unmerged, or a parse error).
+        """
+        future, chunk = entry
+        result = None
+        if future is not None:
+            try:
+                result = future.result()
+                _intern_rows(result.valid)
+            except (BrokenProcessPool, OSError) as exc:
+                if not state['pool_failed']:
+                    self._disable_pool(exc)
+                state['pool_failed'] = True
+        if result is None:
+            result = check_chunk(fmt, chunk, fieldnames)
+        if result.misaligned:
+            state['misaligned'] = chunk
+            return False
+
+        offset = state['rows']
+        state['items'].extend(result.valid)
+        state['errors'].extend(
+            {'row': error['row'] + offset, 'errors': error['errors']} for error in result.errors
+        )
+        state['rows'] += result.rows
+        state['parse'] += result.parse_seconds
+        state['check'] += result.check_seconds
+        if result.parse_error:
+            state['parse_error'] = result.parse_error
+            return False
+        return True
+
+    def _finish_serial(self, state, pending, chunks, fmt, fieldnames):
+        """Parse whatever follows the merged chunks in this thread, as one stream."""
+        misaligned = state.pop('misaligned', None)
+        if misaligned is None:
+            return self._result(state)  # a parse error ends the input
+        rest = [misaligned] + [chunk for _, chunk in pending]
+        text = text_stream(_ChainedReader(rest, _IterReader(chunks)))
+        try:
+            parsing = Stopwatch()
+            failure = []
+            start = perf_counter()
+            records = _CsvRecords(text, fieldnames)
+            valid, errors = check_rows(
+                parsing.iter(_guarded(records, failure)), first_row=state['rows'] + 1, sanitize_first=False
+            )
+        finally:
+            text.detach()
+        state['items'].extend(valid)
+        state['errors'].extend(errors)
+        state['parse'] += parsing.elapsed
+        state['check'] += perf_counter() - start - parsing.elapsed
+        state['parse_error'] = failure[0] if failure else None
+        return self._result(state)
+
+    @staticmethod
+    def _result(state):
+        return ValidationResult(state['items'], state['errors'], state['parse_error'], state['parse'], state['check'])
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
+
+
+class _IterReader:
+    """read(n) over an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._pending = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            chunk = next(self._chunks, b'')
+            if not chunk:
+                break
+            self._pending += chunk
+        if size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
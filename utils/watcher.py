@@ -0,0 +1,133 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+
+# inotify(7) event bits for files created, rewritten, touched, moved or deleted
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+
+def _inotify_fd(directory):
+    """Non-blocking inotify descriptor watching `directory`, or None where unavailable."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def scan_directory(directory):
+    """{path: (mtime_ns, size)} for the regular files in `directory`."""
+    state = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return state
+    for entry in entries:
+        try:
+            if entry.is_file():
+                stat = entry.stat()
+                state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            continue
+    return state
+
+
+class DirectoryWatcher:
+    """
+    Calls `callback()` from a daemon thread after files in `directory` were
+    added, changed or removed. Uses inotify on Linux and falls back to
+    comparing mtime/size scans every `interval` seconds elsewhere (or with
+    mode='poll'). Bursts of events are debounced, so a file being copied in
+    triggers one callback once it has been quiet for `debounce` seconds.
+    """
+
+    def __init__(self, directory, callback, mode='auto', interval=2.0, debounce=0.5):
+        self.directory = directory
+        self.callback = callback
+        self.mode = mode
+        self.interval = interval
+        self.debounce = debounce
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.mode in ('auto', 'inotify') and os.path.isdir(self.directory):
+            self._fd = _inotify_fd(self.directory)
+        if self._fd is None:
+            self.mode = 'poll'
+            target = self._poll_loop
+        else:
+            self.mode = 'inotify'
+            target = self._inotify_loop
+        self._thread = threading.Thread(target=target, name='directory-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + self.debounce + 1)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _notify(self):
+        try:
+            self.callback()
+        except Exception as exc:
+            print(f"Watcher callback failed for {self.directory}: {exc}")
+
+    def _drain(self):
+        """Read all pending events; True if there were any."""
+        seen = False
+        while True:
+            try:
+                if not os.read(self._fd, 65536):
+                    return seen
+            except BlockingIOError:
+                return seen
+            seen = True
+
+    def _inotify_loop(self):
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._fd], [], [], self.interval)
+            if not readable or not self._drain():
+                continue
+            # Wait until writes settle so half-copied files are not loaded
+            while not self._stop.wait(self.debounce) and self._drain():
+                pass
+            if not self._stop.is_set():
+                self._notify()
+
+    def _poll_loop(self):
+        state = scan_directory(self.directory)
+        while not self._stop.wait(self.interval):
+            current = scan_directory(self.directory)
+            if current == state:
+                continue
+            # Rescan after the debounce delay and only fire once the directory is stable
+            self._stop.wait(self.debounce)
+            settled = scan_directory(self.directory)
+            if settled != current:
+                continue
+            state = settled
+            self._notify()